@@ -0,0 +1,198 @@
+# This file is part of the Frescobaldi project, http://www.frescobaldi.org/
+#
+# Copyright (c) 2008 - 2014 by Wilbert Berendsen
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+# See http://www.gnu.org/licenses/ for more information.
+
+
+"""
+Measures the cost of keeping the image caches under their maximum size.
+
+Simulates a zoom gesture across a large score: every page is stored at a
+series of increasing sizes, so the cache constantly overflows and has to
+remove images. This is done with the former implementations, which sorted
+all cached images on every purge, and with the LRU lists that are now used
+by qpageview.cache.ImageCache and qpopplerview.cache.
+
+Run from the source directory:
+
+    python3 benchmarks/imagecache.py [pages] [steps]
+
+"""
+
+import os
+import sys
+import time
+import weakref
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from frescobaldi_app import toplevel
+toplevel.install()
+
+import qpageview.cache
+import qpageview.render
+import qpopplerview.cache
+
+
+class Image:
+    """Stands in for a QImage, only the byte count matters to the caches."""
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+
+    def byteCount(self):
+        return self.width * self.height * 4
+
+
+class Group:
+    """A weakly referencable cache group, e.g. a document."""
+
+
+class SortingImageCache:
+    """The former qpageview ImageCache, sorting all images on every purge."""
+    maxsize = qpageview.cache.ImageCache.maxsize
+    currentsize = 0
+
+    class Entry:
+        def __init__(self, image):
+            self.image = image
+            self.bcount = image.byteCount()
+            self.time = time.time()
+
+    def __init__(self):
+        self._cache = weakref.WeakKeyDictionary()
+
+    def addtile(self, key, tile, image):
+        try:
+            self.currentsize -= self._cache[key.group][key.page][key.size].bcount
+        except KeyError:
+            pass
+        purgeneeded = self.currentsize > self.maxsize
+        e = self.Entry(image)
+        self.currentsize += e.bcount
+        self._cache.setdefault(key.group, {}).setdefault(key.page, {})[key.size] = e
+        if not purgeneeded:
+            return
+        items = []
+        items.extend(sorted(
+            (entry.time, entry.bcount, id(group), group, page, size)
+            for group, groupd in self._cache.items()
+                for page, paged in groupd.items()
+                    for size, entry in sorted(paged.items())[1:]))
+        items.extend(sorted(
+            (entry.time, entry.bcount, id(group), group, page, size)
+            for group, groupd in self._cache.items()
+                for page, paged in groupd.items()
+                    for size, entry in sorted(paged.items())[:1]))
+        items = reversed(items)
+        currentsize = 0
+        for t, bcount, i, group, page, size in items:
+            currentsize += bcount
+            if currentsize > self.maxsize:
+                break
+        self.currentsize = currentsize
+        for t, bcount, i, group, page, size in items:
+            del self._cache[group][page][size]
+            if not self._cache[group][page]:
+                del self._cache[group][page]
+                if not self._cache[group]:
+                    del self._cache[group]
+
+
+class SortingPopplerCache:
+    """The former qpopplerview.cache functions, sorting all images on every purge."""
+    maxsize = 104857600
+    currentsize = 0
+
+    def __init__(self):
+        self._cache = weakref.WeakKeyDictionary()
+
+    def add(self, image, document, pageNumber, rotation, width, height):
+        self._cache.setdefault(document, {}).setdefault(
+            (pageNumber, rotation), {})[(width, height)] = [image, time.time()]
+        self.currentsize += image.byteCount()
+        if self.currentsize > self.maxsize:
+            self.purge()
+
+    def purge(self):
+        images = iter(sorted((
+            (t, id(document), document, pageKey, sizeKey, image.byteCount())
+                for document, pageKeys in self._cache.items()
+                for pageKey, sizeKeys in pageKeys.items()
+                for sizeKey, (image, t) in sizeKeys.items()),
+                    reverse=True))
+        byteCount = 0
+        for item in images:
+            byteCount += item[5]
+            if byteCount > self.maxsize:
+                break
+        self.currentsize = byteCount
+        for t, i, document, pageKey, sizeKey, byteCount in images:
+            del self._cache[document][pageKey][sizeKey]
+
+
+def zoom(pages, steps):
+    """Yield (pageNumber, width, height) for a zoom gesture over all pages."""
+    for step in range(steps):
+        width = 300 + step * 12
+        height = width * 297 // 210
+        for pageNumber in range(pages):
+            yield pageNumber, width, height
+
+
+def measure(name, add, pages, steps):
+    """Call add for every zoom step and print the total and worst times."""
+    worst = 0.0
+    start = time.perf_counter()
+    for pageNumber, width, height in zoom(pages, steps):
+        t = time.perf_counter()
+        add(pageNumber, width, height)
+        worst = max(worst, time.perf_counter() - t)
+    total = time.perf_counter() - start
+    count = pages * steps
+    print("{0:<36} {1:8.3f} s total {2:8.1f} us/image {3:8.2f} ms worst".format(
+        name, total, total / count * 1e6, worst * 1e3))
+
+
+def main():
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    steps = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    print("{0} pages, {1} zoom steps, 100 MB cache\n".format(pages, steps))
+
+    group = Group()
+    def tile(width, height):
+        return qpageview.render.tile_key(0, 0, width, height)
+
+    c = SortingImageCache()
+    measure("qpageview, sorting (former)", lambda n, w, h: c.addtile(
+        qpageview.render.cache_key(group, n, (w, h)), tile(w, h), Image(w, h)),
+        pages, steps)
+    c = qpageview.cache.ImageCache()
+    measure("qpageview, LRU lists", lambda n, w, h: c.addtile(
+        qpageview.render.cache_key(group, n, (w, h)), tile(w, h), Image(w, h)),
+        pages, steps)
+
+    c = SortingPopplerCache()
+    measure("qpopplerview, sorting (former)", lambda n, w, h: c.add(
+        Image(w, h), group, n, 0, w, h), pages, steps)
+    qpopplerview.cache.clear()
+    measure("qpopplerview, LRU list", lambda n, w, h: qpopplerview.cache.add(
+        Image(w, h), group, n, 0, w, h), pages, steps)
+    qpopplerview.cache.clear()
+
+
+if __name__ == '__main__':
+    main()
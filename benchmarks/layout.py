@@ -0,0 +1,103 @@
+# This file is part of the Frescobaldi project, http://www.frescobaldi.org/
+#
+# Copyright (c) 2008 - 2014 by Wilbert Berendsen
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+# See http://www.gnu.org/licenses/ for more information.
+
+
+"""
+Measures hit-testing pages in large qpageview layouts.
+
+Builds a PageLayout and a RowPageLayout with 2000 pages (about the size of
+a full opera score with its parts) and times pageAt() for random points
+and pagesAt() for a viewport-sized rectangle at random positions, once
+using the position index built by updatePagePositions() and once scanning
+all pages, as was done before the index existed.
+
+Run from the source directory:
+
+    python3 benchmarks/layout.py [pages] [lookups]
+
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from frescobaldi_app import toplevel
+toplevel.install()
+
+from PyQt5.QtCore import QPoint, QRect, QSizeF
+
+import qpageview.layout
+import qpageview.page
+
+
+def makeLayout(layoutClass, pages):
+    """Return a layout of the given class with A4 pages, updated."""
+    layout = layoutClass()
+    for i in range(pages):
+        page = qpageview.page.AbstractPage()
+        page.setPageSize(QSizeF(595, 842))
+        layout.append(page)
+    start = time.perf_counter()
+    layout.update()
+    print("  update() with index: {0:.1f} ms".format((time.perf_counter() - start) * 1e3))
+    return layout
+
+
+def measure(name, func, args):
+    """Call func for all args, print and return the mean time per call in us."""
+    start = time.perf_counter()
+    results = [func(*a) for a in args]
+    mean = (time.perf_counter() - start) / len(args) * 1e6
+    print("  {0:<28} {1:10.2f} us/call".format(name, mean))
+    return results
+
+
+def benchmark(layout, lookups):
+    """Compare the indexed and the linear lookups in the layout."""
+    rnd = random.Random(0)
+    points = [(QPoint(rnd.randrange(int(layout.width)), rnd.randrange(int(layout.height))),)
+              for i in range(lookups)]
+    rects = [(QRect(rnd.randrange(int(layout.width)), rnd.randrange(int(layout.height)), 1200, 900),)
+             for i in range(lookups)]
+    pageAt = lambda p: layout.pageAt(p)
+    pagesAt = lambda r: list(layout.pagesAt(r))
+
+    index = layout._index
+    indexed = measure("pageAt(), indexed", pageAt, points)
+    indexedRects = measure("pagesAt(), indexed", pagesAt, rects)
+    layout._index = None
+    linear = measure("pageAt(), linear scan", pageAt, points)
+    linearRects = measure("pagesAt(), linear scan", pagesAt, rects)
+    layout._index = index
+    assert indexed == linear and indexedRects == linearRects, "results differ"
+
+
+def main():
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    lookups = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    print("PageLayout, {0} pages:".format(pages))
+    benchmark(makeLayout(qpageview.layout.PageLayout, pages), lookups)
+    print("RowPageLayout, {0} pages:".format(pages))
+    benchmark(makeLayout(qpageview.layout.RowPageLayout, pages), lookups)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,206 @@
+# This file is part of the Frescobaldi project, http://www.frescobaldi.org/
+#
+# Copyright (c) 2008 - 2014 by Wilbert Berendsen
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+# See http://www.gnu.org/licenses/ for more information.
+
+
+"""
+Measures the frame times of a zoom animation in qpageview.
+
+While the zoom factor changes, the pages are painted from cached images of
+other sizes (see ImageCache.closest()), without rendering. This script
+fills the cache with the tiles of a number of pages at several sizes, and
+then paints the visible pages of a viewport for every frame of a zoom
+animation, like View.paintEvent() does. It does this with the sorted size
+lists now used by ImageCache, and with the former implementation, that
+sorted all sizes of a page on every lookup.
+
+It also times qpopplerview.cache.image(page, exact=False), which looks up
+an interim image the same way for the music view.
+
+Run from the source directory:
+
+    python3 benchmarks/zoom.py [pages] [sizes] [frames]
+
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from frescobaldi_app import toplevel
+toplevel.install()
+
+from PyQt5.QtCore import QRect, QSizeF
+from PyQt5.QtGui import QGuiApplication, QImage, QPainter
+
+import qpageview.cache
+import qpageview.layout
+import qpageview.page
+import qpageview.render
+import qpopplerview.cache
+
+
+class SortingImageCache(qpageview.cache.ImageCache):
+    """ImageCache with the former closest(), sorting all sizes of the page."""
+    def closest(self, key, rect=None):
+        try:
+            entries = self._cache[key.group][key.page]
+        except KeyError:
+            return
+        if entries:
+            width = key.size[0]
+            size = sorted(entries, key=lambda s: abs(1 - s[0] / width))[0]
+            return size, {tile: entry.image for tile, entry in entries[size].items()}
+
+
+class Renderer(qpageview.render.AbstractImageRenderer):
+    """Never renders, the benchmark only paints cached images."""
+    def __init__(self, cache):
+        super().__init__()
+        self.cache = cache
+        self.cache.maxsize = 1 << 50
+
+
+class Page(qpageview.page.AbstractPage):
+    def __init__(self, renderer):
+        super().__init__()
+        self.renderer = renderer
+        self.setPageSize(QSizeF(595, 842))
+
+
+def fill(renderer, layout, sizes):
+    """Store the tiles of all pages at the given number of zoom factors."""
+    image = QImage(renderer.tileWidth, renderer.tileHeight, QImage.Format_ARGB32_Premultiplied)
+    image.fill(0xffffffff)
+    for i in range(sizes):
+        layout.zoomFactor = 0.25 + i * 0.2
+        layout.update()
+        for page in layout:
+            key = renderer.key(page)
+            for tile in renderer.tilesAt(page, QRect(0, 0, page.width, page.height)):
+                renderer.cache.addtile(key, tile, image)
+
+
+def animate(renderer, pages, sizes, frames):
+    """Paint all frames of a zoom animation, return the frame times in seconds."""
+    layout = qpageview.layout.PageLayout()
+    layout.extend(Page(renderer) for i in range(pages))
+    fill(renderer, layout, sizes)
+    viewport = QImage(1200, 900, QImage.Format_ARGB32_Premultiplied)
+    times = []
+    for frame in range(frames):
+        start = time.perf_counter()
+        # zoom in from 0.5 to 2.0 around the middle of the layout
+        layout.zoomFactor = 0.5 + 1.5 * frame / frames
+        layout.update()
+        rect = QRect(0, 0, viewport.width(), viewport.height())
+        rect.moveCenter(QRect(0, 0, layout.width, layout.height).center())
+        painter = QPainter(viewport)
+        painter.translate(-rect.topLeft())
+        for page in layout.pagesAt(rect):
+            painter.save()
+            painter.translate(page.pos())
+            r = (rect & page.rect()).translated(-page.pos())
+            page.paint(painter, r, schedule=False)
+            painter.restore()
+        painter.end()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def report(name, times):
+    times = sorted(times)
+    mean = sum(times) / len(times)
+    p95 = times[int(len(times) * 0.95)]
+    print("{0:<40} mean {1:7.2f} ms  p95 {2:7.2f} ms  max {3:7.2f} ms".format(
+        name, mean * 1e3, p95 * 1e3, times[-1] * 1e3))
+
+
+class Document:
+    """Stands in for a Poppler.Document as qpopplerview cache group."""
+
+
+class PopplerPage:
+    """Stands in for a qpopplerview.Page."""
+    def __init__(self, document, pageNumber, width):
+        self._document = document
+        self._pageNumber = pageNumber
+        self._width = width
+    def document(self):
+        return self._document
+    def pageNumber(self):
+        return self._pageNumber
+    def rotation(self):
+        return 0
+    def physWidth(self):
+        return self._width
+    def physHeight(self):
+        return self._width * 297 // 210
+
+
+def sortingImage(page):
+    """The former qpopplerview.cache.image(page, exact=False)."""
+    try:
+        sizes = qpopplerview.cache._cache[page.document()][(page.pageNumber(), page.rotation())]
+    except KeyError:
+        return
+    if sizes:
+        best = sorted(sizes, key=lambda s: abs(1 - s[0] / float(page.physWidth())))[0]
+        return sizes[best]
+
+
+def lookups(pages, sizes, frames):
+    """Time the interim image lookups of qpopplerview.cache for all frames."""
+    document = Document()
+    image = QImage(8, 8, QImage.Format_ARGB32_Premultiplied)
+    qpopplerview.cache.setmaxsize(1 << 30)
+    for i in range(sizes):
+        width = 150 + i * 120
+        for n in range(pages):
+            qpopplerview.cache.add(image, document, n, 0, width, width * 297 // 210)
+    for name, func in (
+        ("qpopplerview image(), sorting (former)", sortingImage),
+        ("qpopplerview image(), bisection", lambda page: qpopplerview.cache.image(page, False)),
+        ):
+        times = []
+        for frame in range(frames):
+            width = 300 + 900 * frame // frames
+            start = time.perf_counter()
+            for n in range(pages):
+                func(PopplerPage(document, n, width))
+            times.append(time.perf_counter() - start)
+        report(name, times)
+    qpopplerview.cache.clear()
+
+
+def main():
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    sizes = int(sys.argv[2]) if len(sys.argv) > 2 else 12
+    frames = int(sys.argv[3]) if len(sys.argv) > 3 else 120
+    app = QGuiApplication(sys.argv[:1])
+    print("{0} pages with {1} cached sizes, {2} frames\n".format(pages, sizes, frames))
+    report("qpageview, sorting (former)",
+           animate(Renderer(SortingImageCache()), pages, sizes, frames))
+    report("qpageview, sorted size lists",
+           animate(Renderer(qpageview.cache.ImageCache()), pages, sizes, frames))
+    lookups(pages, sizes, frames)
+
+
+if __name__ == '__main__':
+    main()
@@ -33,6 +33,7 @@ import appinfo
 import icons
 import helpers
 import debuginfo
+import renderinfo
 import userguide.page
 
 
@@ -56,6 +57,7 @@ class AboutDialog(QDialog):
         tabw.addTab(About(self), _("About"))
         tabw.addTab(Credits(self), _("Credits"))
         tabw.addTab(Version(self), _("Version"))
+        tabw.addTab(RenderStatistics(self), _("Viewer Statistics"))
 
         button = QDialogButtonBox(QDialogButtonBox.Ok)
         button.setCenterButtons(True)
@@ -103,6 +105,18 @@ class Version(QTextBrowser):
         self.setPlainText(debuginfo.version_info_string())
 
 
+class RenderStatistics(QTextBrowser):
+    """Statistics about the caching and rendering of PDF pages."""
+    def __init__(self, parent=None):
+        super(RenderStatistics, self).__init__(parent)
+        self.setPlainText(renderinfo.cache_statistics_string())
+
+    def showEvent(self, ev):
+        """Reimplemented to display up-to-date statistics."""
+        self.setPlainText(renderinfo.cache_statistics_string())
+        super(RenderStatistics, self).showEvent(ev)
+
+
 def html():
     """Returns a HTML string for the about dialog."""
     appname = appinfo.appname
@@ -250,8 +250,6 @@ def job_queue():
     global _job_queue
     if _job_queue is None:
         import job.queue
-        #TODO: save the number of runners in the Preferences
-        #NOTE: Provide code for *changing* the number of runners
         _job_queue = job.queue.GlobalJobQueue()
     return _job_queue
 
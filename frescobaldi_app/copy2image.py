@@ -23,14 +23,18 @@ Dialog to copy contents from PDF to a raster image.
 
 
 import collections
+import math
 import os
+import struct
 import tempfile
+import zlib
 
-from PyQt5.QtCore import QSettings, QSize, Qt
+from PyQt5.QtCore import QEventLoop, QRect, QSettings, QSize, Qt, QThread, pyqtSignal
 from PyQt5.QtGui import QBitmap, QColor, QDoubleValidator, QImage, QRegion
 from PyQt5.QtWidgets import (QApplication, QCheckBox, QComboBox, QDialog,
                              QDialogButtonBox, QFileDialog, QHBoxLayout,
-                             QLabel, QMessageBox, QPushButton, QVBoxLayout)
+                             QLabel, QMessageBox, QProgressDialog, QPushButton,
+                             QVBoxLayout)
 
 import app
 import util
@@ -46,6 +50,18 @@ try:
 except ImportError:
     popplerqt5 = None
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# images with more pixels are not created in one piece, but saved in bands
+MAX_PIXELS = 4096 * 4096
+
+# the height of the bands large images are rendered and saved in
+BAND_HEIGHT = 256
+
 
 def copy_image(parent_widget, page, rect=None, filename=None):
     """Shows the dialog to copy a PDF page to a raster image.
@@ -65,6 +81,8 @@ class Dialog(QDialog):
         self._filename = None
         self._page = None
         self._rect = None
+        self._large = False
+        self._crop = None
         self.imageViewer = widgets.imageviewer.ImageViewer()
         self.dpiLabel = QLabel()
         self.dpiCombo = QComboBox(insertPolicy=QComboBox.NoInsert, editable=True)
@@ -183,10 +201,14 @@ class Dialog(QDialog):
         self.setCaption()
         self.drawImage()
 
-    def drawImage(self):
+    def dpi(self):
+        """Returns the resolution the user wants, in dots per inch."""
         dpi = float(self.dpiCombo.currentText() or '100')
         dpi = max(dpi, self.dpiCombo.validator().bottom())
-        dpi = min(dpi, self.dpiCombo.validator().top())
+        return min(dpi, self.dpiCombo.validator().top())
+
+    def renderOptions(self):
+        """Returns the qpopplerview.RenderOptions to render the image with."""
         options = qpopplerview.RenderOptions()
         options.setPaperColor(self.colorButton.color())
         if self.antialias.isChecked():
@@ -196,8 +218,30 @@ class Dialog(QDialog):
                     popplerqt5.Poppler.Document.TextAntialiasing)
         else:
             options.setRenderHint(0)
+        return options
+
+    def imageRect(self, dpi):
+        """Returns the QRect of the selection in pixels at the resolution."""
+        page = self._page
+        hscale = (dpi * page.pageSize().width()) / (72.0 * page.width())
+        vscale = (dpi * page.pageSize().height()) / (72.0 * page.height())
+        r = self._rect
+        return QRect(round(r.x() * hscale), round(r.y() * vscale),
+                     round(r.width() * hscale), round(r.height() * vscale))
+
+    def drawImage(self):
+        dpi = self.dpi()
+        # a very large image is only displayed at a lower resolution,
+        # it is rendered in bands when saved
+        size = self.imageRect(dpi).size()
+        self._large = size.width() * size.height() > MAX_PIXELS
+        if self._large:
+            dpi *= math.sqrt(MAX_PIXELS / (size.width() * size.height()))
+        self.copyButton.setEnabled(not self._large)
+        self.copyButton.setToolTip(_(
+            "The image is too large to copy, save it instead.") if self._large else "")
         m = 2 if self.scaleup.isChecked() else 1
-        i = self._page.image(self._rect, dpi * m, dpi * m , options)
+        i = self._page.image(self._rect, dpi * m, dpi * m , self.renderOptions())
         if m == 2:
             i = i.scaled(i.size() / 2, transformMode=Qt.SmoothTransformation)
         if self.grayscale.isChecked():
@@ -207,10 +251,65 @@ class Dialog(QDialog):
 
     def cropImage(self):
         image = self._image
+        self._crop = None
         if self.crop.isChecked():
-            image = image.copy(autoCropRect(image))
+            self._crop = autoCropRect(image)
+            image = image.copy(self._crop)
         self.imageViewer.setImage(image)
         self.fileDragger.setImage(image)
+        self.fileDragger.export = self.exportImage if self._large else None
+
+    def exportImage(self, filename):
+        """Renders the image at the full resolution and saves it in bands.
+
+        The image is rendered by an Exporter in a background thread, while a
+        progress dialog is shown. If the filename ends with .tif or .tiff a
+        TIFF file is written, otherwise a PNG file. Returns True if the file
+        could be written.
+
+        """
+        dpi = self.dpi()
+        rect = self.imageRect(dpi)
+        if self._crop:
+            # the crop rectangle was computed on the preview; add a pixel of
+            # the preview on all sides, to be sure nothing is cut off
+            scale = rect.width() / self._image.width()
+            rect = QRect(rect.x() + math.floor((self._crop.x() - 1) * scale),
+                         rect.y() + math.floor((self._crop.y() - 1) * scale),
+                         math.ceil((self._crop.width() + 2) * scale),
+                         math.ceil((self._crop.height() + 2) * scale)) & rect
+        options = self.renderOptions()
+        if self.grayscale.isChecked():
+            fmt = QImage.Format_Grayscale8
+        elif self.colorButton.color().alpha() < 255:
+            fmt = QImage.Format_RGBA8888
+        else:
+            fmt = QImage.Format_RGB888
+        if os.path.splitext(filename)[1].lower() in ('.tif', '.tiff'):
+            writer = TiffWriter
+        else:
+            writer = PngWriter
+        m = 2 if self.scaleup.isChecked() else 1
+        e = Exporter(self._page.document(), self._page.pageNumber(),
+            self._page.rotation(), rect, dpi, m, options, fmt, writer, filename)
+
+        d = QProgressDialog(self)
+        d.setModal(True)
+        d.setMinimumDuration(500)
+        d.setRange(0, e.bandCount())
+        d.setLabelText(_("Saving image..."))
+        d.canceled.connect(e.abort)
+        e.progress.connect(d.setValue)
+
+        loop = QEventLoop()
+        e.finished.connect(loop.quit)
+        e.start()
+        loop.exec_()
+        d.hide()
+        d.deleteLater()
+        if not e.success and os.path.exists(filename):
+            os.remove(filename)
+        return e.success
 
     def copyToClipboard(self):
         QApplication.clipboard().setImage(self.imageViewer.image())
@@ -223,18 +322,84 @@ class Dialog(QDialog):
         filename = QFileDialog.getSaveFileName(self,
             _("Save Image As"), filename)[0]
         if filename:
-            if not self.imageViewer.image().save(filename):
+            if self._large:
+                success = self.exportImage(filename)
+            else:
+                success = self.imageViewer.image().save(filename)
+            if not success:
                 QMessageBox.critical(self, _("Error"), _(
                     "Could not save the image."))
             else:
                 self.fileDragger.currentFile = filename
 
 
+class Exporter(QThread):
+    """Renders a part of a page in bands and writes them to a file.
+
+    Only BAND_HEIGHT rows of the image are in memory at the same time.
+    The progress signal is emitted with the number of bands written.
+
+    """
+    progress = pyqtSignal(int)
+
+    def __init__(self, document, pageNumber, rotation, rect, dpi, scale,
+                 options, fmt, writer, filename):
+        super(Exporter, self).__init__()
+        self.document = document
+        self.pageNumber = pageNumber
+        self.rotation = rotation
+        self.rect = rect
+        self.dpi = dpi
+        self.scale = scale
+        self.options = options
+        self.format = fmt
+        self.writer = writer
+        self.filename = filename
+        self.success = False
+        self._stop = False
+
+    def bandCount(self):
+        """Returns the number of bands the image is rendered in."""
+        return -(-self.rect.height() // BAND_HEIGHT)
+
+    def abort(self):
+        """Stops writing the image, the file is then incomplete."""
+        self._stop = True
+
+    def run(self):
+        rect, dpi, m, fmt = self.rect, self.dpi, self.scale, self.format
+        document = self.document
+        try:
+            with open(self.filename, 'wb') as f:
+                w = self.writer(f, rect.width(), rect.height(), fmt, dpi)
+                for num, y in enumerate(range(0, rect.height(), BAND_HEIGHT), 1):
+                    if self._stop:
+                        return
+                    h = min(BAND_HEIGHT, rect.height() - y)
+                    with qpopplerview.lock(document):
+                        self.options.write(document)
+                        page = document.page(self.pageNumber)
+                        band = page.renderToImage(dpi * m, dpi * m,
+                            rect.x() * m, (rect.y() + y) * m, rect.width() * m, h * m,
+                            self.rotation)
+                    if band.isNull():
+                        return
+                    if m == 2:
+                        band = band.scaled(rect.width(), h, transformMode=Qt.SmoothTransformation)
+                    w.write(band.convertToFormat(fmt))
+                    self.progress.emit(num)
+                w.close()
+        except (IOError, OSError):
+            return
+        self.success = True
+
+
 class FileDragger(gadgets.drag.FileDragger):
     """Creates an image file on the fly as soon as a drag is started."""
     image = None
     basename = None
     currentFile = None
+    export = None   # if set, called with the filename to write the image to
 
     def setImage(self, image):
         self.image = image
@@ -250,7 +415,11 @@ class FileDragger(gadgets.drag.FileDragger):
         basename = self.basename or 'image'
         basename += '.png'
         filename = os.path.join(d, basename)
-        self.image.save(filename)
+        if self.export:
+            if not self.export(filename):
+                return
+        else:
+            self.image.save(filename)
         self.currentFile = filename
         return filename
 
@@ -261,6 +430,8 @@ def autoCropRect(image):
     Edges of the image are trimmed if they have the same color.
 
     """
+    if numpy:
+        return _autoCropRectNumpy(image)
     # pick the color at most of the corners
     colors = collections.defaultdict(int)
     w, h = image.width(), image.height()
@@ -272,3 +443,167 @@ def autoCropRect(image):
     return QRegion(QBitmap.fromImage(mask)).boundingRect()
 
 
+def _autoCropRectNumpy(image):
+    """Implements autoCropRect() comparing the pixels in numpy."""
+    if image.depth() not in (8, 32):
+        image = image.convertToFormat(QImage.Format_ARGB32)
+    w, h = image.width(), image.height()
+    bpp = image.depth() // 8
+    bits = image.constBits()
+    bits.setsize(image.byteCount())
+    pixels = numpy.frombuffer(bits, numpy.uint8 if bpp == 1 else numpy.uint32)
+    pixels = pixels.reshape(h, image.bytesPerLine() // bpp)[:, :w]
+
+    # pick the color at most of the corners
+    colors = collections.defaultdict(int)
+    for x, y in (0, 0), (w - 1, 0), (w - 1, h - 1), (0, h - 1):
+        colors[pixels[y, x]] += 1
+    most = max(colors, key=colors.get)
+
+    content = pixels != most
+    rows = numpy.flatnonzero(content.any(axis=1))
+    if not len(rows):
+        return QRect()
+    columns = numpy.flatnonzero(content[rows[0]:rows[-1]+1].any(axis=0))
+    return QRect(int(columns[0]), int(rows[0]),
+        int(columns[-1] - columns[0] + 1), int(rows[-1] - rows[0] + 1))
+
+
+class PngWriter(object):
+    """Writes a PNG file band by band, without the whole image in memory.
+
+    The bands are QImages with the same width and format, which must be
+    Format_Grayscale8, Format_RGB888 or Format_RGBA8888.
+
+    """
+    colorTypes = {
+        QImage.Format_Grayscale8: (0, 1),
+        QImage.Format_RGB888: (2, 3),
+        QImage.Format_RGBA8888: (6, 4),
+    }
+
+    def __init__(self, f, width, height, fmt, dpi):
+        self._file = f
+        self._width = width
+        colorType, self._bpp = self.colorTypes[fmt]
+        self._compressor = zlib.compressobj(6)
+        self._data = []
+        f.write(b'\x89PNG\r\n\x1a\n')
+        self.chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, colorType, 0, 0, 0))
+        ppm = round(dpi * 39.37)
+        self.chunk(b'pHYs', struct.pack('>IIB', ppm, ppm, 1))
+
+    def chunk(self, name, data):
+        """Writes a chunk."""
+        self._file.write(struct.pack('>I', len(data)) + name + data)
+        self._file.write(struct.pack('>I', zlib.crc32(name + data) & 0xffffffff))
+
+    def write(self, image):
+        """Writes the rows of the image."""
+        rowlen = self._width * self._bpp
+        bpl = image.bytesPerLine()
+        bits = image.constBits()
+        bits.setsize(image.byteCount())
+        data = bits.asstring(image.byteCount())
+        compressed = [self._compressor.compress(b'\0' + data[y*bpl:y*bpl+rowlen])
+                      for y in range(image.height())]
+        self._idat(b''.join(compressed))
+
+    def _idat(self, data):
+        """(Internal) Writes compressed data in IDAT chunks of at least 64kB."""
+        self._data.append(data)
+        if sum(map(len, self._data)) >= 65536:
+            self.chunk(b'IDAT', b''.join(self._data))
+            self._data = []
+
+    def close(self):
+        """Writes the remaining data and the end of the file."""
+        self._data.append(self._compressor.flush())
+        self.chunk(b'IDAT', b''.join(self._data))
+        self.chunk(b'IEND', b'')
+
+
+class TiffWriter(object):
+    """Writes an uncompressed TIFF file band by band, one strip per band.
+
+    The bands are QImages with the same width and format, which must be
+    Format_Grayscale8, Format_RGB888 or Format_RGBA8888.
+
+    """
+    samples = {
+        QImage.Format_Grayscale8: 1,
+        QImage.Format_RGB888: 3,
+        QImage.Format_RGBA8888: 4,
+    }
+
+    def __init__(self, f, width, height, fmt, dpi):
+        self._file = f
+        self._width = width
+        self._height = height
+        self._spp = self.samples[fmt]
+        self._dpi = dpi
+        self._offsets = []
+        self._counts = []
+        self._rowsPerStrip = None
+        f.write(b'II*\0\0\0\0\0')   # the IFD offset is written on close()
+
+    def write(self, image):
+        """Writes the rows of the image as a strip."""
+        rowlen = self._width * self._spp
+        bpl = image.bytesPerLine()
+        bits = image.constBits()
+        bits.setsize(image.byteCount())
+        data = bits.asstring(image.byteCount())
+        if bpl != rowlen:
+            data = b''.join(data[y*bpl:y*bpl+rowlen] for y in range(image.height()))
+        if self._rowsPerStrip is None:
+            self._rowsPerStrip = image.height()
+        self._offsets.append(self._file.tell())
+        self._counts.append(len(data))
+        self._file.write(data)
+        if len(data) & 1:
+            self._file.write(b'\0')
+
+    def close(self):
+        """Writes the image file directory."""
+        f = self._file
+        n = len(self._offsets)
+        def values(fmt, items):
+            """Writes an array of values, returns its offset."""
+            offset = f.tell()
+            f.write(struct.pack('<{0}{1}'.format(len(items), fmt), *items))
+            if f.tell() & 1:
+                f.write(b'\0')
+            return offset
+        offsets = values('I', self._offsets) if n > 1 else self._offsets[0]
+        counts = values('I', self._counts) if n > 1 else self._counts[0]
+        resolution = values('I', (round(self._dpi * 1000), 1000))
+        bits = values('H', (8,) * self._spp) if self._spp > 2 else 8
+        SHORT, LONG, RATIONAL = 3, 4, 5
+        tags = [
+            (256, LONG, 1, self._width),
+            (257, LONG, 1, self._height),
+            (258, SHORT, self._spp, bits),
+            (259, SHORT, 1, 1),                         # no compression
+            (262, SHORT, 1, 1 if self._spp == 1 else 2), # gray or RGB
+            (273, LONG, n, offsets),
+            (277, SHORT, 1, self._spp),
+            (278, LONG, 1, self._rowsPerStrip or self._height),
+            (279, LONG, n, counts),
+            (282, RATIONAL, 1, resolution),
+            (283, RATIONAL, 1, resolution),
+            (284, SHORT, 1, 1),                         # chunky
+            (296, SHORT, 1, 2),                         # inch
+        ]
+        if self._spp == 4:
+            tags.append((338, SHORT, 1, 2))             # unassociated alpha
+        ifd = f.tell()
+        f.write(struct.pack('<H', len(tags)))
+        for tag, typ, count, value in tags:
+            if typ == SHORT and count <= 2 and not (self._spp > 2 and tag == 258):
+                f.write(struct.pack('<HHIHH', tag, typ, count, value, 0))
+            else:
+                f.write(struct.pack('<HHII', tag, typ, count, value))
+        f.write(struct.pack('<I', 0))
+        f.seek(4)
+        f.write(struct.pack('<I', ifd))
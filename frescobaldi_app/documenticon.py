@@ -61,9 +61,9 @@ class DocumentIconProvider(plugin.DocumentPlugin):
             icon = 'pushpin'
         elif doc.isModified():
             icon = 'document-save'
-        elif j and not j.is_running() and not j.is_aborted() and j.success:
+        elif j and not j.is_active() and not j.is_aborted() and j.success:
             icon = 'document-compile-success'
-        elif j and not j.is_running() and not j.is_aborted():
+        elif j and not j.is_active() and not j.is_aborted():
             icon = 'document-compile-failed'
         else:
             icon = 'text-plain'
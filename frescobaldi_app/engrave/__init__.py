@@ -95,12 +95,12 @@ class Engraver(plugin.MainWindowPlugin):
         """Returns a Job for the sticky or current document if that is running."""
         doc = self.document()
         j = job.manager.job(doc)
-        if j and j.is_running() and not job.attributes.get(j).hidden:
+        if j and j.is_active() and not job.attributes.get(j).hidden:
             return j
 
     def updateActions(self):
         j = job.manager.job(self.document())
-        running = bool(j and j.is_running())
+        running = bool(j and j.is_active())
         visible = running and not job.attributes.get(j).hidden
         ac = self.actionCollection
         ac.engrave_preview.setEnabled(not visible)
@@ -202,7 +202,7 @@ class Engraver(plugin.MainWindowPlugin):
 
     def engraveAbort(self):
         j = job.manager.job(self.document())
-        if j and j.is_running():
+        if j and j.is_active():
             j.abort()
 
     def saveDocumentIfDesired(self):
@@ -228,7 +228,7 @@ class Engraver(plugin.MainWindowPlugin):
 
         """
         j = job.manager.job(doc)
-        if not j or not j.is_running() or job.attributes.get(j).hidden:
+        if not j or not j.is_active() or job.attributes.get(j).hidden:
             return True
         msgbox = QMessageBox(QMessageBox.Warning,
             _("Warning"),
@@ -248,7 +248,7 @@ class Engraver(plugin.MainWindowPlugin):
         job.attributes.get(j).mainwindow = self.mainwindow()
         # cancel running job, that would be an autocompile job
         rjob = job.manager.job(document)
-        if rjob and rjob.is_running():
+        if rjob and rjob.is_active():
             rjob.abort()
         job.manager.manager(document).start_job(j)
 
@@ -311,7 +311,7 @@ class Engraver(plugin.MainWindowPlugin):
     def slotDocumentClosed(self, doc):
         """Called when the user closes a document. Aborts a running Job."""
         j = job.manager.job(doc)
-        if j and j.is_running():
+        if j and j.is_active():
             j.abort()
 
     def slotSessionChanged(self):
@@ -93,7 +93,7 @@ class AutoCompiler(plugin.MainWindowPlugin):
         eng = engraver(self.mainwindow())
         doc = eng.document()
         rjob = job.manager.job(doc)
-        if rjob and rjob.is_running(): # and not job.attributes.get(rjob).hidden:
+        if rjob and rjob.is_active(): # and not job.attributes.get(rjob).hidden:
             # a real job is running, come back when that is done
             rjob.done.connect(self.startTimer)
             return
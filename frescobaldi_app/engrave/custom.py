@@ -148,7 +148,7 @@ class Dialog(QDialog):
         j = job.manager.job(doc)
         if j:
             self.lilyChooser.setLilyPondInfo(j.lilypond_info)
-        if j and j.is_running() and not job.attributes.get(j).hidden:
+        if j and j.is_active() and not job.attributes.get(j).hidden:
             self._document = doc
             self.buttons.button(QDialogButtonBox.Ok).setEnabled(False)
 
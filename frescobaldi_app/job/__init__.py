@@ -115,6 +115,8 @@ class Job(object):
         self._history = []
         self._starttime = 0.0
         self._elapsed = 0.0
+        self._queue = None
+        self._queuetime = 0.0
         self.decoder_stdout = self.create_decoder(STDOUT)
         self.decoder_stderr = self.create_decoder(STDERR)
         self.decode_errors = decode_errors  # codecs error handling
@@ -212,10 +214,14 @@ class Job(object):
         self._history = []
         self._elapsed = 0.0
         self._starttime = time.time()
+        self.start_message()
+        self.start_process()
+
+    def start_process(self):
+        """Starts the QProcess with the command (called by start())."""
         if self._process is None:
             self.set_process(QProcess())
         self._process.started.connect(self.started)
-        self.start_message()
         if os.path.isdir(self._directory):
             self._process.setWorkingDirectory(self._directory)
         if self.environment:
@@ -258,8 +264,27 @@ class Job(object):
             return time.time() - self._starttime
         return 0.0
 
+    def set_queued(self, queue):
+        """Called by a job.queue.JobQueue when the job is added to it."""
+        self._queue = queue
+        self._queuetime = time.time()
+
+    def is_queued(self):
+        """Returns True if this job is waiting in a queue to be started."""
+        return bool(self._queue and not self._starttime and not self._aborted)
+
+    def wait_time(self):
+        """Return how many seconds this job has waited in a queue.
+
+        Returns 0.0 when the job has not been added to a queue.
+
+        """
+        if not self._queuetime:
+            return 0.0
+        return (self._starttime or time.time()) - self._queuetime
+
     def abort(self):
-        """Abort the process."""
+        """Abort the process, or remove the job from its queue if it is waiting."""
         if self._process:
             self._aborted = True
             self.abort_message()
@@ -267,6 +292,12 @@ class Job(object):
                 self._process.kill()
             else:
                 self._process.terminate()
+        elif self.is_queued():
+            self._aborted = True
+            self.abort_message()
+            self._queue.remove_job(self)
+            self.success = False
+            self.done(False)
 
     def is_aborted(self):
         """Returns True if the job was aborted by calling abort()."""
@@ -276,6 +307,10 @@ class Job(object):
         """Returns True if this job is running."""
         return bool(self._process)
 
+    def is_active(self):
+        """Returns True if this job is running or waiting in a queue to be started."""
+        return self.is_running() or self.is_queued()
+
     def failed_to_start(self):
         """Return True if the process failed to start.
 
@@ -360,11 +395,17 @@ class Job(object):
     def start_message(self):
         """Called by start().
 
-        Outputs a message that the process has started.
+        Outputs a message that the process has started, and how long the
+        job waited in a queue, if that was a second or more.
 
         """
         name = self.title() or os.path.basename(self.command[0])
-        self.message(_("Starting {job}...").format(job=name), NEUTRAL)
+        wait = self.wait_time()
+        if wait >= 1.0:
+            self.message(_("Starting {job} (waited {seconds:.1f} s)...").format(
+                job=name, seconds=wait), NEUTRAL)
+        else:
+            self.message(_("Starting {job}...").format(job=name), NEUTRAL)
 
     def abort_message(self):
         """Called by abort().
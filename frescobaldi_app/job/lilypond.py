@@ -26,15 +26,17 @@ import codecs
 import glob
 import os
 import shutil
+import time
 
-from PyQt5.QtCore import QSettings, QUrl
+from PyQt5.QtCore import QProcess, QSettings, QUrl
 
 import ly.document
 import ly.docinfo
 
 import document
 import documentinfo
-from . import Job
+from . import Job, NEUTRAL
+from . import warm
 import lilypondinfo
 import util
 
@@ -80,7 +82,12 @@ class LilyPondJob(Job):
     added from which the command line is implicitly composed in
     configure_command().
 
+    If warm LilyPond processes are enabled (see the warm module),
+    configure_command() may choose one to engrave the document, instead of
+    starting a new LilyPond process.
+
     """
+    _server = None
 
     def __init__(self, doc, args=None, title=""):
         """Create a LilyPond job by first retrieving some context
@@ -152,8 +159,50 @@ class LilyPondJob(Job):
         cmd.extend(self.arguments())
         cmd.extend(self.paths(self.includepath))
         cmd.extend(self.backend_args())
+        self._server = None
+        if (os.path.isdir(self._directory)
+            and warm.acceptable(self._directory, self._input)):
+            self._server = warm.acquire(cmd, self.environment)
         self.set_input_file()
 
+    def start_process(self):
+        """Reimplemented to send the document to a warm process if chosen."""
+        if self._server:
+            self._server.run(self, self._directory, self._input)
+            self.started()
+        else:
+            super(LilyPondJob, self).start_process()
+
+    def is_running(self):
+        """Reimplemented to also return True while a warm process engraves our document."""
+        return bool(self._server) or super(LilyPondJob, self).is_running()
+
+    def abort(self):
+        """Reimplemented to stop a warm process engraving our document."""
+        if self._server:
+            self._aborted = True
+            self.abort_message()
+            self._server.stop()
+        else:
+            super(LilyPondJob, self).abort()
+
+    def server_done(self, success):
+        """Called by the warm process when our document has been engraved."""
+        self._server = None
+        self._elapsed = time.time() - self._starttime
+        if self._aborted:
+            self.finish_message(0, QProcess.CrashExit)
+        else:
+            self.finish_message(0 if success else 1, QProcess.NormalExit)
+        self.success = success
+        self.done(success)
+
+    def server_failed(self):
+        """Called when the warm process stopped, engrave in a new process."""
+        self._server = None
+        self.message(_("The LilyPond process stopped, starting it again."), NEUTRAL)
+        super(LilyPondJob, self).start_process()
+
     def d_option(self, key):
         return self._d_options.get(key, None)
 
@@ -21,6 +21,9 @@
 A JobManager exists for every Document, and ensures no two jobs are running
 at the same time.
 
+The jobs are started via the global engrave queue (see job.queue), so that
+no more jobs run in parallel than there are CPU cores.
+
 It also sends the app-wide signals jobStarted() and jobFinished().
 
 """
@@ -41,7 +44,7 @@ def job(document):
 
 def is_running(document):
     if job(document):
-        return job(document).is_running()
+        return job(document).is_active()
     return False
 
 
@@ -58,7 +61,7 @@ class JobManager(plugin.DocumentPlugin):
         if not self.is_running():
             self._job = job
             job.done.connect(self._finished)
-            job.start()
+            app.job_queue().add_job(job, 'engrave')
             self.started(job)
             app.jobStarted(self.document(), job)
 
@@ -71,9 +74,9 @@ class JobManager(plugin.DocumentPlugin):
         return self._job
 
     def is_running(self):
-        """Returns True when a job is running."""
+        """Returns True when a job is running or waiting to be started."""
         if self._job:
-            return self._job.is_running() and not self._job.is_aborted()
+            return self._job.is_active() and not self._job.is_aborted()
 
 
 
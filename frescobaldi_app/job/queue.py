@@ -23,14 +23,26 @@ A (multithreaded) Job queue
 
 from enum import Enum
 import collections
+import heapq
+import os
 import time
 
-from PyQt5.QtCore import QObject
+from PyQt5.QtCore import QObject, QSettings
 
 import app
 import job
+import job.attributes
 import signals
 
+
+def cpu_count():
+    """Return the number of CPU cores available to Frescobaldi."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
 class RunnerBusyException(Exception):
     """Raised when a Runner is asked to start a job (without the force=True
     keyword argument) while having already a running job."""
@@ -123,6 +135,10 @@ class AbstractQueue(QObject):
         """Add a job to the queue."""
         raise NotImplementedError
 
+    def remove(self, j):
+        """Remove a job from the queue."""
+        raise NotImplementedError
+
     def pop(self):
         """Remove and return the next job."""
         raise NotImplementedError
@@ -142,6 +158,9 @@ class Queue(AbstractQueue):
     def push(self, j):
         self._queue.appendleft(j)
 
+    def remove(self, j):
+        self._queue.remove(j)
+
     def pop(self):
         return self._queue.pop()
 
@@ -159,20 +178,23 @@ class Stack(AbstractQueue):
     def push(self, j):
         self._queue.append(j)
 
+    def remove(self, j):
+        self._queue.remove(j)
+
     def pop(self):
         return self._queue.pop()
 
 
 class PriorityQueue(AbstractQueue):
-    """Priority queue, always popping the job with the highest priority.
+    """Priority queue, always popping the job with the lowest priority value.
 
-    Uses Job's priority() property (which defaults to 1) and a transparent
-    insert count to determine order of popping jobs. If jobs have the same
-    priority they will be served first-in-first-out."""
+    Uses Job's priority() property and a transparent insert count to
+    determine order of popping jobs: a job with priority 1 is started
+    before a job with priority 2. If jobs have the same priority they will
+    be served first-in-first-out."""
 
     def __init__(self):
         super(PriorityQueue, self).__init__()
-        from heapq import heappush, heappop
         self._queue = []
         self._insert_count = 0
 
@@ -184,13 +206,22 @@ class PriorityQueue(AbstractQueue):
         """Add a job to the queue. retrieve the priority from the job,
         add an autoincrement value for comparing jobs with identical
         priority."""
-        heappush(self._queue, (j.priority(), self._insert_count, j))
+        heapq.heappush(self._queue, (j.priority(), self._insert_count, j))
         self._insert_count += 1
 
+    def remove(self, j):
+        """Remove a job from the queue, keeping the heap order."""
+        for i, entry in enumerate(self._queue):
+            if entry[2] is j:
+                del self._queue[i]
+                heapq.heapify(self._queue)
+                return
+        raise ValueError("Job not in queue")
+
     def pop(self):
         """Return the correct part of the tuplet
         (1st: priority, 2nd: insert order)."""
-        return heappop(self._queue)[2]
+        return heapq.heappop(self._queue)[2]
 
 
 class JobQueueException(Exception):
@@ -292,6 +323,7 @@ class JobQueue(QObject):
         self._queue = queue_class()
         self._capacity = capacity
         self._runners = [Runner(self, i) for i in range(num_runners)]
+        self._retiring = [] # removed runners that still run a job
 
         if queue_mode == QueueMode.CONTINUOUS:
             self.start()
@@ -308,7 +340,7 @@ class JobQueue(QObject):
         self.set_queue_mode(QueueMode.SINGLE)
         self._queue.clear()
         if force:
-            for runner in self._runners:
+            for runner in self._runners + self._retiring:
                 if runner:
                     # ignore runners that have already been set to None
                     runner.abort()
@@ -327,7 +359,8 @@ class JobQueue(QObject):
         if self.state() in [QueueStatus.FINISHED, QueueStatus.ABORTED]:
             raise JobQueueStateException(
             _("Can't add job to finished/aborted queue."))
-        elif self.state() in [QueueStatus.INACTIVE, QueueStatus.PAUSED]:
+        job.set_queued(self)
+        if self.state() in [QueueStatus.INACTIVE, QueueStatus.PAUSED]:
             self._queue.push(job)
             self.job_added.emit(job)
         else:
@@ -362,7 +395,7 @@ class JobQueue(QObject):
 
     def is_idle(self):
         """Returns True if all Runners are idle."""
-        for runner in self._runners:
+        for runner in self._runners + self._retiring:
             if runner.is_running():
                 return False
         return True
@@ -388,8 +421,17 @@ class JobQueue(QObject):
         Manage behaviour at that point, depending on the
         queue's state and mode.
         """
+        if runner in self._retiring:
+            # the runner was removed by set_num_runners(), it has done its work
+            self._retiring.remove(runner)
+            if self.state() == QueueStatus.STARTED:
+                # other runners are busy with the remaining jobs
+                self.job_done.emit(job)
+                return
         if self.state() == QueueStatus.STARTED:
-            runner.start(self.pop())
+            j = self.pop()
+            runner.start(j)
+            self.job_started.emit(j)
         elif self.state() == QueueStatus.PAUSED:
             # If a SINGLE queue completes the last job while in PAUSE mode
             # it can be considered finished.
@@ -408,6 +450,28 @@ class JobQueue(QObject):
                 self.idle.emit()
         self.job_done.emit(job)
 
+    def num_runners(self):
+        """Return the number of runners."""
+        return len(self._runners)
+
+    def set_num_runners(self, num):
+        """Change the number of runners.
+
+        New runners immediately start with waiting jobs. Removed runners
+        are allowed to finish their running job, the queue is not idle
+        before they have.
+
+        """
+        while len(self._runners) < num:
+            runner = Runner(self, len(self._runners))
+            self._runners.append(runner)
+            if self.state() == QueueStatus.STARTED:
+                j = self.pop()
+                runner.start(j)
+                self.job_started.emit(j)
+        self._retiring.extend(r for r in self._runners[num:] if r.is_running())
+        del self._runners[num:]
+
     def pause(self):
         """Pauses the execution of the queue.
         Running jobs are allowed to finish, but no new jobs will be started.
@@ -434,6 +498,13 @@ class JobQueue(QObject):
             self.emptied.emit()
         return j
 
+    def remove_job(self, j):
+        """Remove a waiting job from the queue, e.g. when it is aborted."""
+        self._queue.remove(j)
+        if self._queue.empty() and self.state() == QueueStatus.STARTED:
+            self.set_state(QueueStatus.EMPTY)
+            self.emptied.emit()
+
     def queue_finished(self):
         """Called when the last job has been completed and the queue
         is in SINGLE mode."""
@@ -454,7 +525,7 @@ class JobQueue(QObject):
 
     def set_idle(self):
         """Set status to IDLE if all runners are in idle mode."""
-        for runner in self._runners:
+        for runner in self._runners + self._retiring:
             if runner.is_running():
                 return
         self.set_state(QueueStatus.IDLE)
@@ -511,18 +582,27 @@ class JobQueue(QObject):
 class GlobalJobQueue(QObject):
     """The application-wide Job Queue that dispatches jobs to runners
     and subordinate queues.
+
+    The engrave and generic queues run as many jobs in parallel as there
+    are CPU cores, unless the number is set in the preferences. Engrave
+    jobs the user started have priority over hidden (autocompile) jobs.
     """
 
+    # priority of hidden engrave jobs (lower numbers are started first);
+    # jobs the user started (e.g. LilyPondJob) have priority 2 or less
+    hidden_priority = 3
+
     def __init__(self):
-        self.load_settings()
+        super(GlobalJobQueue, self).__init__()
         self._crawler = JobQueue()
-        self._engraver = JobQueue()
+        self._engraver = JobQueue(queue_class=PriorityQueue)
         self._generic = JobQueue()
         self._queues = {
             'crawl': self._crawler,
             'engrave': self._engraver,
             'generic': self._generic
         }
+        self.load_settings()
         app.settingsChanged.connect(self.settings_changed)
         app.aboutToQuit.connect(self.about_to_quit)
 
@@ -539,12 +619,19 @@ class GlobalJobQueue(QObject):
         target_queue = self._queues.get(target, None)
         if not target_queue:
             raise ValueError(_("Invalid job queue target: {}".format(target)))
+        if target == 'engrave' and job.attributes.get(j).hidden:
+            j.set_priority(max(j.priority(), self.hidden_priority))
         target_queue.add_job(j)
 
     def load_settings(self):
-        #TODO: Load settings and create the JobQueues accordingly
-        pass
+        """Set the number of runners of the engrave and generic queues.
+
+        The setting 0 (default) means one runner per available CPU core.
+        """
+        num = QSettings().value("lilypond_settings/parallel_jobs", 0, int)
+        num = num or cpu_count()
+        self._engraver.set_num_runners(num)
+        self._generic.set_num_runners(num)
 
     def settings_changed(self):
-        #TODO: If multicore-related settings have changed update the queues
-        pass
+        self.load_settings()
@@ -0,0 +1,231 @@
+# This file is part of the Frescobaldi project, http://www.frescobaldi.org/
+#
+# Copyright (c) 2008 - 2014 by Wilbert Berendsen
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+# See http://www.gnu.org/licenses/ for more information.
+
+"""
+Warm LilyPond processes, that engrave documents without starting up again.
+
+Starting LilyPond (Guile and the init files) takes one or two seconds before
+any music is parsed. A warm LilyPond process is started with the command line
+of a job, but without the input file. It evaluates the server loop below
+(using -e), which reads the files to engrave from standard input, one per
+line, and writes a line to standard error after each file.
+
+LilyPond options and include paths can't be changed in a running process,
+so a warm process is only used for jobs with exactly the same command line
+and environment. The number of warm processes is read from the
+"lilypond_settings/warm_processes" setting; 0 (the default) disables them.
+
+"""
+
+
+from PyQt5.QtCore import (
+    QCoreApplication, QProcess, QProcessEnvironment, QSettings)
+
+import app
+from . import STDERR, STDOUT
+
+
+# The loop a warm LilyPond process runs. Every input line contains the
+# directory and the file name, separated by a tab.
+SERVER_LOOP = """(begin
+  (use-modules (ice-9 rdelim))
+  (let loop ((line (read-line)))
+    (if (not (eof-object? line))
+        (let* ((tab (string-index line #\\tab))
+               (failed (catch #t
+                         (lambda ()
+                           (chdir (substring line 0 tab))
+                           ((@@ (lily) lilypond-all) (list (substring line (1+ tab)))))
+                         (lambda args (list line)))))
+          (display (format #f "\\nfrescobaldi-server: done ~a\\n" (length failed))
+                   (current-error-port))
+          (force-output (current-error-port))
+          (loop (read-line)))))
+  (exit 0))"""
+
+# the line a warm process writes after each file, followed by the number of
+# failed files; it starts with a newline, which is not part of the job output
+DONE = b"\nfrescobaldi-server: done "
+
+# the maximum number of bytes of output kept while a process is idle
+IDLE_OUTPUT = 65536
+
+
+# all warm processes, least recently used first
+_servers = []
+
+
+def pool_size():
+    """Return the maximum number of warm LilyPond processes."""
+    return QSettings().value("lilypond_settings/warm_processes", 0, int)
+
+
+def acceptable(directory, filename):
+    """Return True if the file can be sent to a warm process."""
+    line = directory + filename
+    return line.isprintable() and '\t' not in line and all(ord(c) < 128 for c in line)
+
+
+def acquire(command, environment):
+    """Return an idle Server for the command line and environment, or None.
+
+    A new warm process is started if the pool is not full; if needed, the
+    least recently used idle process with another command line is stopped.
+    Returns None if warm processes are disabled or all are busy.
+
+    """
+    size = max(0, pool_size())
+    # stop the oldest idle processes if the pool size was reduced
+    idle = [server for server in _servers if server.is_idle()]
+    for server in idle[:max(0, len(_servers) - size)]:
+        server.stop()
+    if not size:
+        return
+    signature = (tuple(command), tuple(sorted(environment.items())))
+    for server in _servers:
+        if server.signature == signature and server.is_idle():
+            _servers.remove(server)
+            _servers.append(server)
+            return server
+    if len(_servers) >= size:
+        for server in _servers:
+            if server.is_idle():
+                server.stop()
+                break
+        else:
+            return
+    server = Server(signature, command, environment)
+    _servers.append(server)
+    return server
+
+
+def shutdown():
+    """Stop all warm processes."""
+    for server in _servers[:]:
+        server.stop()
+
+
+app.aboutToQuit.connect(shutdown)
+
+
+class Server(object):
+    """A warm LilyPond process, engraving one job at a time."""
+    def __init__(self, signature, command, environment):
+        self.signature = signature
+        self._job = None
+        self._buffer = b''
+        self._idle_output = []
+        self._process = p = QProcess(QCoreApplication.instance())
+        se = QProcessEnvironment.systemEnvironment()
+        for k, v in environment.items():
+            se.remove(k) if v is None else se.insert(k, v)
+        p.setProcessEnvironment(se)
+        p.readyReadStandardError.connect(self._readstderr)
+        p.readyReadStandardOutput.connect(self._readstdout)
+        p.finished.connect(self._finished)
+        p.error.connect(self._error)
+        p.start(command[0], command[1:] + ['-e', SERVER_LOOP])
+
+    def is_idle(self):
+        """Return True if the process is not engraving a job."""
+        return self._job is None
+
+    def run(self, job, directory, filename):
+        """Engrave the file for the job.
+
+        The output is added to the job, and the job's server_done() method is
+        called when the file has been engraved. If the process stops, the
+        job's server_failed() method is called.
+
+        """
+        self._job = job
+        # output written while idle, e.g. the LilyPond banner, goes to this job
+        output, self._idle_output = self._idle_output, []
+        for data, type in output:
+            self._forward(job, data, type)
+        self._process.write((directory + '\t' + filename + '\n').encode('ascii'))
+
+    def stop(self):
+        """Stop the process; a running job is aborted."""
+        if self in _servers:
+            _servers.remove(self)
+            self._process.finished.disconnect(self._finished)
+            self._process.error.disconnect(self._error)
+            self._process.kill()
+            self._process.deleteLater()
+        job, self._job = self._job, None
+        if job:
+            job.server_done(False)
+
+    def _finished(self, exitCode, exitStatus):
+        """(internal) Called when the process stops unexpectedly."""
+        if self in _servers:
+            _servers.remove(self)
+            self._process.deleteLater()
+        job, self._job = self._job, None
+        if job:
+            self._forward(job, self._buffer, STDERR)
+            job.server_failed()
+
+    def _error(self, error):
+        """(internal) Called when an error occurs, e.g. the process could not start."""
+        if self._process.state() == QProcess.NotRunning:
+            self._finished(-1, QProcess.CrashExit)
+
+    def _forward(self, job, data, type):
+        """(internal) Add output to the job."""
+        if data:
+            decoder = job.decoder_stderr if type == STDERR else job.decoder_stdout
+            job.message(decoder(data, job.decode_errors)[0], type)
+
+    def _output(self, data, type):
+        """(internal) Add output to the running job, or keep it for the next one."""
+        if self._job:
+            self._forward(self._job, data, type)
+        elif data:
+            self._idle_output.append((data, type))
+            while sum(len(d) for d, t in self._idle_output) > IDLE_OUTPUT:
+                del self._idle_output[0]
+
+    def _readstdout(self):
+        """(internal) Called when STDOUT can be read."""
+        self._output(bytes(self._process.readAllStandardOutput()), STDOUT)
+
+    def _readstderr(self):
+        """(internal) Called when STDERR can be read."""
+        data = self._buffer + bytes(self._process.readAllStandardError())
+        pos = data.find(DONE)
+        while pos != -1:
+            end = data.find(b'\n', pos + len(DONE))
+            if end == -1:
+                break
+            failed = data[pos+len(DONE):end].strip()
+            self._output(data[:pos], STDERR)
+            job, self._job = self._job, None
+            if job:
+                job.server_done(failed == b'0')
+            data = data[end+1:]
+            pos = data.find(DONE)
+        # keep the (start of the) done line, that may not be complete yet
+        if pos == -1:
+            pos = data.rfind(b'\n')
+            if pos == -1 or not DONE.startswith(data[pos:]):
+                pos = len(data)
+        data, self._buffer = data[:pos], data[pos:]
+        self._output(data, STDERR)
@@ -0,0 +1,155 @@
+# This file is part of the Frescobaldi project, http://www.frescobaldi.org/
+#
+# Copyright (c) 2008 - 2014 by Wilbert Berendsen
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+# See http://www.gnu.org/licenses/ for more information.
+
+"""
+Reads the textedit links of a PDF document in a background thread.
+
+The links of every page are read in sequence, and handed over to the
+main thread in batches, so the links are available progressively. When all
+pages are read, the links are stored on disk, under the key of the document
+(see qpopplerview.cache.setdocumentkey()), so reading the same PDF again
+is instant.
+
+"""
+
+
+import json
+import os
+import time
+
+from PyQt5.QtCore import QRectF, QStandardPaths, QThread, pyqtSignal
+
+import qpopplerview
+import qpopplerview.cache
+import textedit
+import util
+
+
+# maximum number of link files kept on disk
+maxfiles = 200
+
+# keep running threads alive
+_indexers = set()
+
+
+def index(document, callback):
+    """Reads the textedit links of the Poppler.Document.
+
+    The callback is called in the main thread with a list of
+    (filename, line, column, (pageNumber, linkArea)) tuples, possibly more
+    than once, while the links are being read. If the links were stored on
+    disk, the callback is called immediately, with all links at once.
+
+    """
+    key = qpopplerview.cache.documentkey(document)
+    links = key and load(key)
+    if links is not None:
+        callback(links)
+    else:
+        Indexer(document, key, callback)
+
+
+def directory():
+    """Returns the directory the links are stored in."""
+    return os.path.join(QStandardPaths.writableLocation(
+        QStandardPaths.CacheLocation), "links")
+
+
+def load(key):
+    """Returns the list of links stored under the key, or None."""
+    try:
+        with open(os.path.join(directory(), key + ".json"), encoding="utf-8") as f:
+            data = json.load(f)
+        return [(filename, line, column, (num, QRectF(x, y, w, h)))
+            for filename, line, column, num, x, y, w, h in data]
+    except (IOError, OSError, ValueError, TypeError):
+        return
+
+
+def save(key, links):
+    """Stores the list of links under the key."""
+    data = [(filename, line, column, num, area.x(), area.y(), area.width(), area.height())
+        for filename, line, column, (num, area) in links]
+    path = directory()
+    try:
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, key + ".json"), "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        # remove the oldest files
+        files = [os.path.join(path, name) for name in os.listdir(path)]
+        if len(files) > maxfiles:
+            files.sort(key=os.path.getmtime)
+            for filename in files[:-maxfiles]:
+                os.remove(filename)
+    except (IOError, OSError):
+        pass
+
+
+class Indexer(QThread):
+    """Reads the links of a document, one page at a time."""
+
+    # seconds between handing over the links to the main thread
+    interval = 0.25
+
+    linksFound = pyqtSignal(list)
+
+    def __init__(self, document, key, callback):
+        super(Indexer, self).__init__()
+        self.document = document
+        self.key = key
+        self.callback = callback
+        self.links = []
+        self.linksFound.connect(self.slotLinksFound)
+        self.finished.connect(self.slotFinished)
+        _indexers.add(self)
+        self.start()
+
+    def run(self):
+        """Main method of this thread, called by Qt on start()."""
+        import popplerqt5
+        document = self.document
+        batch = []
+        deadline = time.monotonic() + self.interval
+        for num in range(document.numPages()):
+            # lock one page at a time, so pages can be rendered in between
+            with qpopplerview.lock(document):
+                links = document.page(num).links()
+            for link in links:
+                if isinstance(link, popplerqt5.Poppler.LinkBrowse):
+                    t = textedit.link(link.url())
+                    if t:
+                        filename = util.normpath(t.filename)
+                        batch.append((filename, t.line, t.column, (num, link.linkArea())))
+            if batch and time.monotonic() > deadline:
+                self.linksFound.emit(batch)
+                batch = []
+                deadline = time.monotonic() + self.interval
+        if batch:
+            self.linksFound.emit(batch)
+
+    def slotLinksFound(self, links):
+        """Called in the main thread with a batch of links."""
+        self.links.extend(links)
+        self.callback(links)
+
+    def slotFinished(self):
+        """Called when the thread has completed."""
+        _indexers.discard(self)
+        if self.key:
+            save(self.key, self.links)
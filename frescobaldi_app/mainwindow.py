@@ -899,9 +899,39 @@ class MainWindow(QMainWindow):
         if ly.cursortools.select_block(cursor):
             self.currentView().setTextCursor(cursor.cursor())
 
+    def pdfViewWidget(self):
+        """Returns the music view or viewer that has the keyboard focus, if any."""
+        from musicview.widget import MusicView
+        from viewers.popplerwidget import AbstractPopplerWidget
+        w = QApplication.focusWidget()
+        while w:
+            if isinstance(w, (MusicView, AbstractPopplerWidget)):
+                return w
+            w = w.parentWidget()
+
     def find(self):
-        import search
-        search.Search.instance(self).find()
+        w = self.pdfViewWidget()
+        if w:
+            w.find()
+        else:
+            import search
+            search.Search.instance(self).find()
+
+    def findNext(self):
+        w = self.pdfViewWidget()
+        if w:
+            w.findNext()
+        else:
+            import search
+            search.Search.instance(self).findNext()
+
+    def findPrevious(self):
+        w = self.pdfViewWidget()
+        if w:
+            w.findPrevious()
+        else:
+            import search
+            search.Search.instance(self).findPrevious()
 
     def replace(self):
         import search
@@ -1054,6 +1084,8 @@ class MainWindow(QMainWindow):
         ac.edit_select_full_lines_up.triggered.connect(self.selectFullLinesUp)
         ac.edit_select_full_lines_down.triggered.connect(self.selectFullLinesDown)
         ac.edit_find.triggered.connect(self.find)
+        ac.edit_find_next.triggered.connect(self.findNext)
+        ac.edit_find_previous.triggered.connect(self.findPrevious)
         ac.edit_replace.triggered.connect(self.replace)
         ac.edit_preferences.triggered.connect(self.showPreferences)
         ac.view_next_document.triggered.connect(self.tabBar.nextDocument)
@@ -52,6 +52,7 @@ import qutil
 import panel
 import listmodel
 import gadgets.drag
+import popplerregistry
 
 from . import documents
 
@@ -309,7 +310,7 @@ class MusicViewPanel(panel.Panel):
             return
         rect = self.widget().view.surface().selectedPageRect(page)
         import copy2image
-        copy2image.copy_image(self, page, rect, documents.filename(page.document()))
+        copy2image.copy_image(self, page, rect, popplerregistry.filename(page.document()))
 
     def copyText(self):
         text = self.widget().view.surface().selectedText()
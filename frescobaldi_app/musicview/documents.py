@@ -23,24 +23,13 @@ Code to load and manage PDF documents to view.
 
 
 
-import os
-import weakref
-
-from PyQt5.QtCore import QByteArray, QSettings
-
-try:
-    import popplerqt5
-except ImportError:
-    popplerqt5 = None
+from PyQt5.QtCore import QSettings
 
 import app
 import plugin
 import resultfiles
 import signals
-import popplertools
-
-
-_cache = weakref.WeakValueDictionary()
+import popplerregistry
 
 
 # This signal gets emitted when a finished Job has created new PDF document(s).
@@ -58,45 +47,10 @@ def group(document):
     return DocumentGroup.instance(document)
 
 
-def load(filename):
-    """Returns a Poppler.Document for the given filename, caching it (weakly).
-
-    Returns None if the document failed to load.
-
-    """
-    mtime = os.path.getmtime(filename)
-    key = (mtime, filename)
-
-    try:
-        return _cache[key]
-    except KeyError:
-        with open(filename, 'rb') as f:
-            data = QByteArray(f.read())
-        doc = popplerqt5.Poppler.Document.loadFromData(data)
-        if doc:
-            _cache[key] = doc
-        return doc or None
-
-
-def filename(poppler_document):
-    """Returns the filename for the document if it was loaded via our cache."""
-    for (mtime, filename), doc in _cache.items():
-        if doc == poppler_document:
-            return filename
-
-
-class Document(popplertools.Document):
+class Document(popplerregistry.Document):
     """Represents a (lazily) loaded PDF document."""
     updated = True
 
-    def load(self):
-        return load(self.filename())
-
-    if popplerqt5 is None:
-        def document(self):
-            """Returns None because popplerqt5 is not available."""
-            return None
-
 
 class DocumentGroup(plugin.DocumentPlugin):
     """Represents a group of PDF documents, created by the text document it belongs to.
@@ -29,7 +29,7 @@ import weakref
 
 from PyQt5.QtCore import pyqtSignal, QPoint, QRect, Qt, QTimer, QUrl
 from PyQt5.QtGui import QCursor, QTextCharFormat
-from PyQt5.QtWidgets import QToolTip, QVBoxLayout, QWidget
+from PyQt5.QtWidgets import QInputDialog, QToolTip, QVBoxLayout, QWidget
 
 try:
     import popplerqt5
@@ -67,6 +67,7 @@ class MusicView(QWidget):
 
         self._highlightFormat = QTextCharFormat()
         self._highlightMusicFormat = Highlighter()
+        self._highlightFindFormat = Highlighter()
         self._highlightRange = None
         self._highlightTimer = QTimer(singleShot=True, interval= 250, timeout=self.updateHighlighting)
         self._highlightRemoveTimer = QTimer(singleShot=True, timeout=self.clearHighlighting)
@@ -87,6 +88,7 @@ class MusicView(QWidget):
         self.view.surface().linkLeft.connect(self.slotLinkLeft)
         self.view.surface().setShowUrlTips(False)
         self.view.surface().linkHelpRequested.connect(self.slotLinkHelpRequested)
+        self._finder = qpopplerview.Finder(self.view, self._highlightFindFormat)
 
         self.view.viewModeChanged.connect(self.updateZoomInfo)
         self.view.surface().pageLayout().scaleChanged.connect(self.updateZoomInfo)
@@ -127,6 +129,7 @@ class MusicView(QWidget):
         self._links = None
         self._highlightRange = None
         self._highlightTimer.stop()
+        self._finder.clear()
         self.view.clear()
 
     def readSettings(self):
@@ -134,6 +137,7 @@ class MusicView(QWidget):
         # background and highlight colors of music view
         colors = textformats.formatData('editor').baseColors
         self._highlightMusicFormat.setColor(colors['musichighlight'])
+        self._highlightFindFormat.setColor(colors['match'])
         color = colors['selectionbackground']
         color.setAlpha(128)
         self._highlightFormat.setBackground(color)
@@ -315,6 +319,23 @@ class MusicView(QWidget):
         rect.setSize(rect.size().boundedTo(self.view.viewport().size()))
         return rect
 
+    def find(self):
+        """Asks for a text and highlights all its occurrences in the document."""
+        if not self._currentDocument:
+            return
+        text, ok = QInputDialog.getText(self, app.caption(_("Find")),
+            _("Search for:"), text=self._finder.text())
+        if ok:
+            self._finder.find(text)
+
+    def findNext(self):
+        """Scrolls to the next occurrence of the text searched for."""
+        self._finder.findNext()
+
+    def findPrevious(self):
+        """Scrolls to the previous occurrence of the text searched for."""
+        self._finder.findPrevious()
+
     def showContextMenu(self):
         """Called when the user right-clicks or presses the context menu key."""
         pos = self.view.mapToGlobal(QPoint(0, 0))
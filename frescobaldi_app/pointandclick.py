@@ -68,6 +68,28 @@ class Links(object):
         app.documentLoaded.connect(self.slotDocumentLoaded)
         app.documentClosed.connect(self.slotDocumentClosed)
 
+    def add_links(self, links):
+        """Add many links at once, also after finish() has been called.
+
+        links is an iterable of (filename, line, column, destination) tuples.
+        Cursors for the new positions are added to already bound documents.
+
+        """
+        new = collections.defaultdict(list)
+        for filename, line, column, destination in links:
+            dests = self._links[filename][(line, column)]
+            if not dests:
+                new[filename].append((line, column))
+            dests.append(destination)
+        for filename, positions in new.items():
+            bound = self._docs.get(filename)
+            if bound:
+                bound.add(positions, self._links[filename])
+            else:
+                d = scratchdir.findDocument(filename)
+                if d:
+                    self.bind(filename, d)
+
     def __enter__(self):
         return self
 
@@ -142,6 +164,39 @@ class BoundLinks(object):
                 cursors.append(c)
                 destinations.append(dest)
 
+    def add(self, positions, links):
+        """Adds cursors for the (line, column) positions, not yet bound.
+
+        links is the mapping from (line, column) to the destinations list.
+        The cursors are inserted at their place in the sorted list.
+
+        """
+        doc = self.document
+        cursors = self._cursors
+        for pos in positions:
+            if pos in self._cursor_dict:
+                continue
+            line, column = pos
+            b = doc.findBlockByNumber(line - 1)
+            if b.isValid():
+                c = self._cursor_dict[pos] = QTextCursor(doc)
+                c.setPosition(b.position() + column)
+                index = self._bisect(c.position())
+                cursors.insert(index, c)
+                self._destinations.insert(index, links[pos])
+
+    def _bisect(self, pos):
+        """(Internal) Returns the index after the cursors at or before pos."""
+        cursors = self._cursors
+        lo, hi = 0, len(cursors)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if pos < cursors[mid].position():
+                hi = mid
+            else:
+                lo = mid + 1
+        return lo
+
     def cursor(self, line, column):
         """Returns the QTextCursor for the give line/col."""
         return self._cursor_dict.get((line, column))
@@ -178,15 +233,7 @@ class BoundLinks(object):
         cursors = self._cursors
 
         def findlink(pos):
-            # binary search in list of cursors
-            lo, hi = 0, len(cursors)
-            while lo < hi:
-                mid = (lo + hi) // 2
-                if pos < cursors[mid].position():
-                    hi = mid
-                else:
-                    lo = mid + 1
-            return lo - 1
+            return self._bisect(pos) - 1
 
         if cursor.hasSelection():
             end = findlink(cursor.selectionEnd() - 1)
@@ -48,12 +48,15 @@ import qpopplerview.printer
 _printers = weakref.WeakKeyDictionary()
 
 
-def print_(doc, filename=None, widget=None):
+def print_(doc, filename=None, widget=None, filestat=None):
     """Prints the popplerqt5.Poppler.Document.
 
     The filename is used in the dialog and print job name.
     If the filename is not given, it defaults to a translation of "PDF Document".
     The widget is a widget to use as parent for the print dialog etc.
+    The filestat is the (size, mtime_ns) of the file when the document was
+    loaded, if given the pages are rendered in parallel from the file as
+    long as it is unchanged.
 
     """
     # Decide how we will print.
@@ -64,6 +67,7 @@ def print_(doc, filename=None, widget=None):
     cmd = s.value("printcommand", "", str)
     use_dialog = s.value("printcommand/dialog", False, bool)
     resolution = s.value("printcommand/dpi", 300, int)
+    max_images = s.value("printcommand/max_images", 4, int)
     linux_lpr = False
 
     if os.name != 'nt' and not sys.platform.startswith('darwin'):
@@ -140,8 +144,11 @@ def print_(doc, filename=None, widget=None):
 
         p = Printer()
         p.setDocument(doc)
+        if filename:
+            p.setFilename(filename, filestat)
         p.setPrinter(printer)
         p.setResolution(resolution)
+        p.setMaxImages(max_images)
 
         d = QProgressDialog()
         d.setModal(True)
@@ -154,6 +161,11 @@ def print_(doc, filename=None, widget=None):
             d.setLabelText(_("Printing page {page} ({num} of {total})...").format(
                 page=page, num=num, total=total))
 
+        def remaining(seconds):
+            if seconds >= 1:
+                d.setLabelText(d.labelText() + "\n" + _(
+                    "About {seconds} seconds remaining.").format(seconds=round(seconds)))
+
         def finished():
             p.deleteLater()
             d.deleteLater()
@@ -164,12 +176,14 @@ def print_(doc, filename=None, widget=None):
 
         p.finished.connect(finished)
         p.printing.connect(progress)
+        p.timeRemaining.connect(remaining)
         p.start()
 
 
 class Printer(QThread, qpopplerview.printer.Printer):
     """Simple wrapper that prints the raster images in a background thread."""
     printing = pyqtSignal(int, int, int)
+    timeRemaining = pyqtSignal(float)
 
     def __init__(self, parent=None):
         QThread.__init__(self, parent)
@@ -182,6 +196,9 @@ class Printer(QThread, qpopplerview.printer.Printer):
     def progress(self, num, total, page):
         self.printing.emit(num, total, page)
 
+    def remaining(self, seconds):
+        self.timeRemaining.emit(seconds)
+
 
 def printDocument(document, widget=None):
     """Prints the document described by the popplertools.Document.
@@ -189,6 +206,7 @@ def printDocument(document, widget=None):
     The widget is a widget to use as parent for the print dialog etc.
 
     """
-    print_(document.document(), document.filename(), widget)
+    doc = document.document()
+    print_(doc, document.filename(), widget, document.fileStat())
 
 
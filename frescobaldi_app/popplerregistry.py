@@ -0,0 +1,189 @@
+# This file is part of the Frescobaldi project, http://www.frescobaldi.org/
+#
+# Copyright (c) 2008 - 2014 by Wilbert Berendsen
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+# See http://www.gnu.org/licenses/ for more information.
+
+"""
+A process-wide registry of the PDF documents shown in the viewers.
+
+The music view and the viewers load their PDF documents via this module, so
+a PDF file that is shown in more than one panel is only parsed once. Because
+the rendered pages (see qpopplerview.cache) and the point and click links
+(see links()) are stored per Poppler.Document, they are shared as well.
+
+Documents are registered under their file path, modification time and size.
+The Document objects using a Poppler.Document are counted; the registry keeps
+a Poppler.Document alive as long as it is in use.
+
+"""
+
+
+import hashlib
+import os
+import weakref
+
+from PyQt5.QtCore import QByteArray
+
+try:
+    import popplerqt5
+except ImportError:
+    popplerqt5 = None
+
+import qpopplerview.cache
+import linkindex
+import pointandclick
+import popplertools
+import textedit
+import util
+
+
+# all loaded Poppler documents, by (filename, mtime, size)
+_documents = weakref.WeakValueDictionary()
+
+# the filename of every loaded Poppler document
+_filenames = weakref.WeakKeyDictionary()
+
+# the number of Document objects using a Poppler document
+_refcounts = {}
+
+# point and click handlers for Poppler documents
+_links = weakref.WeakKeyDictionary()
+
+
+def load(filename):
+    """Returns a Poppler.Document for the given filename, sharing it.
+
+    Returns None if the document failed to load.
+
+    """
+    st = os.stat(filename)
+    key = (filename, st.st_mtime, st.st_size)
+
+    try:
+        return _documents[key]
+    except KeyError:
+        with open(filename, 'rb') as f:
+            data = f.read()
+        doc = popplerqt5.Poppler.Document.loadFromData(QByteArray(data))
+        if doc:
+            _documents[key] = doc
+            _filenames[doc] = filename
+            qpopplerview.cache.setdocumentkey(doc, hashlib.sha1(data).hexdigest())
+        return doc or None
+
+
+def filename(poppler_document):
+    """Returns the filename for the document if it was loaded via load()."""
+    return _filenames.get(poppler_document)
+
+
+def acquire(poppler_document):
+    """Registers a user of the Poppler.Document, keeping it alive."""
+    _refcounts[poppler_document] = _refcounts.get(poppler_document, 0) + 1
+
+
+def release(poppler_document):
+    """Unregisters a user of the Poppler.Document."""
+    count = _refcounts.pop(poppler_document, 0) - 1
+    if count > 0:
+        _refcounts[poppler_document] = count
+
+
+def users(poppler_document):
+    """Returns the number of Document objects using the Poppler.Document."""
+    return _refcounts.get(poppler_document, 0)
+
+
+def documents():
+    """Returns a list of (filename, Poppler.Document, users) for the documents in use."""
+    return [(filename(doc), doc, count) for doc, count in _refcounts.items()]
+
+
+def links(poppler_document):
+    """Returns the Links of the Poppler document.
+
+    The links are read in the background, see the linkindex module, and
+    become available while the pages are read.
+
+    """
+    try:
+        return _links[poppler_document]
+    except KeyError:
+        l = _links[poppler_document] = Links()
+        l.finish()
+        linkindex.index(poppler_document, l.add_links)
+        return l
+
+
+class Links(pointandclick.Links):
+    """Stores all the links of a Poppler document sorted by URL and text position.
+
+    Only textedit:// urls are stored.
+
+    """
+    def cursor(self, link, load=False):
+        """Returns the destination of a link as a QTextCursor of the destination document.
+
+        If load (defaulting to False) is True, the document is loaded if it is not yet loaded.
+        Returns None if the url was not valid or the document could not be loaded.
+
+        """
+        if not isinstance(link, popplerqt5.Poppler.LinkBrowse) or not link.url():
+            return
+        t = textedit.link(link.url())
+        if t:
+            filename = util.normpath(t.filename)
+            return super(Links, self).cursor(filename, t.line, t.column, load)
+
+
+class Document(popplertools.Document):
+    """A (lazily) loaded PDF document, sharing its Poppler.Document.
+
+    While the Poppler.Document is loaded, this object is counted as one of its
+    users. It is released when the document is unloaded or replaced, or when
+    this object is garbage collected.
+
+    """
+    _finalizer = None
+
+    def load(self):
+        doc = load(self.filename())
+        old = self._document
+        if doc is not old:
+            if doc and old and filename(old) == self.filename():
+                # the file was recompiled, reuse what is unchanged
+                qpopplerview.cache.carryover(old, doc)
+            self._release()
+            if doc:
+                acquire(doc)
+                self._finalizer = weakref.finalize(self, release, doc)
+        return doc
+
+    def unload(self):
+        self._release()
+        super(Document, self).unload()
+
+    def _release(self):
+        """(Internal) Releases the Poppler.Document we use."""
+        if self._finalizer:
+            self._finalizer()
+            self._finalizer = None
+
+    if popplerqt5 is None:
+        def document(self):
+            """Returns None because popplerqt5 is not available."""
+            return None
@@ -19,9 +19,123 @@
 
 """
 Some useful tools dealing with popplerqt5 (PDF) documents.
+
+The loaded Documents form a working set. When the estimated memory usage of
+the working set exceeds the budget (see setbudget()), the least recently
+used Documents release their PDF document, and with it the images and links
+that are cached for it. They are reloaded transparently on the next access.
+
 """
 
+import collections
 import os
+import time
+import weakref
+
+
+# the loaded Documents, least recently used first
+_working_set = collections.OrderedDict()
+
+# memory budget of the working set in bytes
+_budget = 268435456 # 256M
+
+# the size of the image cache at the last trim(), see _cachegrown()
+_cachesize = 0
+
+
+def setbudget(budget):
+    """Sets the memory budget of the working set in bytes, unloading if needed."""
+    global _budget
+    _budget = budget
+    trim()
+
+
+def budget():
+    """Returns the memory budget of the working set in bytes."""
+    return _budget
+
+
+def resident():
+    """Returns a list of (Document, bytes) tuples for the loaded Documents.
+
+    The least recently used Document comes first. The byte count is an
+    estimate: the size of the PDF file plus the size of its cached images.
+    A PDF document shared by more Documents is only counted for the most
+    recently used one.
+
+    """
+    try:
+        import qpopplerview.cache
+    except ImportError:
+        sizes = {}
+    else:
+        sizes = qpopplerview.cache.documentsizes()
+    result = []
+    counted = set()
+    for ref in reversed(list(_working_set.values())):
+        doc = ref()
+        if doc is not None and doc._document is not None:
+            if id(doc._document) in counted:
+                size = 0
+            else:
+                counted.add(id(doc._document))
+                size = doc._filesize + sizes.get(doc._document, 0)
+            result.append((doc, size))
+    result.reverse()
+    return result
+
+
+def trim(keep=None):
+    """Unloads the least recently used Documents until the budget is met.
+
+    The Document keep, if given, is not unloaded. Neither are Documents whose
+    PDF document is shown in a layout, because unloading them would not free
+    any memory.
+
+    """
+    global _cachesize
+    _cachesize = _imagecachesize()
+    documents = resident()
+    total = sum(size for doc, size in documents)
+    if total <= _budget:
+        return
+    try:
+        import qpopplerview.layout
+    except ImportError:
+        shown = set()
+    else:
+        shown = qpopplerview.layout.documents()
+    for doc, size in documents:
+        if total <= _budget:
+            break
+        if doc is not keep and doc._document not in shown:
+            doc.unload()
+            total -= size
+
+
+def _imagecachesize():
+    """(Internal) Returns the size of the qpopplerview image cache in MB, 0 if not available."""
+    try:
+        import qpopplerview.cache
+    except ImportError:
+        return 0
+    return qpopplerview.cache.currentsize()
+
+
+def _cachegrown():
+    """(Internal) Returns True if the image cache has grown since the last trim()."""
+    return _imagecachesize() > _cachesize
+
+
+def _touch(document):
+    """(Internal) Marks the Document as the most recently used."""
+    key = id(document)
+    if key in _working_set:
+        _working_set.move_to_end(key)
+    else:
+        _working_set[key] = weakref.ref(document,
+            lambda ref: _working_set.pop(key, None))
+    document._lastaccess = time.time()
 
 
 class Document(object):
@@ -30,6 +144,9 @@ class Document(object):
         self._filename = filename
         self._document = None
         self._dirty = True
+        self._filesize = 0
+        self._filestat = None
+        self._lastaccess = 0
 
     def filename(self):
         """Returns the filename, set on init or via setFilename()."""
@@ -54,11 +171,47 @@ class Document(object):
         Can return None, in case the document failed to load.
 
         """
+        loaded = self._dirty
         if self._dirty:
+            # stat before loading, so a file changed meanwhile is not trusted
+            try:
+                st = os.stat(self._filename)
+            except (IOError, OSError):
+                self._filesize = 0
+                self._filestat = None
+            else:
+                self._filesize = st.st_size
+                self._filestat = (st.st_size, st.st_mtime_ns)
             self._document = self.load()
             self._dirty = False
+        if self._document is not None:
+            _touch(self)
+            # only a new document or more cached images can exceed the budget
+            if loaded or _cachegrown():
+                trim(self)
         return self._document
 
+    def fileStat(self):
+        """Returns (size, mtime_ns) of the file when the PDF document was loaded.
+
+        Returns None if the document is not loaded or the file could not be
+        read.
+
+        """
+        if not self._dirty:
+            return self._filestat
+
+    def unload(self):
+        """Releases the PDF document, it will be reloaded next time it is requested."""
+        if self._document is not None:
+            self._document = None
+            self._dirty = True
+        _working_set.pop(id(self), None)
+
+    def idleTime(self):
+        """Returns the number of seconds since the PDF document was last requested."""
+        return time.time() - self._lastaccess
+
     def load(self):
         """Should load and return the popplerqt5 Document for our filename."""
         try:
@@ -25,9 +25,12 @@ This is used throughout Frescobaldi, to obey color settings etc.
 """
 
 
-from PyQt5.QtCore import QSettings
+import os
+
+from PyQt5.QtCore import QSettings, QStandardPaths
 
 import app
+import popplertools
 import textformats
 import qpopplerview
 
@@ -46,6 +49,42 @@ _setbackground()
 qpopplerview.cache.options().setOversampleThreshold(96)
 
 
+# persistent cache of rendered pages, so reopened documents display instantly
+def _setdiskcache():
+    size = QSettings().value("musicview/disk_cache_size", 500, int) * 1048576
+    diskcache = qpopplerview.cache.diskcache()
+    if not size:
+        qpopplerview.cache.setdiskcache(None)
+    elif diskcache:
+        diskcache.setmaxsize(size)
+    else:
+        path = os.path.join(QStandardPaths.writableLocation(
+            QStandardPaths.CacheLocation), "pages")
+        qpopplerview.cache.setdiskcache(
+            qpopplerview.diskcache.DiskCache(path, size))
+
+app.settingsChanged.connect(_setdiskcache)
+_setdiskcache()
+
+
+# store black-and-white pages in a quarter of the memory
+def _setcompact():
+    qpopplerview.cache.setcompact(
+        QSettings().value("musicview/compact_images", False, bool))
+
+app.settingsChanged.connect(_setcompact)
+_setcompact()
+
+
+# release PDF documents that were not viewed recently
+def _setbudget():
+    popplertools.setbudget(
+        QSettings().value("musicview/document_memory", 256, int) * 1048576)
+
+app.settingsChanged.connect(_setbudget)
+_setbudget()
+
+
 class View(qpopplerview.View):
     def __init__(self, parent=None):
         super(View, self).__init__(parent)
@@ -24,8 +24,8 @@ Helper application preferences.
 
 from PyQt5.QtCore import QSettings
 from PyQt5.QtWidgets import (
-    QCheckBox, QComboBox, QFileDialog, QGridLayout, QLabel, QVBoxLayout,
-    QWidget)
+    QCheckBox, QComboBox, QFileDialog, QGridLayout, QLabel, QSpinBox,
+    QVBoxLayout, QWidget)
 
 import app
 import util
@@ -126,6 +126,9 @@ class Printing(preferences.Group):
         self.resolution = QComboBox(editable=True, editTextChanged=page.changed)
         self.resolution.addItems("300 600 1200".split())
         self.resolution.lineEdit().setInputMask("9000")
+        self.maxImagesLabel = QLabel()
+        self.maxImages = QSpinBox(minimum=1, maximum=64, valueChanged=page.changed)
+        self.maxImagesLabel.setBuddy(self.maxImages)
 
         layout.addWidget(self.messageLabel, 0, 0, 1, 2)
         layout.addWidget(self.printCommandLabel, 1, 0)
@@ -133,6 +136,8 @@ class Printing(preferences.Group):
         layout.addWidget(self.printDialogCheck, 2, 0, 1, 2)
         layout.addWidget(self.resolutionLabel, 3, 0)
         layout.addWidget(self.resolution, 3, 1)
+        layout.addWidget(self.maxImagesLabel, 4, 0)
+        layout.addWidget(self.maxImages, 4, 1)
 
         app.translateUI(self)
 
@@ -159,6 +164,10 @@ class Printing(preferences.Group):
         self.resolutionLabel.setText(_("Resolution:"))
         self.resolution.setToolTip(_(
             "Set the resolution if Frescobaldi prints using raster images."))
+        self.maxImagesLabel.setText(_("Pages in memory:"))
+        self.maxImages.setToolTip(_(
+            "The maximum number of pages that are rendered ahead\n"
+            "if Frescobaldi prints using raster images."))
 
     def loadSettings(self):
         s = QSettings()
@@ -167,6 +176,8 @@ class Printing(preferences.Group):
         self.printDialogCheck.setChecked(s.value("printcommand/dialog", False, bool))
         with qutil.signalsBlocked(self.resolution):
             self.resolution.setEditText(format(s.value("printcommand/dpi", 300, int)))
+        with qutil.signalsBlocked(self.maxImages):
+            self.maxImages.setValue(s.value("printcommand/max_images", 4, int))
 
     def saveSettings(self):
         s= QSettings()
@@ -174,5 +185,6 @@ class Printing(preferences.Group):
         s.setValue("printcommand", self.printCommand.path())
         s.setValue("printcommand/dialog", self.printDialogCheck.isChecked())
         s.setValue("printcommand/dpi", int(self.resolution.currentText()))
+        s.setValue("printcommand/max_images", self.maxImages.value())
 
 
@@ -29,7 +29,7 @@ from PyQt5.QtCore import QSettings, Qt
 from PyQt5.QtWidgets import (
     QAbstractItemView, QCheckBox, QDialog, QDialogButtonBox, QFileDialog,
     QGridLayout, QHBoxLayout, QLabel, QLineEdit, QListWidgetItem,
-    QPushButton, QRadioButton, QTabWidget, QVBoxLayout, QWidget)
+    QPushButton, QRadioButton, QSpinBox, QTabWidget, QVBoxLayout, QWidget)
 
 import app
 import userguide
@@ -307,12 +307,25 @@ class Running(preferences.Group):
         self.include = widgets.listedit.FilePathEdit()
         self.include.listBox.setDragDropMode(QAbstractItemView.InternalMove)
         self.include.changed.connect(self.changed)
+        self.parallelJobsLabel = QLabel()
+        self.parallelJobs = QSpinBox(minimum=0, maximum=64, valueChanged=self.changed)
+        self.parallelJobsLabel.setBuddy(self.parallelJobs)
+        self.warmProcessesLabel = QLabel()
+        self.warmProcesses = QSpinBox(minimum=0, maximum=16, valueChanged=self.changed)
+        self.warmProcessesLabel.setBuddy(self.warmProcesses)
         layout.addWidget(self.saveDocument)
         layout.addWidget(self.deleteFiles)
         layout.addWidget(self.embedSourceCode)
         layout.addWidget(self.noTranslation)
         layout.addWidget(self.includeLabel)
         layout.addWidget(self.include)
+        grid = QGridLayout()
+        grid.addWidget(self.parallelJobsLabel, 0, 0)
+        grid.addWidget(self.parallelJobs, 0, 1)
+        grid.addWidget(self.warmProcessesLabel, 1, 0)
+        grid.addWidget(self.warmProcesses, 1, 1)
+        grid.setColumnStretch(2, 1)
+        layout.addLayout(grid)
         app.translateUI(self)
 
     def translateUI(self):
@@ -334,6 +347,17 @@ class Running(preferences.Group):
             "If checked, LilyPond's output messages will be in English.\n"
             "This can be useful for bug reports."))
         self.includeLabel.setText(_("LilyPond include path:"))
+        self.parallelJobsLabel.setText(_("Parallel jobs:"))
+        self.parallelJobs.setSpecialValueText(_("Automatic"))
+        self.parallelJobs.setToolTip(_(
+            "The number of documents that can be engraved at the same time.\n"
+            "Automatic uses one job per processor core."))
+        self.warmProcessesLabel.setText(_("Warm LilyPond processes:"))
+        self.warmProcesses.setSpecialValueText(_("None"))
+        self.warmProcesses.setToolTip(_(
+            "The number of LilyPond processes that are kept running to engrave\n"
+            "documents without starting up again. A warm process is only used\n"
+            "for a job with the same LilyPond version and options."))
 
     def loadSettings(self):
         s = settings()
@@ -343,6 +367,8 @@ class Running(preferences.Group):
         self.noTranslation.setChecked(s.value("no_translation", False, bool))
         include_path = qsettings.get_string_list(s, "include_path")
         self.include.setValue(include_path)
+        self.parallelJobs.setValue(s.value("parallel_jobs", 0, int))
+        self.warmProcesses.setValue(s.value("warm_processes", 0, int))
 
     def saveSettings(self):
         s = settings()
@@ -351,6 +377,8 @@ class Running(preferences.Group):
         s.setValue("embed_source_code", self.embedSourceCode.isChecked())
         s.setValue("no_translation", self.noTranslation.isChecked())
         s.setValue("include_path", self.include.value())
+        s.setValue("parallel_jobs", self.parallelJobs.value())
+        s.setValue("warm_processes", self.warmProcesses.value())
 
 
 class Target(preferences.Group):
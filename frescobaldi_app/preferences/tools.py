@@ -159,6 +159,24 @@ class MusicView(preferences.Group):
         layout.addWidget(self.enableKineticScrolling)
         self.showScrollbars = QCheckBox(toggled=self.changed)
         layout.addWidget(self.showScrollbars)
+        self.compactImages = QCheckBox(toggled=self.changed)
+        layout.addWidget(self.compactImages, layout.rowCount(), 0, 1, 3)
+
+        self.diskCacheLabel = QLabel()
+        self.diskCacheSize = QSpinBox(minimum=0, maximum=100000, singleStep=100,
+                                      valueChanged=self.changed)
+        self.diskCacheLabel.setBuddy(self.diskCacheSize)
+        row = layout.rowCount()
+        layout.addWidget(self.diskCacheLabel, row, 0)
+        layout.addWidget(self.diskCacheSize, row, 1)
+
+        self.documentMemoryLabel = QLabel()
+        self.documentMemory = QSpinBox(minimum=16, maximum=16384, singleStep=64,
+                                       valueChanged=self.changed)
+        self.documentMemoryLabel.setBuddy(self.documentMemory)
+        row = layout.rowCount()
+        layout.addWidget(self.documentMemoryLabel, row, 0)
+        layout.addWidget(self.documentMemory, row, 1)
         app.translateUI(self)
 
     def translateUI(self):
@@ -179,6 +197,22 @@ class MusicView(preferences.Group):
         # L10N: "Kinetic Scrolling" is a checkbox label, as in "Enable Kinetic Scrolling"
         self.enableKineticScrolling.setText(_("Kinetic Scrolling"))
         self.showScrollbars.setText(_("Show Scrollbars"))
+        self.compactImages.setText(_("Store black-and-white pages compactly"))
+        self.compactImages.setToolTip(_(
+            "If checked, pages that only contain black, white and gray are kept\n"
+            "in memory as grayscale images, which use a quarter of the memory."))
+        self.diskCacheLabel.setText(_("Page cache on disk:"))
+        self.diskCacheLabel.setToolTip(_(
+            "The maximum size of the cache of rendered pages on disk,\n"
+            "which makes reopened documents display instantly."))
+        self.diskCacheSize.setSpecialValueText(_("Disabled"))
+        # L10N: as in "500 MB", appended after number in spinbox, note the leading space
+        self.diskCacheSize.setSuffix(_(" MB"))
+        self.documentMemoryLabel.setText(_("Memory for PDF documents:"))
+        self.documentMemoryLabel.setToolTip(_(
+            "When the loaded PDF documents and their rendered pages use more\n"
+            "memory, the documents that were not viewed recently are released."))
+        self.documentMemory.setSuffix(_(" MB"))
 
     def loadSettings(self):
         s = popplerview.MagnifierSettings.load()
@@ -193,6 +227,9 @@ class MusicView(preferences.Group):
         self.enableKineticScrolling.setChecked(kineticScrollingActive)
         showScrollbars = s.value("show_scrollbars", True, bool)
         self.showScrollbars.setChecked(showScrollbars)
+        self.compactImages.setChecked(s.value("compact_images", False, bool))
+        self.diskCacheSize.setValue(s.value("disk_cache_size", 500, int))
+        self.documentMemory.setValue(s.value("document_memory", 256, int))
 
     def saveSettings(self):
         s = popplerview.MagnifierSettings()
@@ -205,6 +242,9 @@ class MusicView(preferences.Group):
         s.setValue("newer_files_only", self.newerFilesOnly.isChecked())
         s.setValue("kinetic_scrolling", self.enableKineticScrolling.isChecked())
         s.setValue("show_scrollbars", self.showScrollbars.isChecked())
+        s.setValue("compact_images", self.compactImages.isChecked())
+        s.setValue("disk_cache_size", self.diskCacheSize.value())
+        s.setValue("document_memory", self.documentMemory.value())
 
 
 class CharMap(preferences.Group):
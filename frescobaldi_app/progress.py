@@ -67,9 +67,15 @@ class ProgressBar(plugin.ViewSpacePlugin):
             self._bar.stop(False)
 
     def jobStarted(self, document, job):
+        if job.is_queued():
+            # show the progress when the job leaves the queue
+            job.started.connect(self.jobProcessStarted)
         if document == self.viewSpace().document():
             self.showProgress(document)
 
+    def jobProcessStarted(self):
+        self.showProgress(self.viewSpace().document())
+
     def jobFinished(self, document, j, success):
         if document == self.viewSpace().document():
             self._bar.stop(success and not job.attributes.get(j).hidden)
@@ -21,15 +21,54 @@
 Cache logic.
 """
 
+import bisect
+import collections
 import weakref
-import time
 
 
 class ImageEntry:
-    def __init__(self, image):
+    def __init__(self, image, groupref, page, size, tile):
         self.image = image
         self.bcount = image.byteCount()
-        self.time = time.time()
+        self.groupref = groupref
+        self.page = page
+        self.size = size
+        self.tile = tile
+
+
+class Histogram:
+    """Counts durations (in seconds) in buckets of increasing size.
+
+    The upper bounds of the buckets are in the bounds attribute; the last
+    bucket counts all durations longer than the last bound.
+
+    """
+    bounds = (0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0)
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        """Forget all durations."""
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+
+    def add(self, duration):
+        """Count a duration."""
+        self.counts[bisect.bisect_left(self.bounds, duration)] += 1
+        self.count += 1
+        self.total += duration
+        self.maximum = max(self.maximum, duration)
+
+    def mean(self):
+        """Return the mean duration, 0.0 if nothing was counted."""
+        return self.total / self.count if self.count else 0.0
+
+    def buckets(self):
+        """Yield (bound, count) tuples; bound is None for the last bucket."""
+        return zip(self.bounds + (None,), self.counts)
 
 
 class ImageCache:
@@ -37,93 +76,255 @@ class ImageCache:
 
     Store and retrieve them under a key (see render.Renderer.key()).
 
+    Every image is a tile (see render.tile_key) of the page at the size
+    specified in the key, so only the parts of a page that are actually
+    displayed need to be rendered and kept in memory.
+
+    The least recently used images are removed when the cache grows beyond
+    maxsize, but the images of the smallest size of every page are kept as
+    long as possible, so there is always something to display while a page
+    is being rendered. Storing, retrieving and removing an image take
+    constant time.
+
+    The hits, misses, interimHits and evictions attributes count how the
+    cache performs, use resetStatistics() to set them to zero.
 
     """
     maxsize = 104857600 # 100M
     currentsize = 0
 
+    # statistics
+    hits = 0
+    misses = 0
+    interimHits = 0
+    evictions = 0
+
     def __init__(self):
         self._cache = weakref.WeakKeyDictionary()
+        # for every page the sorted list of sizes in _cache
+        self._sizes = weakref.WeakKeyDictionary()
+        self._grouprefs = weakref.WeakKeyDictionary()
+        # entries, least recently used first
+        self._lru = collections.OrderedDict()
+        # entries of the smallest size of their page, evicted last
+        self._spare = collections.OrderedDict()
 
     def clear(self):
         """Remove all cached images."""
         self._cache.clear()
+        self._sizes.clear()
+        self._lru.clear()
+        self._spare.clear()
+        self.currentsize = 0
+
+    def resetStatistics(self):
+        """Set the hits, misses, interimHits and evictions counters to zero."""
+        self.hits = self.misses = self.interimHits = self.evictions = 0
+
+    def groupSizes(self):
+        """Return a dictionary mapping the groups to the bytes their images use."""
+        sizes = {}
+        for d in self._lru, self._spare:
+            for entry in d:
+                group = entry.groupref()
+                if group is not None:
+                    sizes[group] = sizes.get(group, 0) + entry.bcount
+        return sizes
 
     def __getitem__(self, key):
-        """Retrieve the exact image.
+        """Retrieve the tiles that are available for the exact size.
+
+        Returns a dictionary mapping the tile_key to the image.
+        Raises a KeyError when there are no cached tiles for the key.
 
-        Raises a KeyError when there is no cached image for the key.
+        """
+        try:
+            tiles = self._cache[key.group][key.page][key.size]
+        except KeyError:
+            self.misses += 1
+            raise
+        self.hits += 1
+        for entry in tiles.values():
+            self._touch(entry)
+        return {tile: entry.image for tile, entry in tiles.items()}
+
+    def peek(self, key):
+        """Return the tiles that are available for the exact size, or None.
+
+        Unlike __getitem__(), this does not count in the statistics and does
+        not mark the images as recently used.
 
         """
-        return self._cache[key.group][key.page][key.size].image
+        try:
+            tiles = self._cache[key.group][key.page][key.size]
+        except KeyError:
+            return
+        return {tile: entry.image for tile, entry in tiles.items()}
 
-    def __setitem__(self, key, image):
-        """Store the image.
+    def addtile(self, key, tile, image):
+        """Store the image for the tile of the page specified by the key.
 
-        Automatically removes the oldest cached images to keep the cache
-        under maxsize.
+        Automatically removes the least recently used images to keep the
+        cache under maxsize.
 
         """
         try:
-            self.currentsize -= self._cache[key.group][key.page][key.size].bcount
+            groupref = self._grouprefs[key.group]
+        except KeyError:
+            groupref = self._grouprefs[key.group] = weakref.ref(key.group, self._groupDied)
+        paged = self._cache.setdefault(key.group, {}).setdefault(key.page, {})
+        sizes = self._sizes.setdefault(key.group, {}).setdefault(key.page, [])
+        try:
+            sized = paged[key.size]
+        except KeyError:
+            sized = paged[key.size] = {}
+            bisect.insort(sizes, key.size)
+        try:
+            self._discard(sized[tile])
         except KeyError:
             pass
 
-        purgeneeded = self.currentsize > self.maxsize
+        if len(sizes) > 1 and key.size == sizes[0]:
+            # a new smallest size: the former smallest loses its protection
+            for entry in paged[sizes[1]].values():
+                if entry in self._spare:
+                    del self._spare[entry]
+                    self._lru[entry] = True
 
-        e = ImageEntry(image)
+        e = sized[tile] = ImageEntry(image, groupref, key.page, key.size, tile)
+        self._lru[e] = True
         self.currentsize += e.bcount
+        self.purge()
 
-        self._cache.setdefault(key.group, {}).setdefault(key.page, {})[key.size] = e
+    def purge(self):
+        """Remove the least recently used images to keep under maxsize.
 
-        if not purgeneeded:
-            return
+        The images of the smallest size of every page are removed last.
 
-        # purge old images if needed,
-        # cache groups may have disappeared so count all images
-        items = []
-        items.extend(sorted(
-            (entry.time, entry.bcount, group, page, size)
-            for group, groupd in self._cache.items()
-                for page, paged in groupd.items()
-                    for size, entry in sorted(paged.items())[1:]))
-        # smallest for each page last
-        items.extend(sorted(
-            (entry.time, entry.bcount, group, page, size)
-            for group, groupd in self._cache.items()
-                for page, paged in groupd.items()
-                    for size, entry in sorted(paged.items())[:1]))
-
-        # now count the newest images until maxsize ...
-        items = reversed(items)
-        currentsize = 0
-        for time, bcount, group, page, size in items:
-            currentsize += bcount
-            if currentsize > self.maxsize:
-                break
-        self.currentsize = currentsize
-        # ... and delete the remaining images, deleting empty dicts as well
-        for time, bcount, group, page, size in items:
-            del self._cache[group][page][size]
-            if not self._cache[group][page]:
-                del self._cache[group][page]
-                if not self._cache[group]:
-                    del self._cache[group]
+        """
+        while self.currentsize > self.maxsize and self._lru:
+            entry = next(iter(self._lru))
+            sizes = self._sizelist(entry)
+            if sizes and entry.size == sizes[0]:
+                # keep the smallest image for each page as long as possible
+                del self._lru[entry]
+                self._spare[entry] = True
+            else:
+                self._remove(entry)
+                self.evictions += 1
+        while self.currentsize > self.maxsize and self._spare:
+            self._remove(next(iter(self._spare)))
+            self.evictions += 1
 
-    def closest(self, key):
-        """Retrieve the correct image but with a different size.
+    def closest(self, key, rect=None):
+        """Retrieve the tiles of the correct image but with a different size.
 
         This can be used for interim display while the real image is being
-        rendered.
+        rendered. The next larger size is preferred, because scaling down
+        looks better than scaling up; if there is none, the next smaller
+        size is used. Returns a two-tuple (size, tiles), where tiles is a
+        dictionary like the one returned by __getitem__(), or None if no
+        image of the page is available.
+
+        If rect, an (x, y, width, height) tuple in the coordinates of
+        key.size, is given, the nearest size of which the cached tiles cover
+        all of rect is chosen, so no gaps are painted; e.g. a complete
+        preview is preferred over a larger size with only some tiles. If no
+        size covers rect, the size that would be chosen without rect is used.
 
         """
         try:
             entries = self._cache[key.group][key.page]
+            sizes = self._sizes[key.group][key.page]
+        except KeyError:
+            return
+        # the sizes are sorted on width (assuming aspect ratio has not changed)
+        i = bisect.bisect_right(sizes, key.size)
+        j = i - 1 if i and sizes[i-1] == key.size else i
+        candidates = sizes[i:] + sizes[j-1::-1] if j else sizes[i:]
+        if not candidates:
+            return
+        size = candidates[0]
+        if rect:
+            for s in candidates:
+                if self._covers(entries[s], s, key.size, rect):
+                    size = s
+                    break
+        tiles = entries[size]
+        self.interimHits += 1
+        return size, {tile: entry.image for tile, entry in tiles.items()}
+
+    @staticmethod
+    def _covers(tiles, size, target, rect):
+        """(Internal) Return True if the tiles at size cover rect at target size."""
+        hscale = size[0] / target[0]
+        vscale = size[1] / target[1]
+        # the rect at the size of the tiles, clipped to the image
+        left = max(0, rect[0] * hscale)
+        top = max(0, rect[1] * vscale)
+        right = min(size[0], (rect[0] + rect[2]) * hscale)
+        bottom = min(size[1], (rect[1] + rect[3]) * vscale)
+        if right <= left or bottom <= top:
+            return True
+        # the tiles do not overlap, so the covered area can be summed
+        area = 0
+        for t in tiles:
+            w = min(right, t.x + t.w) - max(left, t.x)
+            h = min(bottom, t.y + t.h) - max(top, t.y)
+            if w > 0 and h > 0:
+                area += w * h
+        return area >= (right - left) * (bottom - top) * 0.9999
+
+    def _touch(self, entry):
+        """(Internal) Mark the entry as most recently used."""
+        try:
+            self._lru.move_to_end(entry)
+        except KeyError:
+            self._spare.pop(entry, None)
+            self._lru[entry] = True
+
+    def _sizelist(self, entry):
+        """(Internal) Return the sorted list of sizes of the entry's page."""
+        group = entry.groupref()
+        if group is not None:
+            try:
+                return self._sizes[group][entry.page]
+            except KeyError:
+                pass
+
+    def _discard(self, entry):
+        """(Internal) Forget the entry in the LRU lists and the byte count."""
+        if self._lru.pop(entry, None) is None:
+            self._spare.pop(entry, None)
+        self.currentsize -= entry.bcount
+
+    def _remove(self, entry):
+        """(Internal) Remove the entry, deleting empty dicts as well."""
+        self._discard(entry)
+        group = entry.groupref()
+        if group is None:
+            return
+        try:
+            groupd = self._cache[group]
+            paged = groupd[entry.page]
+            sized = paged[entry.size]
+            del sized[entry.tile]
         except KeyError:
             return
-        # find the closest size (assuming aspect ratio has not changed)
-        if entries:
-            width = key.size[0]
-            sizes = sorted(entries, key=lambda s: abs(1 - s[0] / width))
-            return entries[sizes[0]].image
+        if not sized:
+            del paged[entry.size]
+            sizes = self._sizes[group][entry.page]
+            del sizes[bisect.bisect_left(sizes, entry.size)]
+            if not paged:
+                del groupd[entry.page]
+                del self._sizes[group][entry.page]
+                if not groupd:
+                    del self._cache[group]
+                    del self._sizes[group]
+
+    def _groupDied(self, groupref):
+        """(Internal) Called when a group is garbage collected."""
+        for entry in [e for d in (self._lru, self._spare) for e in d
+                        if e.groupref is groupref]:
+            self._discard(entry)
 
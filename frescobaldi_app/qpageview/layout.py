@@ -23,9 +23,11 @@ Manages and positions a group of Page instances.
 """
 
 
+import bisect
 import copy
 
 from PyQt5.QtCore import QPoint, QPointF, QRect, QSize
+from PyQt5.QtGui import QRegion
 
 from .constants import (
     FixedScale,
@@ -43,6 +45,46 @@ from .constants import (
 )
 
 
+class PositionIndex:
+    """A sorted index of groups of pages (rows or columns) along one axis.
+
+    The groups must be in layout order and may not overlap along the axis,
+    so the groups touched by a range of coordinates can be found using
+    bisection.
+
+    Instance attributes:
+
+        `vertical`  True if the groups are rows (sorted on y-coordinate),
+                    False if they are columns (sorted on x-coordinate)
+
+    """
+    def __init__(self, groups, vertical):
+        self.vertical = vertical
+        self.starts = []
+        self.ends = []
+        self.groups = []
+        for pages in groups:
+            pages = [p for p in pages if p]
+            if pages:
+                if vertical:
+                    start = min(p.y for p in pages)
+                    end = max(p.y + p.height for p in pages) - 1
+                else:
+                    start = min(p.x for p in pages)
+                    end = max(p.x + p.width for p in pages) - 1
+                self.starts.append(start)
+                self.ends.append(end)
+                self.groups.append(pages)
+
+    def pages(self, left, top, right, bottom):
+        """Yield the pages in the groups touched by the specified rectangle."""
+        low, high = (top, bottom) if self.vertical else (left, right)
+        first = bisect.bisect_left(self.ends, low)
+        last = bisect.bisect_right(self.starts, high)
+        for pages in self.groups[first:last]:
+            yield from pages
+
+
 class AbstractPageLayout(list):
     """Manages page.Page instances with a list-like api.
 
@@ -73,6 +115,10 @@ class AbstractPageLayout(list):
     width = 0
     height = 0
 
+    # set by updatePagePositions() if the layout builds a PositionIndex,
+    # cleared by update()
+    _index = None
+
     def __bool__(self):
         """Always return True."""
         return True
@@ -89,6 +135,7 @@ class AbstractPageLayout(list):
         """Return a copy of this layout with copies of all the pages."""
         layout = copy.copy(self)
         layout[:] = (p.copy() for p in self)
+        layout._index = None
         return layout
 
     def setSize(self, size):
@@ -102,18 +149,31 @@ class AbstractPageLayout(list):
 
     def pageAt(self, point):
         """Return the page that contains the given QPoint."""
-        # Specific layouts may use faster algorithms to find the page.
-        for page in self:
+        x, y = point.x(), point.y()
+        for page in self.candidatePages(x, y, x, y):
             if page.rect().contains(point):
                 return page
 
     def pagesAt(self, r):
         """Yield the pages touched by the given QRect or QRegion."""
-        # Specific layouts may use faster algorithms to find the pages.
-        for page in self:
+        b = r.boundingRect() if isinstance(r, QRegion) else r
+        for page in self.candidatePages(b.left(), b.top(), b.right(), b.bottom()):
             if r.intersects(page.rect()):
                 yield page
 
+    def candidatePages(self, left, top, right, bottom):
+        """Return the pages that may be touched by the specified rectangle.
+
+        Used by pageAt() and pagesAt(). If updatePagePositions() has built a
+        PositionIndex during the last update(), it is used to find the pages
+        in O(log n) time, otherwise all pages are returned.
+
+        """
+        index = self._index
+        if index is None:
+            return self
+        return index.pages(left, top, right, bottom)
+
     def widestPage(self):
         """Return the widest page, if any.
 
@@ -182,6 +242,8 @@ class AbstractPageLayout(list):
         This function returns True if the total size has changed.
 
         """
+        # the pages may move, so a former PositionIndex is not valid anymore
+        self._index = None
         self.updatePageSizes()
         self.updatePagePositions()
         return self.computeSize()
@@ -242,7 +304,7 @@ class PageLayout(AbstractPageLayout):
             width = max((p.width for p in self), default=0) + self.margin * 2
             top = self.margin
             for page in self:
-                page.x = (width - page.width) / 2
+                page.x = (width - page.width) // 2
                 page.y = top
                 top += page.height + self.spacing
         else:
@@ -250,8 +312,10 @@ class PageLayout(AbstractPageLayout):
             left = self.margin
             for page in self:
                 page.x = left
-                page.y = (height - page.height) / 2
+                page.y = (height - page.height) // 2
                 left += page.width + self.spacing
+        self._index = PositionIndex(([p] for p in self),
+                                    self.orientation == Vertical)
 
 
 class RowPageLayout(AbstractPageLayout):
@@ -297,12 +361,14 @@ class RowPageLayout(AbstractPageLayout):
             offset += width + self.spacing
 
         top = self.margin
-        for row in (pages[i:i + cols] for i in range(0, len(pages), cols or 1)):
+        rows = [pages[i:i + cols] for i in range(0, len(pages), cols or 1)]
+        for row in rows:
             height = max(p.height for p in row if p)
             for n, page in enumerate(row):
                 if page:
                     page.x = col_offsets[n] + (col_widths[n] - page.width) // 2
                     page.y = top + (height - page.height) // 2
             top += height + self.spacing
+        self._index = PositionIndex(rows, True)
 
 
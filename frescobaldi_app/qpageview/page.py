@@ -191,7 +191,7 @@ class AbstractPage:
             h = self.pageHeight / self.scaleY
         return height * 72.0 / layout.dpiY / h
 
-    def paint(self, painter, rect, callback=None):
+    def paint(self, painter, rect, callback=None, schedule=True):
         """Reimplement this to paint our Page.
 
         The View calls this method in the paint event. If you can't paint
@@ -199,10 +199,13 @@ class AbstractPage:
         background. If a callback is specified, it is called when the image
         is ready with the page as argument.
 
+        If schedule is False, nothing should be scheduled for rendering;
+        the View does this while the zoom factor changes.
+
         By default, this method calls the renderer's paint() method.
 
         """
-        self.renderer and self.renderer.paint(self, painter, rect, callback)
+        self.renderer and self.renderer.paint(self, painter, rect, callback, schedule)
 
     def mutex(self):
         """Return an object that should be locked when rendering the page.
@@ -76,6 +76,7 @@ class Renderer(render.AbstractImageRenderer):
     )
     renderBackend = popplerqt5.Poppler.Document.SplashBackend
     oversampleThreshold = 96
+    progressive = True
 
     def key(self, page):
         """Reimplemented to keep a reference to the poppler document."""
@@ -85,11 +86,15 @@ class Renderer(render.AbstractImageRenderer):
             (page.pageNumber, page.computedRotation),
             key.size)
 
-    def render(self, page):
-        """Generate an image for this Page."""
+    def rotatedKey(self, page, rotation):
+        """Reimplemented to keep the page number in the key."""
+        key = super().rotatedKey(page, rotation)
+        return key._replace(page=(page.pageNumber, rotation))
+
+    def render(self, page, tile):
+        """Generate an image for the tile of this Page."""
         doc = page.document
         num = page.pageNumber
-        p = doc.page(num)
         s = page.pageSize()
         if page.computedRotation & 1:
             s.transpose()
@@ -99,28 +104,47 @@ class Renderer(render.AbstractImageRenderer):
         multiplier = 2 if xres < self.oversampleThreshold else 1
         image = self.render_poppler_image(doc, num,
             xres * multiplier, yres * multiplier,
-            0, 0, page.width * multiplier, page.height * multiplier,
+            tile.x * multiplier, tile.y * multiplier,
+            tile.w * multiplier, tile.h * multiplier,
             page.computedRotation, page.paperColor or self.paperColor)
         if multiplier == 2:
-            image = image.scaledToWidth(page.width, Qt.SmoothTransformation)
+            image = image.scaled(tile.w, tile.h,
+                Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
         image.setDotsPerMeterX(xres * 39.37)
         image.setDotsPerMeterY(yres * 39.37)
         return image
 
+    def renderPreview(self, page, tile):
+        """Generate a quick preview image for the tile of this Page.
+
+        No antialiasing and oversampling are used.
+
+        """
+        s = page.pageSize()
+        if page.computedRotation & 1:
+            s.transpose()
+        xres = 72.0 * page.width / s.width()
+        yres = 72.0 * page.height / s.height()
+        return self.render_poppler_image(page.document, page.pageNumber,
+            xres, yres, tile.x, tile.y, tile.w, tile.h,
+            page.computedRotation, page.paperColor or self.paperColor, 0)
+
     def render_poppler_image(self, doc, pageNum,
                                    xres=72.0, yres=72.0,
                                    x=-1, y=-1, w=-1, h=-1, rotate=Rotate_0,
-                                   paperColor=None):
+                                   paperColor=None, renderHint=None):
         """Render an image, almost like calling page.renderToImage().
 
         The document is properly locked during rendering and render options
-        are set.
+        are set. If renderHint is None, the renderHint attribute is used.
 
         """
+        if renderHint is None:
+            renderHint = self.renderHint
         with locking.lock(doc):
-            if self.renderHint is not None:
+            if renderHint is not None:
                 doc.setRenderHint(int(doc.renderHints()), False)
-                doc.setRenderHint(self.renderHint)
+                doc.setRenderHint(renderHint)
             if paperColor is not None:
                 doc.setPaperColor(paperColor)
             if self.renderBackend is not None:
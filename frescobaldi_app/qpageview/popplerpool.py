@@ -0,0 +1,202 @@
+# This file is part of the qpageview package.
+#
+# Copyright (c) 2016 - 2016 by Wilbert Berendsen
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+# See http://www.gnu.org/licenses/ for more information.
+
+"""
+Render pages of a PDF document in a pool of worker processes.
+
+Poppler is not thread-safe, so the normal Renderer never renders two pages
+of the same document at the same time. The ProcessRenderer opens the same
+PDF file in a number of worker processes, which can render pages in parallel.
+
+The worker writes the image data in a block of shared memory, that is
+created by the main process and copied in a QImage once, after which the
+shared memory is released. (PyQt5 has no way to release the shared memory
+when a QImage wrapping it is destroyed, so the image is not wrapped.)
+
+Shared memory needs Python 3.8 or newer; use available() to check whether
+the ProcessRenderer can be used.
+
+The worker processes are started using the 'spawn' method, which imports
+the main script of the application in every worker. So the main script
+must only start the application under an "if __name__ == '__main__':"
+guard, as the frescobaldi script does.
+
+"""
+
+import concurrent.futures
+import multiprocessing
+import os
+import weakref
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    shared_memory = None    # Python < 3.8
+
+from PyQt5.QtCore import QSize, Qt
+from PyQt5.QtGui import QColor, QImage, QPainter
+
+from . import locking
+from . import poppler
+from . import render
+
+from .constants import (
+    Rotate_0,
+)
+
+
+# the Poppler.Document, in a worker process
+_document = None
+
+
+def _initialize(filename):
+    """Load the document in a worker process."""
+    global _document
+    import popplerqt5
+    _document = popplerqt5.Poppler.Document.load(filename)
+
+
+def _render(name, pageNum, xres, yres, x, y, w, h, rotate,
+            renderHint, renderBackend, paperColor):
+    """Render an image in a worker process and write it in shared memory.
+
+    The image is written in the shared memory block with the specified name,
+    as w by h pixels in Format_ARGB32_Premultiplied, without padding. If
+    Poppler returns an image of another size, it is cropped or padded with
+    the paper color. The QImage.Format of the image is returned.
+
+    """
+    import popplerqt5
+    Document = popplerqt5.Poppler.Document
+    doc = _document
+    if renderHint is not None:
+        doc.setRenderHint(int(doc.renderHints()), False)
+        doc.setRenderHint(Document.RenderHints(renderHint))
+    if paperColor is not None:
+        doc.setPaperColor(QColor.fromRgba(paperColor))
+    if renderBackend is not None:
+        doc.setRenderBackend(Document.RenderBackend(renderBackend))
+    image = doc.page(pageNum).renderToImage(xres, yres, x, y, w, h, rotate)
+    if image.size() != QSize(w, h):
+        result = QImage(w, h, QImage.Format_ARGB32_Premultiplied)
+        result.fill(QColor.fromRgba(paperColor) if paperColor is not None else Qt.white)
+        if not image.isNull():
+            painter = QPainter(result)
+            painter.drawImage(0, 0, image)
+            painter.end()
+        image = result
+    elif image.format() != QImage.Format_ARGB32_Premultiplied:
+        image = image.convertToFormat(QImage.Format_ARGB32_Premultiplied)
+    shm = shared_memory.SharedMemory(name)
+    try:
+        bpl = image.bytesPerLine()
+        bits = image.constBits()
+        bits.setsize(image.byteCount())
+        data = memoryview(bits)
+        if bpl == w * 4:
+            shm.buf[:w * h * 4] = data[:w * h * 4]
+        else:
+            for row in range(h):
+                shm.buf[row * w * 4:(row + 1) * w * 4] = data[row * bpl:row * bpl + w * 4]
+        del data, bits
+    finally:
+        shm.close()
+    return int(image.format())
+
+
+def available():
+    """Return True if the ProcessRenderer can be used."""
+    return shared_memory is not None
+
+
+def _int(value):
+    """Return int(value), or None if the value is None (for pickling)."""
+    return None if value is None else int(value)
+
+
+class ProcessRenderer(poppler.Renderer):
+    """A Renderer that renders pages of one PDF file in worker processes.
+
+    The filename must be the file the Poppler.Document of the pages was
+    loaded from. By default as many worker processes are started as there
+    are CPU cores. The maximum number of concurrent jobs is raised to the
+    number of processes.
+
+    """
+    def __init__(self, filename, processes=None):
+        super().__init__()
+        self.filename = filename
+        self.processes = processes or os.cpu_count() or 1
+        self._executor = concurrent.futures.ProcessPoolExecutor(
+            self.processes, multiprocessing.get_context('spawn'),
+            _initialize, (filename,))
+        weakref.finalize(self, self._executor.shutdown, False)
+
+    def mutex(self, page):
+        """Reimplemented to allow rendering pages at the same time."""
+        return None
+
+    def maxJobs(self):
+        """Reimplemented to return the number of worker processes."""
+        return max(render.maxjobs, self.processes)
+
+    def render_poppler_image(self, doc, pageNum,
+                                   xres=72.0, yres=72.0,
+                                   x=-1, y=-1, w=-1, h=-1, rotate=Rotate_0,
+                                   paperColor=None, renderHint=None):
+        """Reimplemented to render the image in a worker process.
+
+        The document is not used, the worker process has loaded the same
+        file. Returns a QImage with a copy of the shared memory block the
+        worker has written the image to.
+
+        """
+        if w < 0 or h < 0:
+            with locking.lock(doc):
+                size = doc.page(pageNum).pageSizeF()
+            if rotate & 1:
+                size.transpose()
+            w = round(size.width() * xres / 72.0)
+            h = round(size.height() * yres / 72.0)
+            x = y = 0
+        shm = shared_memory.SharedMemory(create=True, size=max(1, w * h * 4))
+        try:
+            fmt = self._executor.submit(_render, shm.name, pageNum,
+                xres, yres, x, y, w, h, rotate,
+                _int(self.renderHint if renderHint is None else renderHint),
+                _int(self.renderBackend),
+                paperColor.rgba() if paperColor is not None else None).result()
+        except Exception:
+            shm.close()
+            shm.unlink()
+            raise
+        # the mapping remains valid until it is closed
+        shm.unlink()
+        try:
+            # 32-bit image lines need no padding, so the data is contiguous
+            image = QImage(w, h, QImage.Format(fmt))
+            bits = image.bits()
+            bits.setsize(w * h * 4)
+            memoryview(bits)[:] = shm.buf[:w * h * 4]
+            del bits
+        finally:
+            shm.close()
+        image.setDotsPerMeterX(xres * 39.37)
+        image.setDotsPerMeterY(yres * 39.37)
+        return image
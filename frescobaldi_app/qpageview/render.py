@@ -26,13 +26,14 @@ import itertools
 import weakref
 import time
 
-from PyQt5.QtCore import QRectF, Qt, QThread
-from PyQt5.QtGui import QColor, QImage
+from PyQt5.QtCore import QPoint, QRect, QRectF, Qt, QThread
+from PyQt5.QtGui import QColor, QImage, QPainter, QRegion, QTransform
 
 from . import cache
 
 
 cache_key = collections.namedtuple('cache_key', 'group page size')
+tile_key = collections.namedtuple('tile_key', 'x y w h')
 
 
 # the maximum number of concurrent jobs (at global level)
@@ -46,22 +47,40 @@ _jobs = {}
 class Job(QThread):
     image = None
     running = False
-    def __init__(self, renderer, page):
+    duration = 0.0
+    def __init__(self, renderer, page, tile, prefetch=False, preview=False):
         super().__init__()
         self.renderer = renderer
         self.page = page
+        self.tile = tile
+        # the tile belongs to the page size at the moment it is scheduled
+        self.key = renderer.key(page)
+        self.prefetch = prefetch
+        self.preview = preview
         self.time = time.time()
         self.callbacks = set()
         self.finished.connect(self._slotFinished)
 
     def start(self):
         self.page_copy = self.page.copy()
-        self.key = self.renderer.key(self.page)
+        if self.preview:
+            # render the whole page in one small tile
+            w, h = self.renderer.previewSize(self.page)
+            self.page_copy.width, self.page_copy.height = w, h
+            self.tile = tile_key(0, 0, w, h)
+            self.key = self.renderer.key(self.page)._replace(size=(w, h))
         self.running = True
         super().start()
 
     def run(self):
-        self.image = self.renderer.render(self.page_copy)
+        start = time.perf_counter()
+        if self.preview:
+            self.image = self.renderer.renderPreview(self.page_copy, self.tile)
+        else:
+            self.image = self.renderer.render(self.page_copy, self.tile)
+        self.duration = time.perf_counter() - start
+        if self.renderer.compact:
+            self.image = self.renderer.compactImage(self.page_copy, self.image)
 
     def _slotFinished(self):
         self.renderer.finish(self)
@@ -89,14 +108,52 @@ class AbstractImageRenderer:
                         used. If a Page specifies its own paperColor, that color
                         prevails.
 
+        `tileWidth`,    The maximum size of the tiles a page image is divided
+        `tileHeight`    in (512 x 512). Tiles are rendered, cached and purged
+                        independently, and only the tiles that are visible are
+                        rendered, so memory usage and rendering time depend on
+                        the size of the viewport, not on the zoom factor.
+
+        `progressive`   If True, a cheap preview of the whole page is rendered
+                        first when there is no image of the page available at
+                        all. The preview is cached like other images and
+                        displayed until the tiles are rendered. False by
+                        default.
+
+        `previewScale`  The maximum scale of the preview (0.25) relative to
+                        the page size. The preview never exceeds one tile.
+
+        `compact`       If True, images that are opaque and only contain gray
+                        pixels are stored as 8-bit grayscale images, using a
+                        quarter of the memory. They are converted back while
+                        painting. False by default.
+
+        `renderTime`    A cache.Histogram counting how long rendering the
+                        images took.
+
 
     """
 
     # default paper color to use (if possible, and when drawing an empty page)
     paperColor = QColor(Qt.white)
 
+    # the maximum size of the tiles a page image is divided in
+    tileWidth = 512
+    tileHeight = 512
+
+    # whether to render a quick preview first, when nothing can be displayed
+    progressive = False
+
+    # the maximum scale of the preview, relative to the page size
+    previewScale = 0.25
+
+    # whether to store gray images in a compact format
+    compact = False
+
     def __init__(self):
         self.cache = cache.ImageCache()
+        self.renderTime = cache.Histogram()
+        self._rotations = weakref.WeakKeyDictionary()   # last painted rotation per page
 
     def key(self, page):
         """Return a cache_key instance for this Page.
@@ -122,65 +179,286 @@ class AbstractImageRenderer:
             page.computedRotation,
             (page.width, page.height))
 
-    def render(self, page):
-        """Reimplement this method to generate an image for this Page."""
+    def rotatedKey(self, page, rotation):
+        """Return the cache_key the Page would have in the other rotation.
+
+        The width and height are swapped if needed. If you reimplement key()
+        and use the page field differently, also reimplement this method.
+
+        """
+        key = self.key(page)
+        width, height = key.size
+        if (rotation - page.computedRotation) & 1:
+            width, height = height, width
+        return key._replace(page=rotation, size=(width, height))
+
+    def tilesAt(self, page, rect):
+        """Yield the tiles of the page (at its current size) touched by rect.
+
+        The rect is a QRect relative to the page's top left corner.
+
+        """
+        tw, th = self.tileWidth, self.tileHeight
+        rect = rect & QRect(0, 0, page.width, page.height)
+        if rect.isEmpty():
+            return
+        for y in range(rect.top() // th * th, rect.bottom() + 1, th):
+            h = min(th, page.height - y)
+            for x in range(rect.left() // tw * tw, rect.right() + 1, tw):
+                yield tile_key(x, y, min(tw, page.width - x), h)
+
+    def render(self, page, tile):
+        """Reimplement this method to generate an image for the tile of this Page.
+
+        The tile is a tile_key(x, y, w, h) tuple describing the rectangle of
+        the page (at its current size) that should be rendered, the returned
+        image should have the tile's width and height.
+
+        """
         return QImage()
 
-    def paint(self, page, painter, rect, callback=None):
+    def renderPreview(self, page, tile):
+        """Generate a quick, low quality image for the tile of this Page.
+
+        This is used in progressive mode to have something to display while
+        the real image is rendered. By default render() is called.
+
+        """
+        return self.render(page, tile)
+
+    def previewSize(self, page):
+        """Return the (width, height) of the preview image for the page.
+
+        The preview has at most previewScale times the size of the page and
+        fits in one tile.
+
+        """
+        scale = min(self.previewScale,
+                    self.tileWidth / page.width, self.tileHeight / page.height)
+        return max(1, round(page.width * scale)), max(1, round(page.height * scale))
+
+    def compactImage(self, page, image):
+        """Return the image in a more compact format, if possible.
+
+        Called in the rendering thread if the compact attribute is True.
+        An image that is opaque and only contains gray pixels is converted
+        to QImage.Format_Grayscale8. Other images are returned unchanged.
+
+        """
+        color = page.paperColor or self.paperColor or QColor(Qt.white)
+        if color.alpha() == 255 and image.depth() == 32 and image.allGray():
+            return image.convertToFormat(QImage.Format_Grayscale8)
+        return image
+
+    def mutex(self, page):
+        """Return the object that should be locked when rendering the page.
+
+        By default the page's mutex() is returned. Renderers that render a
+        page without touching shared state may return None, so that jobs for
+        pages of the same document can run at the same time.
+
+        """
+        return page.mutex()
+
+    def maxJobs(self):
+        """Return the maximum number of concurrent jobs to start.
+
+        By default the global maxjobs value is returned.
+
+        """
+        return maxjobs
+
+    def paint(self, page, painter, rect, callback=None, schedule=True):
         """Paint a page.
 
         The Page calls this method by default in the paint() method.
-        This method tries to fetch an image from the cache and paint that.
-        If no image is available, render() is called in the background to
-        generate one. If it is ready, the callback is called with the Page
-        as argument. An interim image may be painted in the meantime (e.g.
-        scaled from another size).
+        This method tries to fetch the tiles of the page image that are
+        touched by rect from the cache and paint them. If tiles are not
+        available, render() is called in the background to generate them.
+        If they are ready, the callback is called with the Page as argument.
+        An interim image may be painted in the meantime (e.g. scaled from
+        tiles of another size).
+
+        If schedule is False, missing tiles are not rendered, only the
+        interim images are painted (e.g. while the zoom factor changes).
 
         """
         key = self.key(page)
+        rotation = page.computedRotation
+        if self._rotations.get(page, rotation) != rotation:
+            # the page was rotated, derive its tiles from the other rotation
+            cached = self.cache.peek(key) or {}
+            self.rotatedTiles(page, [t for t in
+                self.tilesAt(page, QRect(0, 0, page.width, page.height)) if t not in cached])
+        self._rotations[page] = rotation
+
         try:
-            image = self.cache[key]
+            tiles = self.cache[key]
         except KeyError:
-            image = self.cache.closest(key)
+            tiles = {}
+
+        missing = []
+        for t in self.tilesAt(page, rect):
+            image = tiles.get(t)
             if image:
-                hscale = image.width() / page.width
-                vscale = image.height() / page.height
-                image_rect = QRectF(rect.x() * hscale, rect.y() * vscale,
-                                    rect.width() * hscale, rect.height() * vscale)
-                painter.drawImage(QRectF(rect), image, image_rect)
+                r = QRect(*t) & rect
+                painter.drawImage(r, image, r.translated(-t.x, -t.y))
             else:
-                color = page.paperColor or self.paperColor or QColor(Qt.white)
-                painter.fillRect(rect, color)
-            self.schedule(page, painter, callback)
+                missing.append(t)
+        if not missing:
+            return
+
+        # paint interim images for the missing tiles and schedule them,
+        # from a size of which the cached tiles cover the missing area
+        area = QRect()
+        for t in missing:
+            area |= QRect(*t) & rect
+        closest = self.cache.closest(key, area.getRect())
+        if not closest and self.progressive and schedule:
+            self.schedulePreview(page, callback)
+        color = page.paperColor or self.paperColor or QColor(Qt.white)
+        for t in missing:
+            r = QRect(*t) & rect
+            painter.fillRect(r, color)
+            if closest:
+                self.paintInterim(page, painter, r, *closest)
+            if schedule:
+                self.schedule(page, t, callback)
+
+    def prefetch(self, page, rect, callback=None):
+        """Schedule rendering the tiles of the page in rect at low priority.
+
+        This can be used to render pages that are not visible yet, but will
+        become visible soon, e.g. while scrolling. Tiles that are already
+        cached are skipped. Prefetch jobs are only started when no other
+        jobs are waiting, and never occupy all job slots.
+
+        """
+        tiles = self.cache.peek(self.key(page)) or {}
+        for t in self.tilesAt(page, rect):
+            if t not in tiles:
+                self.schedule(page, t, callback, True)
+
+    def rotatedTiles(self, page, tiles):
+        """Create the tiles from a cached image of the page in another rotation.
+
+        Rotating an image by a multiple of 90 degrees is much cheaper than
+        rendering it again. Looks for the tiles of the page in the cache at
+        the other rotations, at the same physical size. Returns a dictionary
+        mapping the tiles that could be created to their image; they are
+        also added to the cache.
+
+        paint() calls this once after the rotation of a page has changed.
+
+        """
+        key = self.key(page)
+        result = {}
+        for rotation in range(1, 4):
+            other = self.rotatedKey(page, (page.computedRotation - rotation) & 3)
+            cached = self.cache.peek(other)
+            if not cached:
+                continue
+            # transformation from the other image to ours
+            matrix = QTransform().rotate(rotation * 90)
+            origin = matrix.mapRect(QRect(0, 0, *other.size)).topLeft()
+            matrix *= QTransform.fromTranslate(-origin.x(), -origin.y())
+            available = QRegion()
+            for t in cached:
+                available += QRect(*t)
+            inverted = matrix.inverted()[0]
+            for t in tiles:
+                if t in result:
+                    continue
+                source = inverted.mapRect(QRect(*t))
+                if not QRegion(source).subtracted(available).isEmpty():
+                    continue
+                image = QImage(t.w, t.h, QImage.Format_ARGB32_Premultiplied)
+                painter = QPainter(image)
+                painter.setTransform(matrix * QTransform.fromTranslate(-t.x, -t.y))
+                for st, img in cached.items():
+                    if source.intersects(QRect(*st)):
+                        painter.drawImage(QPoint(st.x, st.y), img)
+                painter.end()
+                if self.compact:
+                    image = self.compactImage(page, image)
+                result[t] = image
+                self.cache.addtile(key, t, image)
+            if len(result) == len(tiles):
+                break
+        return result
+
+    def paintInterim(self, page, painter, rect, size, tiles):
+        """Paint the rect of the page using tiles rendered at another size.
+
+        This is used to display something while the tiles of the right
+        size are being rendered.
+
+        """
+        hscale = size[0] / page.width
+        vscale = size[1] / page.height
+        source = QRectF(rect.x() * hscale, rect.y() * vscale,
+                        rect.width() * hscale, rect.height() * vscale)
+        for t, image in tiles.items():
+            tile_rect = QRectF(*t)
+            r = source & tile_rect
+            if not r.isEmpty():
+                target = QRectF(r.x() / hscale, r.y() / vscale,
+                                r.width() / hscale, r.height() / vscale)
+                painter.drawImage(target, image, r.translated(-t.x, -t.y))
+
+    def schedule(self, page, tile, callback, prefetch=False):
+        """Start a new rendering job for the tile of the page.
+
+        If prefetch is True, the job gets a low priority. A prefetch job that
+        is scheduled again without prefetch gets the normal priority.
+
+        """
+        try:
+            job = _jobs.setdefault(self, {})[(page, tile)]
+        except KeyError:
+            job = _jobs[self][(page, tile)] = Job(self, page, tile, prefetch)
         else:
-            painter.drawImage(rect, image, rect)
+            if job.prefetch and not prefetch:
+                job.prefetch = False
+                job.time = time.time()
+            if not job.running:
+                # the page may have been resized since
+                job.key = self.key(page)
+        job.callbacks.add(callback)
+        self.checkstart()
+
+    def schedulePreview(self, page, callback):
+        """Start a new job rendering a preview of the page.
 
-    def schedule(self, page, painter, callback):
-        """Start a new rendering job."""
+        The preview job is run before the other jobs.
+
+        """
         try:
-            job = _jobs.setdefault(self, {})[page]
+            job = _jobs.setdefault(self, {})[(page, None)]
         except KeyError:
-            job = _jobs[self][page] = Job(self, page)
+            job = _jobs[self][(page, None)] = Job(self, page, None, preview=True)
         job.callbacks.add(callback)
         self.checkstart()
 
-    def unschedule(self, page, callback):
-        """Unschedule a possible pending rendering job.
+    def unschedule(self, page, callback, prefetchOnly=False):
+        """Unschedule possible pending rendering jobs for the page.
 
         A rendering job is only removed if the specified callback was the only
-        callback to call.
+        callback to call. If prefetchOnly is True, only jobs that were
+        scheduled with prefetch() are removed.
 
         """
         try:
-            job = _jobs[self][page]
+            jobs = _jobs[self]
         except KeyError:
             return
-        if not job.running:
-            job.callbacks.discard(callback)
-            if not job.callbacks:
-                del _jobs[self][page]
-                if not _jobs[self]:
-                    del _jobs[self]
+        for (p, tile), job in list(jobs.items()):
+            if p is page and not job.running and (job.prefetch or not prefetchOnly):
+                job.callbacks.discard(callback)
+                if not job.callbacks:
+                    del jobs[(p, tile)]
+        if not jobs:
+            del _jobs[self]
 
     def checkstart(self):
         """Check whether there are jobs that need to be started."""
@@ -191,28 +469,34 @@ class AbstractImageRenderer:
         # count the total number of running jobs
         runningjobs = [j for jobs in _jobs.values()
                          for j in jobs.values() if j.running]
+        # previews first, then newest first, prefetch jobs last
         waitingjobs = sorted((j for j in ourjobs if not j.running),
-                             key=lambda j: j.time, reverse=True)
+                             key=lambda j: (j.prefetch, not j.preview, -j.time))
         jobcount = len(runningjobs)
-
-        for job in waitingjobs[:maxjobs-jobcount]:
-            mutex = job.page.mutex()
-            if mutex is None or not any(mutex is j.page.mutex() for j in runningjobs):
+        limit = self.maxJobs()
+
+        for job in waitingjobs[:limit-jobcount]:
+            if job.prefetch and len(runningjobs) >= max(1, limit - 1):
+                # keep a slot free for pages that become visible
+                break
+            mutex = self.mutex(job.page)
+            if mutex is None or not any(mutex is j.renderer.mutex(j.page) for j in runningjobs):
                 runningjobs.append(job)
                 job.start()
 
     def finish(self, job):
         """Called by the job when finished."""
-        self.cache[job.key] = job.image
-        # if page already was resized during rendering, immediately rerender...
-        if job.page.size() != job.page_copy.size():
-            job.start()
+        self.renderTime.add(job.duration)
+        # if the page was resized or rotated after the tile was scheduled, the
+        # tile is not needed anymore; the callbacks cause a repaint which
+        # requests the new tiles
+        if job.preview or job.key == self.key(job.page):
+            self.cache.addtile(job.key, job.tile, job.image)
+        for cb in job.callbacks:
+            cb(job.page)
+        del _jobs[self][(job.page, None if job.preview else job.tile)]
+        if not _jobs[self]:
+            del _jobs[self]
         else:
-            for cb in job.callbacks:
-                cb(job.page)
-            del _jobs[self][job.page]
-            if not _jobs[self]:
-                del _jobs[self]
-            else:
-                self.checkstart()
+            self.checkstart()
 
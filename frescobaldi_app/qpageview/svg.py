@@ -22,6 +22,10 @@ A page that can display a SVG document.
 
 """
 
+import os
+import re
+import xml.etree.ElementTree as ET
+
 from PyQt5.QtCore import QPoint, QPointF, QRect, QRectF, QSize, QSizeF, Qt
 from PyQt5.QtGui import QColor,QImage, QPainter
 from PyQt5.QtSvg import QSvgRenderer
@@ -37,22 +41,99 @@ from . import page
 from . import render
 
 
+# pixels per unit, as used by QSvgRenderer
+_units = {
+    '': 1.0,
+    'px': 1.0,
+    'pt': 1.25,
+    'pc': 15.0,
+    'mm': 3.543307,
+    'cm': 35.43307,
+    'in': 90.0,
+}
+
+_length = re.compile(r'\s*([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)\s*([a-z]*)\s*$').match
+
+
+def svgSize(filename):
+    """Return the default size (width, height) of the SVG file.
+
+    Only the root element is read, so this is much faster than parsing the
+    whole document. Returns None if the size could not be determined.
+
+    """
+    try:
+        for event, elem in ET.iterparse(filename, ('start',)):
+            break
+        else:
+            return
+    except (ET.ParseError, OSError):
+        return
+    width = _length(elem.get('width', ''))
+    height = _length(elem.get('height', ''))
+    if width and height and width.group(2) in _units and height.group(2) in _units:
+        return (round(float(width.group(1)) * _units[width.group(2)]),
+                round(float(height.group(1)) * _units[height.group(2)]))
+    viewBox = elem.get('viewBox', '').replace(',', ' ').split()
+    if not width and not height and len(viewBox) == 4:
+        try:
+            return round(float(viewBox[2])), round(float(viewBox[3]))
+        except ValueError:
+            pass
+
+
 class BasicSvgPage(page.AbstractPage):
-    """A page that can display a SVG document."""
+    """A page that can display a SVG document.
+
+    When loaded from a filename, only the size is read, and the file is
+    parsed when the page is painted or rendered first.
+
+    """
     def __init__(self, load_file=None):
-        self._svg_r = QSvgRenderer()
+        self._svg_r = None
+        self._source = None
+        self._renderers = []
         if load_file:
             self.load(load_file)
 
     def load(self, load_file):
         """Load filename or QByteArray."""
-        success = self._svg_r.load(load_file)
+        self._svg_r = None
+        self._source = load_file
+        self._renderers = []
+        size = svgSize(load_file) if isinstance(load_file, str) else None
+        if size:
+            self.pageWidth, self.pageHeight = size
+            return True
+        success = self.svgRenderer().isValid()
         if success:
             self.pageWidth = self._svg_r.defaultSize().width()
             self.pageHeight = self._svg_r.defaultSize().height()
         return success
 
-    def paint(self, painter, rect, callback=None):
+    def svgRenderer(self):
+        """Return the QSvgRenderer to paint the page in the GUI thread."""
+        if self._svg_r is None:
+            self._svg_r = QSvgRenderer(self._source) if self._source else QSvgRenderer()
+        return self._svg_r
+
+    def acquireSvgRenderer(self):
+        """Return a QSvgRenderer to use in a rendering thread.
+
+        The SVG is only parsed when no parsed renderer is free. Give the
+        renderer back with releaseSvgRenderer() when done.
+
+        """
+        try:
+            return self._renderers.pop()
+        except IndexError:
+            return QSvgRenderer(self._source) if self._source else QSvgRenderer()
+
+    def releaseSvgRenderer(self, renderer):
+        """Give a QSvgRenderer obtained with acquireSvgRenderer() back."""
+        self._renderers.append(renderer)
+
+    def paint(self, painter, rect, callback=None, schedule=True):
         painter.fillRect(rect, self.paperColor or QColor(Qt.white))
         page = QRect(0, 0, self.width, self.height)
         painter.translate(page.center())
@@ -60,7 +141,7 @@ class BasicSvgPage(page.AbstractPage):
         if self.computedRotation & 1:
             page.setSize(page.size().transposed())
         painter.translate(-page.center())
-        self._svg_r.render(painter, QRectF(page))
+        self.svgRenderer().render(painter, QRectF(page))
 
 
 class SvgPage(BasicSvgPage):
@@ -70,13 +151,17 @@ class SvgPage(BasicSvgPage):
         if renderer is not None:
             self.renderer = renderer
 
-    def paint(self, painter, rect, callback=None):
-        self.renderer.paint(self, painter, rect, callback)
+    def paint(self, painter, rect, callback=None, schedule=True):
+        self.renderer.paint(self, painter, rect, callback, schedule)
 
 
 class Renderer(render.AbstractImageRenderer):
     """Render SVG pages.
 
+    Every rendering thread uses its own parsed copy of the SVG document
+    (see BasicSvgPage.acquireSvgRenderer()), so tiles and pages are rendered
+    in parallel, by as many threads as there are CPU cores.
+
     Additional instance attributes:
 
         imageFormat     (QImage.Format_ARGB32_Premultiplied) the QImage format to use.
@@ -85,18 +170,28 @@ class Renderer(render.AbstractImageRenderer):
     # QImage format to use
     imageFormat = QImage.Format_ARGB32_Premultiplied
 
-    def render(self, page):
-        """Generate an image for this Page."""
-        i = QImage(page.width, page.height, self.imageFormat)
+    def maxJobs(self):
+        """Reimplemented to render with as many threads as there are CPU cores."""
+        return max(render.maxjobs, os.cpu_count() or 1)
+
+    def render(self, page, tile):
+        """Generate an image for the tile of this Page."""
+        i = QImage(tile.w, tile.h, self.imageFormat)
         i.fill(page.paperColor or self.paperColor or QColor(Qt.white))
         painter = QPainter(i)
+        painter.translate(-tile.x, -tile.y)
         rect = QRect(0, 0, page.width, page.height)
         painter.translate(rect.center())
         painter.rotate(page.computedRotation * 90)
         if page.computedRotation & 1:
             rect.setSize(rect.size().transposed())
         painter.translate(-rect.center())
-        page._svg_r.render(painter, QRectF(rect))
+        svg = page.acquireSvgRenderer()
+        try:
+            svg.render(painter, QRectF(rect))
+        finally:
+            page.releaseSvgRenderer(svg)
+        painter.end()
         return i
 
 
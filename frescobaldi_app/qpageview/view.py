@@ -22,8 +22,9 @@ The View, deriving from QAbstractScrollArea.
 """
 
 import contextlib
+import time
 
-from PyQt5.QtCore import pyqtSignal, QPoint, QSize, Qt
+from PyQt5.QtCore import pyqtSignal, QPoint, QSize, Qt, QTimer
 from PyQt5.QtGui import QPainter, QPalette
 from PyQt5.QtWidgets import QStyle
 
@@ -58,9 +59,24 @@ class View(scrollarea.ScrollArea):
 
     scrollupdatespersec = 50
 
+    # the maximum number of pages to render ahead while scrolling
+    prefetchPages = 3
+
+    # the number of seconds to look ahead at the current scrolling speed
+    prefetchTime = 1.0
+
+    # the number of seconds the zoom factor must be unchanged before rendering
+    zoomSettleTime = 0.25
+
     def __init__(self, parent=None, **kwds):
         super().__init__(parent, **kwds)
         self._prev_pages_to_paint = set()
+        self._prefetched = set()
+        self._scrollDirection = (0, 0)
+        self._scrollVelocity = 0.0
+        self._scrollTime = 0.0
+        self._zooming = False
+        self._zoomTimer = QTimer(singleShot=True, timeout=self._zoomSettled)
         self._viewMode = FixedScale
         self._pageLayout = layout.PageLayout()
         self._magnifier = None
@@ -70,19 +86,30 @@ class View(scrollarea.ScrollArea):
         self.horizontalScrollBar().setSingleStep(20)
         self.setMouseTracking(True)
 
-    def loadPdf(self, filename):
-        """Convenience method to load the specified PDF file."""
+    def loadPdf(self, filename, multiprocess=False):
+        """Convenience method to load the specified PDF file.
+
+        If multiprocess is True, the pages are rendered in parallel by a
+        pool of worker processes (see popplerpool.ProcessRenderer), if this
+        Python version supports it.
+
+        """
         import popplerqt5
         from . import poppler
+        from . import popplerpool
         doc = popplerqt5.Poppler.Document.load(filename)
-        renderer = poppler.Renderer()
+        if multiprocess and popplerpool.available():
+            renderer = popplerpool.ProcessRenderer(filename)
+        else:
+            renderer = poppler.Renderer()
         self.pageLayout()[:] = poppler.PopplerPage.createPages(doc, renderer)
         self.updatePageLayout()
 
     def loadSvgs(self, filenames):
         """Convenience method to load the specified list of SVG files.
 
-        Each SVG file is loaded in one Page.
+        Each SVG file is loaded in one Page. The files are parsed when the
+        pages are rendered, only their sizes are read now.
 
         """
         from . import svg
@@ -100,6 +127,7 @@ class View(scrollarea.ScrollArea):
 
     def updatePageLayout(self):
         """Update layout and adjust scrollbars."""
+        self.cancelPrefetch()
         self._pageLayout.update()
         self._updateScrollBars()
         self.viewport().update()
@@ -175,10 +203,68 @@ class View(scrollarea.ScrollArea):
             self.zoomFactorChanged.connect(rubberband.hide)
 
     def scrollContentsBy(self, dx, dy):
-        """Reimplemented to move the rubberband as well."""
+        """Reimplemented to move the rubberband and prefetch pages as well."""
         if self._rubberband:
             self._rubberband.scrollBy(QPoint(dx, dy))
         self.viewport().update()
+        self._updateScrollVelocity(-dx, -dy)
+        self.prefetch()
+
+    def _updateScrollVelocity(self, dx, dy):
+        """(Internal) Keep track of the scrolling direction and speed.
+
+        When the direction is reversed, pending prefetch jobs are cancelled.
+
+        """
+        now = time.monotonic()
+        elapsed, self._scrollTime = now - self._scrollTime, now
+        direction = ((dx > 0) - (dx < 0), (dy > 0) - (dy < 0))
+        if direction != self._scrollDirection:
+            self.cancelPrefetch()
+            self._scrollDirection = direction
+            self._scrollVelocity = 0.0
+        elif 0 < elapsed < 0.5:
+            velocity = max(abs(dx), abs(dy)) / elapsed
+            self._scrollVelocity = (self._scrollVelocity + velocity) / 2
+
+    def prefetch(self):
+        """Schedule rendering of the pages that will become visible soon.
+
+        Looks ahead in the scrolling direction, as far as a kinetic scroll
+        will move, or prefetchTime seconds at the current scrolling speed,
+        but at least one viewport size. At most prefetchPages pages are
+        rendered at a low priority.
+
+        """
+        dx, dy = self._scrollDirection
+        if not (dx or dy) or not self.prefetchPages or self._zooming:
+            return
+        rect = self.visibleRect()
+        if isinstance(self._scroller, scrollarea.KineticScroller):
+            remaining = self._scroller.remainingDistance()
+            aheadx, aheady = abs(remaining.x()), abs(remaining.y())
+        else:
+            aheadx = aheady = self._scrollVelocity * self.prefetchTime
+        aheadx = dx * max(aheadx, rect.width())
+        aheady = dy * max(aheady, rect.height())
+        ahead = rect.adjusted(min(0, aheadx), min(0, aheady), max(0, aheadx), max(0, aheady))
+
+        pages = [p for p in self._pageLayout.pagesAt(ahead)
+                   if p.renderer and not rect.intersects(p.rect())]
+        pages.sort(key=lambda p: (p.x * dx + p.y * dy))
+        prefetched = set(pages[:self.prefetchPages])
+        for page in self._prefetched - prefetched:
+            page.renderer.unschedule(page, self.repaintPage, True)
+        for page in prefetched:
+            page.renderer.prefetch(page, (ahead & page.rect()).translated(-page.pos()),
+                                   self.repaintPage)
+        self._prefetched = prefetched
+
+    def cancelPrefetch(self):
+        """Cancel the pending prefetch jobs, e.g. when zooming or reversing."""
+        for page in self._prefetched:
+            page.renderer.unschedule(page, self.repaintPage, True)
+        self._prefetched = set()
 
     def _fitLayout(self):
         """(Internal). Fits the layout according to the view mode.
@@ -305,11 +391,33 @@ class View(scrollarea.ScrollArea):
         """
         factor = max(self.MIN_ZOOM, min(self.MAX_ZOOM, factor))
         if factor != self._pageLayout.zoomFactor:
+            if self.zoomSettleTime:
+                self._startZooming()
             with self._keepCentered(pos, True):
                 self._pageLayout.zoomFactor = factor
             self.setViewMode(FixedScale)
             self.zoomFactorChanged.emit(factor)
 
+    def _startZooming(self):
+        """(Internal) Called when the zoom factor changes.
+
+        Until the zoom factor has not changed for zoomSettleTime seconds,
+        the pages are painted using the images already in the cache, scaled
+        to the new size, and the render jobs for the former sizes are
+        cancelled.
+
+        """
+        self._zooming = True
+        self._zoomTimer.start(int(self.zoomSettleTime * 1000))
+        for page in self._prev_pages_to_paint:
+            if page.renderer:
+                page.renderer.unschedule(page, self.repaintPage)
+
+    def _zoomSettled(self):
+        """(Internal) Called when the zoom factor has stopped changing."""
+        self._zooming = False
+        self.viewport().update()
+
     def zoomFactor(self):
         """Return the page layout's zoom factor."""
         return self._pageLayout.zoomFactor
@@ -406,7 +514,8 @@ class View(scrollarea.ScrollArea):
             rect = (p.rect() & ev_rect).translated(-p.pos())
             painter.save()
             painter.translate(p.pos() + layout_pos)
-            p.paint(painter, rect, self.repaintPage)
+            # don't render while the zoom factor changes
+            p.paint(painter, rect, self.repaintPage, not self._zooming)
             painter.restore()
 
         # TODO paint highlighting
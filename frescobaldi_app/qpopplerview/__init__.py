@@ -68,7 +68,12 @@ View, Surface, (Abstract)Layout and Page can all be inherited from to build
 more specialized Poppler viewers.
 
 The cache module implements in-memory caching for drawn Page images.
-The images are rendered in a background thread.
+The images are rendered in a background thread. A diskcache.DiskCache can be
+set as a persistent second-tier cache.
+
+The textlayer module extracts the text of a document once, in a background
+thread, for fast text searching. A Finder highlights the occurrences of a text
+in a View and scrolls to them.
 
 Furthermore, there is a printer module containing functions to create a PostScript
 file of a Poppler.Document and a class to print a Poppler.Document to a QPrinter
@@ -95,13 +100,16 @@ from .surface import Surface
 from .render import RenderOptions
 from .highlight import Highlighter
 from .magnifier import Magnifier
+from .find import Finder
 from .locking import lock
 from . import cache
+from . import diskcache
+from . import textlayer
 
 
 __all__ = [
     'FixedScale', 'FitWidth', 'FitHeight', 'FitBoth',
     'View', 'Page', 'AbstractLayout', 'Layout', 'Surface',
-    'RenderOptions', 'Highlighter', 'Magnifier',
-    'lock', 'cache',
+    'RenderOptions', 'Highlighter', 'Magnifier', 'Finder',
+    'lock', 'cache', 'diskcache', 'textlayer',
 ]
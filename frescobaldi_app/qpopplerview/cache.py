@@ -22,6 +22,10 @@
 Caching of generated images.
 """
 
+import bisect
+import collections
+import hashlib
+import heapq
 import time
 import weakref
 
@@ -31,28 +35,83 @@ except ImportError:
     from . import popplerqt5_dummy as popplerqt5
 
 from PyQt5.QtCore import Qt, QThread
-from PyQt5.QtGui import QImage, QPainter, QFont
+from PyQt5.QtGui import QImage, QPainter, QFont, QTransform
+
+from qpageview.cache import Histogram
 
 from . import render
 from . import rectangles
 from .locking import lock
 
-__all__ = ['maxsize', 'setmaxsize', 'image', 'generate', 'clear', 'links', 'options']
+__all__ = ['maxsize', 'setmaxsize', 'currentsize', 'image', 'cached', 'generate', 'scheduled',
+           'waiting', 'cancel', 'clear', 'links', 'options',
+           'diskcache', 'setdiskcache', 'setdocumentkey', 'documentkey', 'fingerprint', 'pagelayout', 'carryover',
+           'statistics', 'documentsizes', 'compact', 'setcompact',
+           'schedule', 'VISIBLE', 'MAGNIFIER', 'PREFETCH']
+
+
+# rendering priorities, jobs with a higher priority are run first
+PREFETCH = 1
+MAGNIFIER = 2
+VISIBLE = 3
 
 
 _cache = weakref.WeakKeyDictionary()
+_sizes = weakref.WeakKeyDictionary()    # sorted lists of the sizes in _cache
 _schedulers = weakref.WeakKeyDictionary()
 _options = weakref.WeakKeyDictionary()
 _links = weakref.WeakKeyDictionary()
+_documentkeys = weakref.WeakKeyDictionary()
+_fingerprints = weakref.WeakKeyDictionary()
+
+# keep running carryover threads alive
+_carryovers = set()
+
+# resolution of the rendering used to compute a page fingerprint
+_fingerprintResolution = 24.0
+
+# second-tier persistent cache
+_diskcache = None
+
+# whether to store gray images as 8-bit grayscale
+_compact = False
 
 
 # cache size
 _maxsize = 104857600 # 100M
 _currentsize = 0
 
+# (document reference, pageKey, sizeKey): byteCount, least recently used first
+_lru = collections.OrderedDict()
+_docsizes = {}      # bytes in _lru per document weak reference
+_docrefs = weakref.WeakKeyDictionary()
+
 _globaloptions = None
 
 
+class Statistics(object):
+    """Counts how the cache performs.
+
+    hits, misses: requests for an image of the exact size
+    interim: requests for an image of another size that could be served
+    evictions: images removed to keep the cache under its maximum size
+    diskhits: images loaded from the disk cache
+    rendertime: a Histogram of the time it took to render the images
+
+    """
+    def __init__(self):
+        self.rendertime = Histogram()
+        self.clear()
+
+    def clear(self):
+        """Sets all counters to zero."""
+        self.hits = self.misses = self.interim = self.evictions = self.diskhits = 0
+        self.rendertime.clear()
+
+
+_statistics = Statistics()
+
+
 def setmaxsize(maxsize):
     """Sets the maximum cache size in Megabytes."""
     global _maxsize
@@ -65,19 +124,122 @@ def maxsize():
     return _maxsize / 1048576
 
 
+def currentsize():
+    """Returns the size of the images in the cache in Megabytes."""
+    return _currentsize / 1048576
+
+
 def clear(document=None):
     """Clears the whole cache or the cache for the given Poppler.Document."""
     if document:
+        _sizes.pop(document, None)
         try:
             del _cache[document]
         except KeyError:
             pass
+        else:
+            _forget(_docrefs[document])
     else:
         _cache.clear()
+        _sizes.clear()
+        _lru.clear()
+        _docsizes.clear()
         global _currentsize
         _currentsize = 0
 
 
+def setcompact(enabled):
+    """Sets whether to store opaque gray images in a compact format.
+
+    If enabled, images that only contain gray pixels are converted to 8-bit
+    grayscale after rendering, using a quarter of the memory, so about four
+    times more pages fit in the cache. Engraved music usually qualifies,
+    unless it uses colors or the paper color is not gray. The images are
+    converted back while painting.
+
+    """
+    global _compact
+    _compact = enabled
+
+
+def compact():
+    """Returns True if opaque gray images are stored in a compact format."""
+    return _compact
+
+
+def compactimage(image, opaque=True):
+    """Returns an 8-bit grayscale copy of the image if that would look the same.
+
+    If opaque is False or the image contains colored pixels, the image is
+    returned unchanged.
+
+    """
+    if opaque and image.depth() == 32 and image.allGray():
+        return image.convertToFormat(QImage.Format_Grayscale8)
+    return image
+
+
+def setdiskcache(diskcache):
+    """Sets a diskcache.DiskCache instance to use as second-tier cache.
+
+    Use None to disable the disk cache. Only images of documents that have
+    a key set using setdocumentkey() are stored in the disk cache.
+
+    """
+    global _diskcache
+    _diskcache = diskcache
+
+
+def diskcache():
+    """Returns the diskcache.DiskCache instance in use, if any."""
+    return _diskcache
+
+
+def setdocumentkey(document, key):
+    """Sets a persistent key for the Poppler.Document.
+
+    The key should identify the contents of the document, e.g. a hash of the
+    PDF file, so rendered images can be found back in the disk cache, even
+    after the document has been reloaded.
+
+    """
+    _documentkeys[document] = key
+
+
+def documentkey(document):
+    """Returns the persistent key set for the Poppler.Document, or None."""
+    return _documentkeys.get(document)
+
+
+def diskkey(document, pageNumber, rotation, width, height):
+    """Returns the key to store an image in the disk cache with.
+
+    Returns None if no persistent key is set for the document.
+
+    """
+    try:
+        documentKey = _documentkeys[document]
+    except KeyError:
+        return
+    return (documentKey, pageNumber, rotation, width, height,
+            options().key(), options(document).key())
+
+
+def statistics():
+    """Returns the Statistics instance counting the cache hits, misses, etc."""
+    return _statistics
+
+
+def documentsizes():
+    """Returns a dictionary mapping the Poppler.Documents to the bytes their cached images use."""
+    sizes = {}
+    for docref, byteCount in _docsizes.items():
+        document = docref()
+        if document is not None:
+            sizes[document] = byteCount
+    return sizes
+
+
 def image(page, exact=True):
     """Returns a rendered image for given Page if in cache.
 
@@ -92,72 +254,196 @@ def image(page, exact=True):
 
     if exact:
         try:
-            entry = _cache[document][pageKey][sizeKey]
+            image = _cache[document][pageKey][sizeKey]
         except KeyError:
+            _statistics.misses += 1
             return
         else:
-            entry[1] = time.time()
-            return entry[0]
+            _statistics.hits += 1
+            _lru.move_to_end((_docrefs[document], pageKey, sizeKey))
+            return image
     try:
-        sizes = _cache[document][pageKey].keys()
+        sizes = _sizes[document][pageKey]
     except KeyError:
         return
-    # find the closest size (assuming aspect ratio has not changed)
-    if sizes:
-        sizes = sorted(sizes, key=lambda s: abs(1 - s[0] / float(page.physWidth())))
-        return _cache[document][pageKey][sizes[0]][0]
+    # the sizes are sorted on width (assuming aspect ratio has not changed),
+    # prefer a larger size, as scaling down looks better than scaling up
+    i = min(bisect.bisect_left(sizes, sizeKey), len(sizes) - 1)
+    _statistics.interim += 1
+    return _cache[document][pageKey][sizes[i]]
+
+
+def cached(page):
+    """Returns True if the image for the Page is in the cache.
 
+    Unlike image(), this does not count in the statistics and does not mark
+    the image as recently used.
 
-def generate(page):
-    """Schedule an image to be generated for the cache."""
+    """
+    pageKey = (page.pageNumber(), page.rotation())
+    sizeKey = (page.physWidth(), page.physHeight())
+    try:
+        return sizeKey in _cache[page.document()][pageKey]
+    except KeyError:
+        return False
+
+
+def generate(page, priority=VISIBLE):
+    """Schedule an image to be generated for the cache.
+
+    The priority determines the order in which the images are generated:
+    VISIBLE (default), MAGNIFIER or PREFETCH. Of jobs with the same
+    priority, the most recently requested one is run first.
+
+    """
     # Poppler-Qt4 crashes when different pages from a Document are rendered at the same time,
     # so we schedule them to be run in sequence.
     document = page.document()
+    image = rotated(document, page.pageNumber(), page.rotation(), page.physWidth(), page.physHeight())
+    if image:
+        add(image, document, page.pageNumber(), page.rotation(), page.physWidth(), page.physHeight())
+        page.update()
+        return
+    # images in the disk cache are loaded by the Runner, in its thread
     try:
         scheduler = _schedulers[document]
     except KeyError:
         scheduler = _schedulers[document] = Scheduler()
-    scheduler.schedulejob(page)
+    scheduler.schedulejob(page, priority)
+
+
+def schedule(document, job, priority=MAGNIFIER):
+    """Schedule a job that renders something else than a page image.
+
+    The job (e.g. a magnifier tile) is run in sequence with the page images
+    of the document; at the default MAGNIFIER priority after the visible
+    pages and before the prefetched ones. It must have a key attribute that
+    is unique within the document, a document attribute (a weak reference
+    to the document), a run(document) method that is called in a background
+    thread and a finish() method that is called in the main thread when
+    run() has returned.
+
+    """
+    try:
+        scheduler = _schedulers[document]
+    except KeyError:
+        scheduler = _schedulers[document] = Scheduler()
+    scheduler.scheduleother(job, priority)
+
+
+def rotated(document, pageNumber, rotation, width, height):
+    """Returns an image of the page, rotated from a cached image in another rotation.
+
+    Rotating an image by a multiple of 90 degrees is much cheaper than
+    rendering it again. The image in the other rotation must have the same
+    physical size. Returns None if no such image is in the cache.
+
+    """
+    for other in range(1, 4):
+        otherRotation = (rotation - other) & 3
+        sizeKey = (height, width) if other & 1 else (width, height)
+        try:
+            image = _cache[document][(pageNumber, otherRotation)][sizeKey]
+        except KeyError:
+            continue
+        _lru.move_to_end((_docrefs[document], (pageNumber, otherRotation), sizeKey))
+        return image.transformed(QTransform().rotate(other * 90))
+
+
+def scheduled(page):
+    """Returns True if the page is waiting for an image in its current size to be generated."""
+    try:
+        scheduler = _schedulers[page.document()]
+    except KeyError:
+        return False
+    return scheduler.scheduled(page)
+
+
+def waiting():
+    """Returns a list of the Pages that are waiting for an image to be generated."""
+    return [page for scheduler in list(_schedulers.values()) for page in scheduler.waiting()]
+
+
+def cancel(page):
+    """Cancels the generation of an image for the page, e.g. when it is not visible anymore.
+
+    A job that is already running completes and its image is added to the
+    cache, but the page's update() method is not called.
+
+    """
+    try:
+        scheduler = _schedulers[page.document()]
+    except KeyError:
+        return
+    scheduler.cancel(page)
+
+
+def unprefetch(page):
+    """Cancels a pending prefetch job for the page (see generate())."""
+    try:
+        scheduler = _schedulers[page.document()]
+    except KeyError:
+        return
+    scheduler.unprefetch(page)
 
 
 def add(image, document, pageNumber, rotation, width, height):
     """(Internal) Adds an image to the cache."""
     pageKey = (pageNumber, rotation)
     sizeKey = (width, height)
-    _cache.setdefault(document, {}).setdefault(pageKey, {})[sizeKey] = [image, time.time()]
+    try:
+        docref = _docrefs[document]
+    except KeyError:
+        docref = _docrefs[document] = weakref.ref(document, _forget)
+    sizeKeys = _cache.setdefault(document, {}).setdefault(pageKey, {})
+    if sizeKey not in sizeKeys:
+        bisect.insort(_sizes.setdefault(document, {}).setdefault(pageKey, []), sizeKey)
+    key = (docref, pageKey, sizeKey)
 
     # maintain cache size
     global _maxsize, _currentsize
-    _currentsize += image.byteCount()
+    byteCount = image.byteCount()
+    oldCount = _lru.pop(key, 0)
+    _currentsize += byteCount - oldCount
+    _docsizes[docref] = _docsizes.get(docref, 0) + byteCount - oldCount
+    sizeKeys[sizeKey] = image
+    _lru[key] = byteCount
     if _currentsize > _maxsize:
         purge()
 
 
 def purge():
-    """Removes old images from the cache to limit the space used.
+    """Removes the least recently used images from the cache to limit the space used.
 
     (Not necessary to call, as the cache will monitor its size automatically.)
 
     """
-    # make a list of the images, sorted on time, newest first
-    images = iter(sorted((
-        (time, document, pageKey, sizeKey, image.byteCount())
-            for document, pageKeys in _cache.items()
-            for pageKey, sizeKeys in pageKeys.items()
-            for sizeKey, (image, time) in sizeKeys.items()),
-                reverse=True))
-
-    # sum the size of the newest images
     global _maxsize, _currentsize
-    byteCount = 0
-    for item in images:
-        byteCount += item[4]
-        if byteCount > _maxsize:
-            break
-    _currentsize = byteCount
-    # delete the other images
-    for time, document, pageKey, sizeKey, byteCount in images:
-        del _cache[document][pageKey][sizeKey]
+    while _lru and _currentsize > _maxsize:
+        (docref, pageKey, sizeKey), byteCount = _lru.popitem(False)
+        _currentsize -= byteCount
+        _docsizes[docref] -= byteCount
+        _statistics.evictions += 1
+        document = docref()
+        if document is not None:
+            try:
+                sizeKeys = _cache[document][pageKey]
+                del sizeKeys[sizeKey]
+            except KeyError:
+                continue
+            sizes = _sizes[document][pageKey]
+            del sizes[bisect.bisect_left(sizes, sizeKey)]
+            if not sizeKeys:
+                del _cache[document][pageKey]
+                del _sizes[document][pageKey]
+
+
+def _forget(docref):
+    """(Internal) Removes the images of a deleted or cleared document from the byte count."""
+    global _currentsize
+    for key in [key for key in _lru if key[0] is docref]:
+        _currentsize -= _lru.pop(key)
+    _docsizes.pop(docref, None)
 
 
 def links(page):
@@ -173,6 +459,79 @@ def links(page):
         return links
 
 
+def fingerprint(document, pageNumber):
+    """Returns a tuple (contents, links) identifying a page of the Poppler.Document.
+
+    contents is a hash of the page size and a low-resolution rendering of the
+    page; links is a hash of the areas and URLs of the links on the page.
+    Two pages with the same fingerprint look the same and have the same links.
+
+    This renders the page, so better call it in a background thread.
+    The carryover() function caches the fingerprints as long as the
+    document lives.
+
+    """
+    try:
+        return _fingerprints[document][pageNumber]
+    except KeyError:
+        pass
+    contents = hashlib.sha1()
+    with lock(document):
+        options().write(document)
+        options(document).write(document)
+        page = document.page(pageNumber)
+        size = page.pageSizeF()
+        contents.update(repr((size.width(), size.height())).encode('utf-8'))
+        image = page.renderToImage(_fingerprintResolution, _fingerprintResolution)
+    if not image.isNull():
+        bits = image.constBits()
+        bits.setsize(image.byteCount())
+        contents.update(bits.asstring())
+    return contents.hexdigest(), pagelayout(document, pageNumber)[2]
+
+
+def pagelayout(document, pageNumber):
+    """Returns a tuple (size, areas, links) describing a page of the Poppler.Document.
+
+    size is the page size in points, areas a hash of the areas of the links,
+    and links a hash of the areas and URLs of the links. This is cheap to
+    compute: two pages that differ in size or link areas do not look the
+    same, so they need not be rendered to compare them.
+
+    """
+    areas, links = hashlib.sha1(), hashlib.sha1()
+    with lock(document):
+        page = document.page(pageNumber)
+        size = page.pageSizeF()
+        for link in page.links():
+            area = repr(link.linkArea().normalized().getCoords()).encode('utf-8')
+            url = link.url() if isinstance(link, popplerqt5.Poppler.LinkBrowse) else None
+            areas.update(area)
+            links.update(area)
+            links.update(repr(url).encode('utf-8'))
+    return (size.width(), size.height()), areas.hexdigest(), links.hexdigest()
+
+
+def carryover(olddocument, newdocument, distance=2):
+    """Reuses the cached images of unchanged pages for a reloaded document.
+
+    For every page of olddocument that has images in the cache, the pages of
+    newdocument at most distance pages before or after the same page number
+    are compared. If a page looks the same, the images are added to the
+    cache for the new page, and also the links, if they did not change.
+
+    The pages are compared in a background thread: first their size and
+    link areas, and only if those are the same, their fingerprint(). When
+    done, pages of the new document that were waiting for an image that
+    was carried over are updated.
+
+    """
+    pageNumbers = sorted(set(pageNumber for pageNumber, rotation
+                             in _cache.get(olddocument, ())))
+    if pageNumbers:
+        CarryOver(olddocument, newdocument, pageNumbers, distance)
+
+
 def options(document=None):
     """Returns a RenderOptions object for a document or the global one if no document is given."""
     global _globaloptions, _options
@@ -209,19 +568,29 @@ def setoptions(options, document=None):
 
 
 class Scheduler(object):
-    """Manages running rendering jobs in sequence for a Document."""
+    """Manages running rendering jobs in sequence for a Document.
+
+    Waiting jobs are kept in a priority queue. When a job is about to be
+    started, it is skipped if no page is waiting for it anymore.
+
+    """
     def __init__(self):
-        self._schedule = []     # order
+        self._queue = []        # heap of (-priority, -order, job)
+        self._order = 0
         self._jobs = {}         # jobs on key
         self._waiting = weakref.WeakKeyDictionary()      # jobs on page
         self._running = None
 
-    def schedulejob(self, page):
+    def schedulejob(self, page, priority=VISIBLE):
         """Creates or retriggers an existing Job.
 
-        If a Job was already scheduled for the page, it is canceled.
+        If the page was waiting for another Job (e.g. because it was resized
+        in the meantime), it is not waiting for that Job anymore.
         The page's update() method will be called when the Job has completed.
 
+        A Job that is requested again with the same or a higher priority,
+        is moved to the front of the jobs with that priority.
+
         """
         # uniquely identify the image to be generated
         key = (page.pageNumber(), page.rotation(), page.physWidth(), page.physHeight())
@@ -230,36 +599,118 @@ class Scheduler(object):
         except KeyError:
             job = self._jobs[key] = Job(page)
             job.key = key
+            job.priority = priority
+            self._push(job)
         else:
-            self._schedule.remove(job)
-        self._schedule.append(job)
+            if job.entry and priority >= job.priority:
+                job.priority = priority
+                self._push(job)
+        previous = self._waiting.get(page)
         self._waiting[page] = job
+        if previous and previous is not job:
+            self._release(previous)
         self.checkStart()
 
+    def scheduleother(self, job, priority=MAGNIFIER):
+        """Schedules a job that is not a page image, see schedule()."""
+        if job.key not in self._jobs:
+            job.priority = priority
+            self._jobs[job.key] = job
+            self._push(job)
+            self.checkStart()
+
+    def scheduled(self, page):
+        """Returns True if the page is waiting for a job rendering its current size."""
+        job = self._waiting.get(page)
+        return bool(job) and job.key == (
+            page.pageNumber(), page.rotation(), page.physWidth(), page.physHeight())
+
+    def waiting(self):
+        """Returns a list of the pages that are waiting for a job."""
+        return list(self._waiting)
+
+    def cancel(self, page):
+        """Cancels the job for the page.
+
+        The job will not be run if no other page is waiting for it.
+
+        """
+        job = self._waiting.pop(page, None)
+        if job:
+            self._release(job)
+
+    def unprefetch(self, page):
+        """Cancels the job for the page if it was a waiting prefetch job."""
+        job = self._waiting.get(page)
+        if job and job.entry and job.priority <= PREFETCH:
+            self.cancel(page)
+
     def checkStart(self):
         """Starts a job if none is running and at least one is waiting."""
-        while self._schedule and not self._running:
-            job = self._schedule[-1]
+        while self._queue and not self._running:
+            entry = heapq.heappop(self._queue)
+            job = entry[2]
+            if entry is not job.entry:
+                continue # job was rescheduled or cancelled
+            job.entry = None
             document = job.document()
-            if document and job in self._waiting.values():
+            if not document:
+                del self._jobs[job.key]
+            elif not isinstance(job, Job):
+                self._running = OtherRunner(self, document, job)
+            elif job in self._waiting.values():
                 self._running = Runner(self, document, job)
-                break
             else:
-                self.done(job)
+                del self._jobs[job.key]
 
     def done(self, job):
         """Called when the job has completed."""
         del self._jobs[job.key]
-        self._schedule.remove(job)
         self._running = None
         for page in list(self._waiting):
             if self._waiting[page] is job:
                 page.update()
                 del self._waiting[page]
 
+    def satisfy(self, document):
+        """Forgets waiting jobs whose image has been put in the cache otherwise.
+
+        The pages waiting for such a job are updated.
+
+        """
+        for page, job in list(self._waiting.items()):
+            if not job.entry:
+                continue # running
+            try:
+                _cache[document][(job.pageNumber, job.rotation)][(job.width, job.height)]
+            except KeyError:
+                continue
+            del self._waiting[page]
+            self._release(job)
+            page.update()
+
+    def _push(self, job):
+        """(Internal) Puts the job in the queue, replacing its previous entry."""
+        self._order += 1
+        job.entry = (-job.priority, -self._order, job)
+        heapq.heappush(self._queue, job.entry)
+        # remove outdated entries once in a while
+        if len(self._queue) > 2 * len(self._jobs) + 16:
+            self._queue = [j.entry for j in self._jobs.values() if j.entry]
+            heapq.heapify(self._queue)
+
+    def _release(self, job):
+        """(Internal) Forgets a waiting job if no page is waiting for it anymore."""
+        if job.entry and job not in self._waiting.values():
+            job.entry = None
+            del self._jobs[job.key]
+
 
 class Job(object):
     """Simply contains data needed to create an image later."""
+    priority = VISIBLE
+    entry = None    # the entry in the scheduler's queue while waiting
+
     def __init__(self, page):
         self.document = weakref.ref(page.document())
         self.pageNumber = page.pageNumber()
@@ -269,17 +720,34 @@ class Job(object):
 
 
 class Runner(QThread):
-    """Immediately runs a Job in a background thread."""
+    """Immediately runs a Job in a background thread.
+
+    If the image is in the disk cache, it is loaded instead of rendered.
+
+    """
+    duration = 0.0
+    fromdisk = False
+    rendered = False
+
     def __init__(self, scheduler, document, job):
         super(Runner, self).__init__()
         self.scheduler = scheduler
         self.job = job
         self.document = document # keep reference now so that it does not die during this thread
+        self.diskkey = diskkey(document, job.pageNumber, job.rotation, job.width, job.height)
+        self.diskcache = _diskcache
+        self.compact = _compact
         self.finished.connect(self.slotFinished)
         self.start()
 
     def run(self):
         """Main method of this thread, called by Qt on start()."""
+        self.fromdisk = False
+        if self.diskcache and self.diskkey:
+            self.image = self.diskcache.image(self.diskkey)
+            if self.image:
+                self.fromdisk = True
+                return
         page = self.document.page(self.job.pageNumber)
         pageSize = page.pageSize()
         if self.job.rotation & 1:
@@ -291,7 +759,10 @@ class Runner(QThread):
         with lock(self.document):
             options().write(self.document)
             options(self.document).write(self.document)
+            self.paperColor = self.document.paperColor()
+            start = time.perf_counter()
             self.image = page.renderToImage(xres * multiplier, yres * multiplier, 0, 0, self.job.width * multiplier, self.job.height * multiplier, self.job.rotation)
+            self.duration = time.perf_counter() - start
 
         if self.image.isNull():
             self.image = QImage( self.job.width, self.job.height, QImage.Format_RGB32 )
@@ -300,12 +771,119 @@ class Runner(QThread):
             p.setFont(QFont("Helvetica",self.job.height/20))
             p.drawText(self.image.rect(), Qt.AlignCenter,
                        _("Failed to render page") );
-        elif multiplier == 2:
-            self.image = self.image.scaledToWidth(self.job.width, Qt.SmoothTransformation)
+        else:
+            if multiplier == 2:
+                self.image = self.image.scaledToWidth(self.job.width, Qt.SmoothTransformation)
+            if self.compact:
+                self.image = compactimage(self.image, self.paperColor.alpha() == 255)
+            self.rendered = True
 
     def slotFinished(self):
         """Called when the thread has completed."""
+        if self.fromdisk:
+            _statistics.diskhits += 1
+        else:
+            _statistics.rendertime.add(self.duration)
+            if self.rendered and self.diskcache and self.diskkey:
+                # written in the disk cache's own thread
+                self.diskcache.add(self.diskkey, self.image)
         add(self.image, self.document, self.job.pageNumber, self.job.rotation, self.job.width, self.job.height)
         self.scheduler.done(self.job)
         self.scheduler.checkStart()
 
+
+class OtherRunner(QThread):
+    """Runs a job scheduled with schedule() in a background thread."""
+    def __init__(self, scheduler, document, job):
+        super(OtherRunner, self).__init__()
+        self.scheduler = scheduler
+        self.job = job
+        self.document = document # keep reference now so that it does not die during this thread
+        self.finished.connect(self.slotFinished)
+        self.start()
+
+    def run(self):
+        """Main method of this thread, called by Qt on start()."""
+        self.job.run(self.document)
+
+    def slotFinished(self):
+        """Called when the thread has completed."""
+        self.scheduler.done(self.job)
+        self.job.finish()
+        self.scheduler.checkStart()
+
+
+class CarryOver(QThread):
+    """Compares the pages of two documents for carryover(), in a background thread."""
+    def __init__(self, olddocument, newdocument, pageNumbers, distance):
+        super(CarryOver, self).__init__()
+        self.olddocument = olddocument
+        self.newdocument = newdocument
+        self.pageNumbers = pageNumbers
+        self.distance = distance
+        self.fingerprints = {}
+        self.matches = {}   # oldNumber: (newNumber, sameLinks)
+        self.finished.connect(self.slotFinished)
+        _carryovers.add(self)
+        self.start()
+
+    def run(self):
+        """Main method of this thread, called by Qt on start()."""
+        old, new = self.olddocument, self.newdocument
+        count = new.numPages()
+        offsets = [0]
+        for offset in range(1, self.distance + 1):
+            offsets.extend((-offset, offset))
+        layouts = {}
+        def layout(document, pageNumber):
+            key = (document is new, pageNumber)
+            try:
+                return layouts[key]
+            except KeyError:
+                result = layouts[key] = pagelayout(document, pageNumber)
+                return result
+        def contents(document, pageNumber):
+            key = (document is new, pageNumber)
+            try:
+                return self.fingerprints[key][0]
+            except KeyError:
+                result = self.fingerprints[key] = fingerprint(document, pageNumber)
+                return result[0]
+        for oldNumber in self.pageNumbers:
+            size, areas, links = layout(old, oldNumber)
+            for offset in offsets:
+                newNumber = oldNumber + offset
+                if (0 <= newNumber < count
+                    and layout(new, newNumber)[:2] == (size, areas)
+                    and contents(new, newNumber) == contents(old, oldNumber)):
+                    self.matches[oldNumber] = (newNumber, layout(new, newNumber)[2] == links)
+                    break
+
+    def slotFinished(self):
+        """Called in the main thread when the pages have been compared."""
+        _carryovers.discard(self)
+        old, new = self.olddocument, self.newdocument
+        self.olddocument = self.newdocument = None
+        for (isnew, pageNumber), result in self.fingerprints.items():
+            _fingerprints.setdefault(new if isnew else old, {})[pageNumber] = result
+        pageKeys = _cache.get(old, {})
+        newPageKeys = _cache.get(new, {})
+        for (oldNumber, rotation), sizeKeys in list(pageKeys.items()):
+            try:
+                newNumber, sameLinks = self.matches[oldNumber]
+            except KeyError:
+                continue
+            newSizeKeys = newPageKeys.get((newNumber, rotation), {})
+            for (width, height), image in list(sizeKeys.items()):
+                if (width, height) not in newSizeKeys:
+                    add(image, new, newNumber, rotation, width, height)
+        oldLinks = _links.get(old, {})
+        for oldNumber, (newNumber, sameLinks) in self.matches.items():
+            if sameLinks and oldNumber in oldLinks:
+                _links.setdefault(new, {}).setdefault(newNumber, oldLinks[oldNumber])
+        try:
+            scheduler = _schedulers[new]
+        except KeyError:
+            pass
+        else:
+            scheduler.satisfy(new)
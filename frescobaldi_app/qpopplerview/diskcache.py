@@ -0,0 +1,210 @@
+# This file is part of the qpopplerview package.
+#
+# Copyright (c) 2010 - 2014 by Wilbert Berendsen
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+# See http://www.gnu.org/licenses/ for more information.
+
+
+"""
+Persistent caching of generated images in a directory on disk.
+"""
+
+import collections
+import hashlib
+import os
+import queue
+import threading
+import time
+
+from PyQt5.QtGui import QImage
+
+
+# temporary files older than this (in seconds) are left over from a failed write
+_STALE_TEMP_AGE = 3600
+
+
+class DiskCache(object):
+    """Stores images as PNG files in a directory, under a key.
+
+    The key can be any tuple with a stable repr(), the filename is derived
+    from it. When the total size of the files exceeds maxsize (in bytes), the
+    least recently used files are removed.
+
+    Images are encoded and written by a background thread, so add() returns
+    immediately. The lock is only held while the index of the stored files is
+    updated, never while encoding or decoding an image.
+
+    The methods can be called from any thread.
+
+    """
+    def __init__(self, directory, maxsize=524288000): # 500M
+        self._directory = directory
+        self._maxsize = maxsize
+        self._currentsize = 0
+        self._files = None  # filename: size, least recently used first
+        self._pending = {}  # filename: image, for images not yet written
+        self._queue = queue.Queue()
+        self._writer = None
+        self._lock = threading.RLock()
+
+    def directory(self):
+        """Returns the directory the images are stored in."""
+        return self._directory
+
+    def setmaxsize(self, maxsize):
+        """Sets the maximum size in bytes, removing files if needed."""
+        with self._lock:
+            self._maxsize = maxsize
+            self.purge()
+
+    def maxsize(self):
+        """Returns the maximum size in bytes."""
+        return self._maxsize
+
+    def filename(self, key):
+        """Returns the filename (without directory) for the key."""
+        return hashlib.sha1(repr(key).encode('utf-8')).hexdigest() + '.png'
+
+    def contains(self, key):
+        """Returns True if an image is stored (or being stored) under the key."""
+        name = self.filename(key)
+        with self._lock:
+            return name in self._pending or name in self._index()
+
+    def image(self, key):
+        """Returns the QImage stored under the key, or None.
+
+        The image is decoded in the calling thread, so better not call this
+        method from the GUI thread.
+
+        """
+        name = self.filename(key)
+        with self._lock:
+            try:
+                return self._pending[name]
+            except KeyError:
+                pass
+            if name not in self._index():
+                return
+        path = os.path.join(self._directory, name)
+        image = QImage(path)
+        with self._lock:
+            if image.isNull():
+                if name not in self._pending:
+                    self._remove(name)
+                return
+            if name in self._files:
+                self._files.move_to_end(name)
+        try:
+            os.utime(path)
+        except (IOError, OSError):
+            pass
+        return image
+
+    def add(self, key, image):
+        """Stores the QImage under the key.
+
+        The image is written in a background thread.
+
+        """
+        name = self.filename(key)
+        with self._lock:
+            self._pending[name] = image
+            if not self._writer:
+                self._writer = threading.Thread(target=self._write, daemon=True)
+                self._writer.start()
+        self._queue.put((name, image))
+
+    def clear(self):
+        """Removes all stored images."""
+        with self._lock:
+            for name in list(self._index()):
+                self._remove(name)
+
+    def purge(self):
+        """Removes the least recently used images to keep under maxsize."""
+        with self._lock:
+            files = self._index()
+            while files and self._currentsize > self._maxsize:
+                self._remove(next(iter(files)))
+
+    def _write(self):
+        """(Internal) Writes the queued images to disk, runs in a background thread."""
+        while True:
+            name, image = self._queue.get()
+            path = os.path.join(self._directory, name)
+            temp = path + '.tmp{0}'.format(threading.get_ident())
+            size = None
+            try:
+                os.makedirs(self._directory, exist_ok=True)
+                if image.save(temp, "PNG"):
+                    os.replace(temp, path)
+                    size = os.path.getsize(path)
+            except (IOError, OSError):
+                pass
+            if size is None:
+                # don't leave a (partially) written file behind
+                try:
+                    os.remove(temp)
+                except (IOError, OSError):
+                    pass
+            with self._lock:
+                if self._pending.get(name) is image:
+                    del self._pending[name]
+                if size is not None:
+                    files = self._index()
+                    self._currentsize += size - files.pop(name, 0)
+                    files[name] = size
+                    if self._currentsize > self._maxsize:
+                        self.purge()
+
+    def _index(self):
+        """(Internal) Returns the dict of stored files, reading it if needed.
+
+        Temporary files left over from writes that failed are removed.
+
+        """
+        if self._files is None:
+            entries = []
+            stale = time.time() - _STALE_TEMP_AGE
+            try:
+                for entry in os.scandir(self._directory):
+                    if not entry.is_file():
+                        continue
+                    if entry.name.endswith('.png'):
+                        st = entry.stat()
+                        entries.append((st.st_mtime, entry.name, st.st_size))
+                    elif '.png.tmp' in entry.name and entry.stat().st_mtime < stale:
+                        # may still be written by another thread or process if recent
+                        try:
+                            os.remove(entry.path)
+                        except (IOError, OSError):
+                            pass
+            except (IOError, OSError):
+                pass
+            entries.sort()
+            self._files = collections.OrderedDict(
+                (name, size) for mtime, name, size in entries)
+            self._currentsize = sum(self._files.values())
+        return self._files
+
+    def _remove(self, name):
+        """(Internal) Removes the named file."""
+        self._currentsize -= self._files.pop(name, 0)
+        try:
+            os.remove(os.path.join(self._directory, name))
+        except (IOError, OSError):
+            pass
@@ -0,0 +1,103 @@
+# This file is part of the qpopplerview package.
+#
+# Copyright (c) 2010 - 2014 by Wilbert Berendsen
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+# See http://www.gnu.org/licenses/ for more information.
+
+
+"""
+Finds text in the pages of a View and moves to the occurrences.
+"""
+
+
+class Finder(object):
+    """Searches the text of the pages shown in a View.
+
+    All occurrences are highlighted using the given Highlighter, findNext()
+    and findPrevious() scroll to them in turn. Occurrences on pages of which
+    the text is extracted later (see Surface.findText()) are added when they
+    are found.
+
+    """
+    def __init__(self, view, highlighter):
+        self._view = view
+        self._highlighter = highlighter
+        self._text = ""
+        self._results = []
+        self._index = -1
+        view.surface().textFound.connect(self.slotTextFound)
+
+    def text(self):
+        """Returns the text last searched for."""
+        return self._text
+
+    def results(self):
+        """Returns the list of (Page, area) tuples of the occurrences found."""
+        return list(self._results)
+
+    def find(self, text, caseSensitive=False):
+        """Searches the text, highlights it and scrolls to the first occurrence."""
+        self._text = text
+        surface = self._view.surface()
+        if text:
+            self._results = surface.findText(text, caseSensitive)
+        else:
+            surface.cancelFind()
+            self._results = []
+        self._index = -1
+        surface.highlight(self._highlighter, self._results)
+        self.findNext()
+
+    def clear(self):
+        """Forgets the occurrences, e.g. when another document is shown."""
+        surface = self._view.surface()
+        surface.cancelFind()
+        surface.clearHighlight(self._highlighter)
+        self._results = []
+        self._index = -1
+
+    def findNext(self):
+        """Scrolls to the next occurrence of the text searched for."""
+        if self._results:
+            self.gotoResult((self._index + 1) % len(self._results))
+
+    def findPrevious(self):
+        """Scrolls to the previous occurrence of the text searched for."""
+        if self._results:
+            self.gotoResult((self._index - 1) % len(self._results))
+
+    def gotoResult(self, index):
+        """Scrolls the view to the occurrence at index."""
+        self._index = index
+        page, area = self._results[index]
+        rect = page.linkRect(area)
+        center = rect.center()
+        self._view.ensureVisible(center.x(), center.y(),
+                                 50 + rect.width() // 2,
+                                 50 + rect.height() // 2)
+
+    def slotTextFound(self, results):
+        """Called when occurrences are found on pages extracted after find()."""
+        current = self._results[self._index] if self._index >= 0 else None
+        order = dict((page, i) for i, page in enumerate(self._view.surface().pageLayout()))
+        self._results.extend(results)
+        self._results.sort(key=lambda result: order.get(result[0], -1))
+        self._view.surface().highlight(self._highlighter, self._results)
+        if current is None:
+            self.findNext()
+        else:
+            self._index = next(i for i, result in enumerate(self._results)
+                               if result is current)
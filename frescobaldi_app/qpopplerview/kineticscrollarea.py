@@ -299,6 +299,17 @@ class KineticScrollArea(QScrollArea):
 
         return 0
 
+    def kineticRemainingDistance(self):
+        """Return a QPoint with the distance an automatic kinetic move will still scroll."""
+        if self._kineticData._state != KineticData.AutoScroll:
+            return QPoint(0, 0)
+        def distance(speed):
+            # the speed is decremented by one every tick
+            d = abs(speed) * (abs(speed) + 1) // 2
+            return -d if speed > 0 else d
+        speed = self._kineticData._speed
+        return QPoint(distance(speed.x()), distance(speed.y()))
+
     def kineticEnsureVisible(self, x, y, xm, ym):
         """Ensure a given point is visible, with a margin, by starting the appropriate kinetic scrolling."""
         # Replicate the logic in ScrollArea::ensureVisible to compute the
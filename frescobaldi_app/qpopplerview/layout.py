@@ -36,6 +36,15 @@ from . import (
 )
 
 
+# all existing layouts, see documents()
+_layouts = weakref.WeakSet()
+
+
+def documents():
+    """Returns the set of Poppler.Documents that have pages in a layout."""
+    return set(page.document() for layout in _layouts for page in layout)
+
+
 class AbstractLayout(QObject):
     """Manages page.Page instances with a list-like api.
 
@@ -58,6 +67,7 @@ class AbstractLayout(QObject):
         self._scale = 1.0
         self._scaleChanged = False
         self._dpi = (72, 72)
+        _layouts.add(self)
 
     def own(self, page):
         """(Internal) Makes the page have ourselves as layout."""
@@ -17,18 +17,28 @@
 # Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
 # See http://www.gnu.org/licenses/ for more information.
 
-
 """
 The Magnifier magnifies a part of the displayed Poppler document.
+
+Only the part of the page under the magnifier is rendered, in square tiles,
+that are kept in a small cache of their own. The tiles are rendered by the
+scheduler of the document (see cache.schedule()), after the visible pages
+but before the prefetched ones.
 """
 
+import collections
 import weakref
 
-from PyQt5.QtCore import QPoint, QRect
+from PyQt5.QtCore import QPoint, QRect, QRectF
 from PyQt5.QtGui import QColor, QPainter, QPen, QRegion
 from PyQt5.QtWidgets import QWidget
 
 from . import cache
+from .locking import lock
+
+
+# size of the tiles (in device pixels) a magnified page is rendered in
+TILE_SIZE = 256
 
 
 class Magnifier(QWidget):
@@ -47,7 +57,9 @@ class Magnifier(QWidget):
 
     def __init__(self, parent = None):
         super(Magnifier, self).__init__(parent)
-        self._page= None
+        self._tiles = TileCache()
+        self._queue = []
+        self._job = None
         self.setScale(4.0)
         self.resize(250, 250)
         self.hide()
@@ -76,6 +88,10 @@ class Magnifier(QWidget):
         """Called on resize, sets our circular mask."""
         self.setMask(QRegion(self.rect(), QRegion.Ellipse))
 
+    def hideEvent(self, ev):
+        """Called on hide, cancels the tiles that are waiting to be rendered."""
+        self._queue = []
+
     def paintEvent(self, ev):
         """Called when paint is needed, finds out which page to magnify."""
         layout = self.parent().surface().pageLayout()
@@ -86,86 +102,129 @@ class Magnifier(QWidget):
         pagePos = pos - page.pos()
 
         max_zoom = self.parent().surface().view().MAX_ZOOM * self.MAX_EXTRA_ZOOM
-        newPage = Page(page, min(max_zoom, self._scale * page.scale()))
-        if not newPage.same_page(self._page):
-            if self._page:
-                self._page.magnifier = None
-            self._page = newPage
-            self._page.magnifier = self
-
-        relx = pagePos.x() / float(page.width())
-        rely = pagePos.y() / float(page.height())
-
-        image = cache.image(self._page)
-        img_rect = QRect(self.rect())
-        img_rect.setSize( img_rect.size()*self._page._retinaFactor );
-
-        if not image:
-            cache.generate(self._page)
-            image = cache.image(self._page, False)
-            if image:
-                img_rect.setWidth(img_rect.width() * image.width() / self._page.physWidth())
-                img_rect.setHeight(img_rect.height() * image.height() / self._page.physHeight())
-        if image:
-            img_rect.moveCenter(QPoint(relx * image.width(), rely * image.height()))
-            p = QPainter(self)
-            p.drawImage(self.rect(), image, img_rect)
-            p.setRenderHint(QPainter.Antialiasing, True)
-            p.setPen(QPen(QColor(192, 192, 192, 128), 6))
-            p.drawEllipse(self.rect().adjusted(2, 2, -2, -2))
-
-
-class Page(object):
-    """A data structure describing a Page like page.Page.
-
-    Has the methods the cache needs to create, store and find images
-    for our magnifier.
-
-    """
-    def __init__(self, page, scale):
-        """Creates Page, based on the page.Page object and the scale."""
-        dpix, dpiy = page.layout().dpi()
+        scale = min(max_zoom, self._scale * page.scale())
+        ratio = page._retinaFactor
+        dpix, dpiy = layout.dpi()
         size = page.pageSize()
-        self._document = weakref.ref(page.document())
-        self._pageNumber = page.pageNumber()
-        self._width = size.width() * dpix * scale / 72.0
-        self._height = size.height() * dpiy * scale / 72.0
-        self._retinaFactor = page._retinaFactor
-        self._rotation = page.rotation()
-        self.magnifier = None
-
-    def same_page(self, other):
-        return (
-            other is not None and
-            self._document() == other._document() and
-            self._pageNumber == other._pageNumber and
-            self._width == other._width and
-            self._height == other._height and
-            self._rotation == other._rotation
-        )
-
-    def document(self):
-        return self._document()
-
-    def pageNumber(self):
-        return self._pageNumber
-
-    def width(self):
-        return self._width
+        width = int(size.width() * dpix * scale / 72.0 * ratio)
+        height = int(size.height() * dpiy * scale / 72.0 * ratio)
 
-    def height(self):
-        return self._height
-
-    def physWidth(self):
-        return self._width*self._retinaFactor
-
-    def physHeight(self):
-        return self._height*self._retinaFactor
-
-    def rotation(self):
-        return self._rotation
-
-    def update(self):
-        if self.magnifier:
-            self.magnifier.update()
+        # the part of the magnified page under the lens, in device pixels
+        lens = QRect(0, 0, int(self.width() * ratio), int(self.height() * ratio))
+        lens.moveCenter(QPoint(int(pagePos.x() / float(page.width()) * width),
+                               int(pagePos.y() / float(page.height()) * height)))
 
+        p = QPainter(self)
+        # draw the page image of the view, while tiles are missing
+        image = cache.image(page, False)
+        if image:
+            hscale = float(image.width()) / width
+            vscale = float(image.height()) / height
+            p.drawImage(QRectF(self.rect()), image, QRectF(lens.x() * hscale,
+                lens.y() * vscale, lens.width() * hscale, lens.height() * vscale))
+
+        document = page.document()
+        key = (weakref.ref(document), page.pageNumber(), page.rotation(), width, height)
+        missing = []
+        left = max(0, lens.left()) // TILE_SIZE
+        right = min(width - 1, lens.right()) // TILE_SIZE
+        top = max(0, lens.top()) // TILE_SIZE
+        bottom = min(height - 1, lens.bottom()) // TILE_SIZE
+        for y in range(top, bottom + 1):
+            for x in range(left, right + 1):
+                tile = key + (x, y)
+                image = self._tiles.image(tile)
+                if image is not None:
+                    target = QRectF((x * TILE_SIZE - lens.left()) / ratio,
+                                    (y * TILE_SIZE - lens.top()) / ratio,
+                                    image.width() / ratio, image.height() / ratio)
+                    p.drawImage(target, image)
+                else:
+                    missing.append(tile)
+        self._queue = missing
+        self.startRendering()
+
+        p.setRenderHint(QPainter.Antialiasing, True)
+        p.setPen(QPen(QColor(192, 192, 192, 128), 6))
+        p.drawEllipse(self.rect().adjusted(2, 2, -2, -2))
+
+    def startRendering(self):
+        """Starts rendering a waiting tile, if no tile is being rendered."""
+        while self._queue and not self._job:
+            tile = self._queue.pop(0)
+            document = tile[0]()
+            if document and self._tiles.image(tile) is None:
+                self._job = TileJob(self, tile)
+                cache.schedule(document, self._job, cache.MAGNIFIER)
+
+    def tileFinished(self, job):
+        """Called when a TileJob has finished."""
+        self._job = None
+        if job.image.isNull():
+            # rendering failed, try again on the next paint
+            self._tiles.remove(job.tile)
+            self.startRendering()
+        else:
+            self._tiles.add(job.tile, job.image)
+            self.update()
+
+
+class TileCache(object):
+    """A small cache of rendered tiles, removing the least recently used."""
+    maxsize = 16777216 # 16M
+
+    def __init__(self):
+        self._images = collections.OrderedDict()
+        self._currentsize = 0
+
+    def image(self, tile):
+        """Returns the image for the tile, or None."""
+        image = self._images.get(tile)
+        if image is not None:
+            self._images.move_to_end(tile)
+        return image
+
+    def remove(self, tile):
+        """Removes the image for the tile, if stored."""
+        old = self._images.pop(tile, None)
+        if old is not None:
+            self._currentsize -= old.byteCount()
+
+    def add(self, tile, image):
+        """Stores the image for the tile."""
+        self.remove(tile)
+        self._images[tile] = image
+        self._currentsize += image.byteCount()
+        while self._currentsize > self.maxsize and len(self._images) > 1:
+            self._currentsize -= self._images.popitem(False)[1].byteCount()
+
+
+class TileJob(object):
+    """Renders one tile of a magnified page, see cache.schedule()."""
+    def __init__(self, magnifier, tile):
+        self.magnifier = magnifier
+        self.tile = tile
+        self.key = (magnifier, tile)
+        self.document = tile[0]
+
+    def run(self, document):
+        """Renders the tile, called in a background thread."""
+        docref, pageNumber, rotation, width, height, x, y = self.tile
+        page = document.page(pageNumber)
+        pageSize = page.pageSize()
+        if rotation & 1:
+            pageSize.transpose()
+        xres = 72.0 * width / pageSize.width()
+        yres = 72.0 * height / pageSize.height()
+        x *= TILE_SIZE
+        y *= TILE_SIZE
+        w = min(TILE_SIZE, width - x)
+        h = min(TILE_SIZE, height - y)
+        with lock(document):
+            cache.options().write(document)
+            cache.options(document).write(document)
+            self.image = page.renderToImage(xres, yres, x, y, w, h, rotation)
+
+    def finish(self):
+        """Called in the main thread when the tile has been rendered."""
+        self.magnifier.tileFinished(self)
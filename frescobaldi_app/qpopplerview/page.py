@@ -163,7 +163,13 @@ class Page(object):
         """Change our scale to force our height to the given value."""
         self.setScale(self.scaleForHeight(height))
 
-    def paint(self, painter, rect):
+    def paint(self, painter, rect, schedule=True):
+        """Paints our image in the rect of the painter.
+
+        If schedule is False, only images that are already in the cache are
+        painted, and no new image is generated.
+
+        """
         update_rect = rect & self.rect()
         if not update_rect:
             return
@@ -180,7 +186,8 @@ class Page(object):
             painter.drawImage(update_rect, image, image_rect)
         else:
             # schedule an image to be generated, if done our update() method is called
-            cache.generate(self)
+            if schedule:
+                cache.generate(self)
             # find suitable image to be scaled from other size
             image = cache.image(self, False)
             if image:
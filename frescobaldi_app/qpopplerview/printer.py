@@ -22,11 +22,19 @@
 Printing functionality.
 """
 
-from PyQt5.QtCore import QFile, QIODevice, Qt
+import collections
+import concurrent.futures
+import hashlib
+import os
+import threading
+import time
+
+from PyQt5.QtCore import QByteArray, QFile, QIODevice, Qt
 from PyQt5.QtGui import QColor, QPainter
 from PyQt5.QtPrintSupport import QPrinter
 
 from .locking import lock
+from . import cache
 from . import render
 
 
@@ -85,12 +93,22 @@ class Printer(object):
     does not work correctly in all cases and is not well supported by
     the Poppler developers at this time.
 
+    The pages are rendered in a pool of threads while the rendered pages are
+    sent to the printer in order. At most maxImages() rendered pages are kept
+    in memory at the same time. A Poppler.Document can not render two pages
+    at the same time, so if a filename is set, the file is read once and every
+    thread loads its own copy of the document from that data.
+
     """
     def __init__(self):
         self._stop = False
         self._resolution = 300
         self._document = None
         self._printer = None
+        self._filename = None
+        self._filestat = None
+        self._threadCount = min(os.cpu_count() or 1, 4)
+        self._maxImages = 4
         opts = render.RenderOptions()
         opts.setRenderHint(0)
         opts.setPaperColor(QColor(Qt.white))
@@ -104,6 +122,31 @@ class Printer(object):
         """Returns the previously set Poppler.Document."""
         return self._document
 
+    def setFilename(self, filename, stat=None):
+        """Sets the filename of the PDF document, to render pages in parallel.
+
+        The stat is the (size, mtime_ns) tuple of the file when the document()
+        was loaded from it. The file is only used if it has not changed since,
+        which is checked using the stat or, if set, the document key (see
+        cache.setdocumentkey()). Otherwise the pages are rendered one at a
+        time from the document().
+
+        """
+        self._filename = filename
+        self._filestat = stat
+
+    def filename(self):
+        """Returns the filename of the PDF document, if set."""
+        return self._filename
+
+    def setMaxImages(self, count):
+        """Sets the maximum number of rendered pages kept in memory (default: 4)."""
+        self._maxImages = max(1, count)
+
+    def maxImages(self):
+        """Returns the maximum number of rendered pages kept in memory."""
+        return self._maxImages
+
     def setPrinter(self, printer):
         """Sets the QPrinter to print to (mandatory)."""
         self._printer = printer
@@ -165,23 +208,91 @@ class Printer(object):
 
         opts = self.renderOptions()
         document = self.document()
-
-        for num, pageNum in enumerate(pages, 1):
-            if self._stop:
-                return p.abort()
-            self.progress(num, total, pageNum)
-            if num > 1:
-                p.newPage()
-            with lock(document):
-                opts.write(document)
-                page = document.page(pageNum - 1)
-                img = page.renderToImage(resolution, resolution)
-            rect = img.rect()
-            rect.moveCenter(center)
-            painter.drawImage(rect, img)
+        data = self.documentData()
+        threads = self._threadCount if data else 1
+        local = threading.local()
+
+        def render(pageNum):
+            doc = getattr(local, 'document', None)
+            if doc is None:
+                doc = local.document = self.loadDocument(data) or document
+            with lock(doc):
+                opts.write(doc)
+                return doc.page(pageNum - 1).renderToImage(resolution, resolution)
+
+        start = time.monotonic()
+        with concurrent.futures.ThreadPoolExecutor(threads) as executor:
+            waiting = iter(pages)
+            rendering = collections.deque()
+            def fill():
+                """Keeps maxImages() pages rendering or rendered."""
+                while len(rendering) < self._maxImages:
+                    pageNum = next(waiting, None)
+                    if pageNum is None:
+                        break
+                    rendering.append((pageNum, executor.submit(render, pageNum)))
+            fill()
+            for num in range(1, total + 1):
+                pageNum, future = rendering.popleft()
+                img = future.result()
+                del future
+                if self._stop:
+                    for pageNum, future in rendering:
+                        future.cancel()
+                    return p.abort()
+                self.progress(num, total, pageNum)
+                if num > 1:
+                    p.newPage()
+                rect = img.rect()
+                rect.moveCenter(center)
+                painter.drawImage(rect, img)
+                del img
+                # only start rendering the next page now the image is gone,
+                # so no more than maxImages() pages are in memory
+                fill()
+                elapsed = time.monotonic() - start
+                self.remaining(elapsed * (total - num) / num)
 
         return painter.end()
 
+    def documentData(self):
+        """Returns the contents of the PDF file set with setFilename(), or None.
+
+        Also returns None if the file can't be read or if it may have been
+        replaced since the document() was loaded, e.g. by LilyPond recompiling
+        it. This is checked using the document key (see cache.setdocumentkey())
+        or else the stat given to setFilename(); without both, the file is not
+        used.
+
+        """
+        if self._filename:
+            try:
+                with open(self._filename, 'rb') as f:
+                    st = os.fstat(f.fileno())
+                    data = f.read()
+            except (IOError, OSError):
+                return
+            key = cache.documentkey(self._document)
+            if key is not None:
+                if hashlib.sha1(data).hexdigest() == key:
+                    return data
+            elif self._filestat and self._filestat == (st.st_size, st.st_mtime_ns):
+                return data
+
+    def loadDocument(self, data):
+        """Returns a new copy of the Poppler.Document, loaded from the data.
+
+        Returns None if data is None or loading failed; in that case the
+        document() is used.
+
+        """
+        if data:
+            try:
+                import popplerqt5
+            except ImportError:
+                return
+            return popplerqt5.Poppler.Document.loadFromData(QByteArray(data))
+
     def abort(self):
         """Instructs the printer to cancel the job."""
         self._stop = True
@@ -202,4 +313,12 @@ class Printer(object):
         """
         pass
 
+    def remaining(self, seconds):
+        """Called after printing a page with the estimated time left.
+
+        The default implementation does nothing.
+
+        """
+        pass
+
 
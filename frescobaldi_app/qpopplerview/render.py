@@ -76,4 +76,10 @@ class RenderOptions(object):
         """Return the current oversample threshold resolution."""
         return self._oversampleThreshold
 
-
+    def key(self):
+        """Returns a hashable tuple describing the options, e.g. for a cache key."""
+        return (
+            None if self._renderHint is None else int(self._renderHint),
+            None if self._paperColor is None else self._paperColor.rgba(),
+            self._oversampleThreshold,
+        )
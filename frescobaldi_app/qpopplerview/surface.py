@@ -26,7 +26,7 @@ import collections
 import operator
 import weakref
 
-from PyQt5.QtCore import QEvent, QPoint, QRect, QSize, Qt, QTimer, pyqtSignal
+from PyQt5.QtCore import QEvent, QPoint, QRect, QRectF, QSize, QSizeF, Qt, QTimer, pyqtSignal
 from PyQt5.QtGui import (
     QContextMenuEvent, QCursor, QPainter, QPalette, QRegion, QColor,
     QBrush, QPen)
@@ -41,6 +41,7 @@ from . import layout
 from . import page
 from . import highlight
 from . import magnifier
+from . import textlayer
 
 # most used keyboard modifiers
 _SCAM = (Qt.SHIFT | Qt.CTRL | Qt.ALT | Qt.META)
@@ -100,6 +101,7 @@ class Surface(QWidget):
     linkLeft = pyqtSignal()
     linkHelpRequested = pyqtSignal(QPoint, page.Page, popplerqt5.Poppler.Link)
     selectionChanged = pyqtSignal(QRect)
+    textFound = pyqtSignal(list)
 
     def __init__(self, view):
         super(Surface, self).__init__(view)
@@ -115,7 +117,10 @@ class Surface(QWidget):
         self._rubberBand = CustomRubberBand(self)
         self._scrolling = False
         self._scrollTimer = QTimer(interval=100, timeout=self._scrollTimeout)
+        self._fastPaint = False
         self._pageLayout = None
+        self._find = None
+        self._findPending = {}
         self._highlights = weakref.WeakKeyDictionary()
         self.setPageLayout(layout.Layout())
         self.setContextMenuPolicy(Qt.PreventContextMenu)
@@ -144,6 +149,23 @@ class Surface(QWidget):
         """Returns the rectangle of us that is visible in the View."""
         return self.view().viewport().rect().translated(-self.pos())
 
+    def setFastPaint(self, enabled):
+        """Sets whether to paint only cached images, without rendering pages.
+
+        The View enables this while kinetic scrolling is fast. When it is
+        disabled again, the visible part is repainted once, which renders the
+        pages that are not yet cached at the right size.
+
+        """
+        if enabled != self._fastPaint:
+            self._fastPaint = enabled
+            if not enabled:
+                self.update(self.viewportRect())
+
+    def fastPaint(self):
+        """Returns True if only cached images are painted."""
+        return self._fastPaint
+
     def setSelectionEnabled(self, enabled):
         """Enables or disables selecting rectangular regions."""
         self._selectionEnabled = enabled
@@ -246,6 +268,74 @@ class Surface(QWidget):
         """Return all text falling in the selection."""
         return '\n'.join(page.text(self.selection()) for page in self.selectedPages())
 
+    def findText(self, text, caseSensitive=False):
+        """Returns a list of (Page, area) tuples for every occurrence of the text.
+
+        Every area is a QRectF inside (0, 0, 1, 1) like the linkArea attribute
+        of a Poppler.Link, so the results can be given to highlight().
+
+        Only the pages of which the text is already extracted are searched
+        (see the textlayer module). The occurrences on the other pages are
+        emitted with the textFound signal when their text becomes available,
+        until findText() or cancelFind() is called again.
+
+        """
+        self.cancelFind()
+        self._find = (text, caseSensitive)
+        results = []
+        for page in self.pageLayout().pages():
+            layer = textlayer.textlayer(page.document())
+            pending = self._findPending.get(layer)
+            if pending is None:
+                # connect first, so no page can be extracted unnoticed
+                pending = self._findPending[layer] = collections.defaultdict(list)
+                layer.pageExtracted.connect(self.slotPageExtracted)
+            pageText = layer.page(page.pageNumber())
+            if pageText is None:
+                pending[page.pageNumber()].append(page)
+            else:
+                results.extend(self._findAreas(page, pageText))
+        for layer, pending in list(self._findPending.items()):
+            if not pending:
+                layer.pageExtracted.disconnect(self.slotPageExtracted)
+                del self._findPending[layer]
+        return results
+
+    def cancelFind(self):
+        """Stops emitting textFound for the pages that were not yet searched."""
+        for layer in self._findPending:
+            layer.pageExtracted.disconnect(self.slotPageExtracted)
+        self._findPending = {}
+        self._find = None
+
+    def slotPageExtracted(self, pageNumber):
+        """Called when a text layer has extracted a page, searches it if needed."""
+        layer = self.sender()
+        pending = self._findPending.get(layer)
+        if pending is None:
+            return
+        pages = pending.pop(pageNumber, None)
+        if not pending:
+            layer.pageExtracted.disconnect(self.slotPageExtracted)
+            del self._findPending[layer]
+        if pages:
+            pageText = layer.page(pageNumber)
+            results = []
+            for page in pages:
+                results.extend(self._findAreas(page, pageText))
+            if results:
+                self.textFound.emit(results)
+
+    def _findAreas(self, page, pageText):
+        """Returns the (Page, area) tuples of the current search in the PageText."""
+        # the text boxes are relative to the unrotated page
+        size = QSizeF(page.pageSize())
+        if page.rotation() & 1:
+            size.transpose()
+        w, h = size.width(), size.height()
+        return [(page, QRectF(rect.x() / w, rect.y() / h, rect.width() / w, rect.height() / h))
+                for rect in pageText.search(*self._find)]
+
     def redraw(self, rect):
         """Called when the Layout wants to redraw a rectangle."""
         self.update(rect)
@@ -294,7 +384,7 @@ class Surface(QWidget):
         painter = QPainter(self)
         pages = list(self.pageLayout().pagesAt(ev.rect()))
         for page in pages:
-            page.paint(painter, ev.rect())
+            page.paint(painter, ev.rect(), not self._fastPaint)
 
         for highlighter, (d, t) in self._highlights.items():
             rects = []
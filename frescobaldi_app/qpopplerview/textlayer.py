@@ -0,0 +1,190 @@
+# This file is part of the qpopplerview package.
+#
+# Copyright (c) 2010 - 2014 by Wilbert Berendsen
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+# See http://www.gnu.org/licenses/ for more information.
+
+
+"""
+The text of a Poppler.Document, extracted once for fast searching.
+
+The words of every page and their bounding boxes are extracted in a
+background thread, the first time the text layer of a document is
+requested. The TextLayer emits pageExtracted as the pages become available.
+Per page, the text is stored in one string, with the word offsets and the
+boxes in compact arrays.
+
+All coordinates are in points, relative to the unrotated page.
+
+"""
+
+import array
+import bisect
+import re
+import weakref
+
+from PyQt5.QtCore import QObject, QRectF, QThread, pyqtSignal
+
+from .locking import lock
+
+__all__ = ['textlayer', 'TextLayer', 'PageText']
+
+
+_layers = weakref.WeakKeyDictionary()
+
+# keep running threads alive
+_extractors = set()
+
+
+def textlayer(document):
+    """Returns the TextLayer for the Poppler.Document.
+
+    The first time, extracting the text is started in a background thread.
+
+    """
+    try:
+        return _layers[document]
+    except KeyError:
+        layer = _layers[document] = TextLayer(document.numPages())
+        Extractor(document, layer)
+        return layer
+
+
+class PageText(object):
+    """The words of one page, with their bounding boxes.
+
+    The text attribute contains all words, separated by a space or a newline.
+    The word with index i is text[starts[i]:ends[i]], with its bounding box
+    (x1, y1, x2, y2) in boxes[i*4:i*4+4].
+
+    """
+    def __init__(self, text, starts, ends, boxes):
+        self.text = text
+        self.starts = starts
+        self.ends = ends
+        self.boxes = boxes
+
+    @classmethod
+    def fromTextBoxes(cls, textboxes):
+        """Returns a PageText with the words of a list of Poppler.TextBox."""
+        parts = []
+        starts = array.array('I')
+        ends = array.array('I')
+        boxes = array.array('f')
+        pos = 0
+        for box in textboxes:
+            word = box.text()
+            starts.append(pos)
+            pos += len(word)
+            ends.append(pos)
+            boxes.extend(box.boundingBox().getCoords())
+            # poppler links the words on the same line
+            if box.nextWord() is None:
+                separator = '\n'
+            else:
+                separator = ' ' if box.hasSpaceAfter() else ''
+            parts.append(word)
+            parts.append(separator)
+            pos += len(separator)
+        return cls(''.join(parts), starts, ends, boxes)
+
+    def __len__(self):
+        """Returns the number of words."""
+        return len(self.starts)
+
+    def box(self, index):
+        """Returns the bounding box of the word with the index as a QRectF."""
+        rect = QRectF()
+        rect.setCoords(*self.boxes[index*4:index*4+4])
+        return rect
+
+    def search(self, text, caseSensitive=False):
+        """Yields a QRectF for every occurrence of the text.
+
+        The rectangle encloses the boxes of all words the occurrence touches.
+        A line break in the text matches a space.
+
+        """
+        for first, last in self.words(text, caseSensitive):
+            rect = QRectF()
+            for i in range(first, last):
+                rect |= self.box(i)
+            yield rect
+
+    def words(self, text, caseSensitive=False):
+        """Yields a (first, last) tuple for every occurrence of the text.
+
+        The words with index first up to (but not including) last are touched
+        by the occurrence.
+
+        """
+        if not text:
+            return
+        # replacing the newlines and ignoring case in the regular expression
+        # keeps the positions in the haystack the same as in self.text
+        haystack = self.text.replace('\n', ' ')
+        flags = 0 if caseSensitive else re.IGNORECASE
+        for m in re.finditer(re.escape(text), haystack, flags):
+            first = max(0, bisect.bisect_right(self.starts, m.start()) - 1)
+            last = bisect.bisect_left(self.starts, m.end())
+            yield first, last
+
+
+class TextLayer(QObject):
+    """The extracted text of all pages of a Poppler.Document.
+
+    Pages become available while the background thread proceeds;
+    page() returns None for a page that is not yet extracted.
+    The pageExtracted signal is emitted with the number of every page
+    that has become available.
+
+    """
+    pageExtracted = pyqtSignal(int)
+
+    def __init__(self, numPages):
+        super(TextLayer, self).__init__()
+        self._pages = [None] * numPages
+
+    def page(self, pageNumber):
+        """Returns the PageText for the page, or None if not yet extracted."""
+        return self._pages[pageNumber]
+
+
+class Extractor(QThread):
+    """Extracts the text of a document, one page at a time."""
+    def __init__(self, document, layer):
+        super(Extractor, self).__init__()
+        self.document = document
+        self.layer = layer
+        self.finished.connect(self.slotFinished)
+        _extractors.add(self)
+        self.start()
+
+    def run(self):
+        """Main method of this thread, called by Qt on start()."""
+        document = self.document
+        pages = self.layer._pages
+        for num in range(len(pages)):
+            # lock one page at a time, so pages can be rendered in between
+            with lock(document):
+                pages[num] = PageText.fromTextBoxes(document.page(num).textList())
+            self.layer.pageExtracted.emit(num)
+        # don't keep the document alive
+        self.document = None
+
+    def slotFinished(self):
+        """Called when the thread has completed."""
+        _extractors.discard(self)
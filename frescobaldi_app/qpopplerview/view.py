@@ -29,6 +29,7 @@ from PyQt5.QtWidgets import QScrollArea, QStyle, QPinchGesture, QGestureEvent
 
 from math import sqrt
 import copy
+import time
 from . import surface
 from .kineticscrollarea import KineticScrollArea
 from . import cache
@@ -50,6 +51,19 @@ class View(KineticScrollArea):
 
     MAX_ZOOM = 4.0
 
+    # the maximum number of pages to render ahead while scrolling
+    prefetchPages = 3
+
+    # the number of seconds to look ahead at the current scrolling speed
+    prefetchTime = 1.0
+
+    # the minimum number of milliseconds between two prefetch updates
+    prefetchInterval = 50
+
+    # while kinetic scrolling is faster than this (in pixels per timer tick),
+    # only cached images are painted and no pages are rendered
+    fastPaintSpeed = 8
+
     viewModeChanged = pyqtSignal(int)
 
     def __init__(self, parent=None):
@@ -70,6 +84,14 @@ class View(KineticScrollArea):
         self._centerPos = False
         self._resizeTimer = QTimer(singleShot = True, timeout = self._resizeTimeout)
 
+        # prefetching pages while scrolling
+        self._prefetched = set()
+        self._scrollDirection = (0, 0)
+        self._scrollVelocity = 0.0
+        self._scrollTime = 0.0
+        self._prefetchTimer = QTimer(singleShot = True, timeout = self._prefetchTimeout)
+        self.kineticScrollingActive.connect(self._kineticScrollingActive)
+
     def surface(self):
         """Returns our Surface, the widget drawing the page(s)."""
         sf = self.widget()
@@ -145,6 +167,7 @@ class View(KineticScrollArea):
 
     def setScale(self, scale):
         """Sets the scale of all pages in the View."""
+        self.cancelPrefetch()
         self.surface().pageLayout().setScale(scale)
         self.surface().pageLayout().update()
         self.setViewMode(FixedScale)
@@ -175,6 +198,7 @@ class View(KineticScrollArea):
         if mode == FixedScale:
             return
 
+        self.cancelPrefetch()
         maxsize = self.maximumViewportSize()
 
         # can vertical or horizontal scrollbars appear?
@@ -239,6 +263,91 @@ class View(KineticScrollArea):
                         break
         layout.update()
 
+    def scrollContentsBy(self, dx, dy):
+        """Reimplemented to prefetch the pages that will become visible soon."""
+        super(View, self).scrollContentsBy(dx, dy)
+        self._updateScrollVelocity(-dx, -dy)
+        self.surface().setFastPaint(
+            bool(self.fastPaintSpeed) and self.kineticTicksLeft() > self.fastPaintSpeed)
+        if not self._prefetchTimer.isActive():
+            self._prefetchTimer.start(self.prefetchInterval)
+
+    def _prefetchTimeout(self):
+        """(Internal) Updates the rendering jobs, at most once per prefetchInterval."""
+        self.cancelHidden()
+        if not self.surface().fastPaint():
+            self.prefetch()
+
+    def _kineticScrollingActive(self, active):
+        """(Internal) Paints the resting viewport at full quality when kinetic scrolling stops."""
+        if not active:
+            self.surface().setFastPaint(False)
+
+    def _updateScrollVelocity(self, dx, dy):
+        """(Internal) Keeps track of the scrolling direction and speed.
+
+        When the direction is reversed, pending prefetch jobs are cancelled.
+
+        """
+        now = time.monotonic()
+        elapsed, self._scrollTime = now - self._scrollTime, now
+        direction = ((dx > 0) - (dx < 0), (dy > 0) - (dy < 0))
+        if direction != self._scrollDirection:
+            self.cancelPrefetch()
+            self._scrollDirection = direction
+            self._scrollVelocity = 0.0
+        elif 0 < elapsed < 0.5:
+            velocity = max(abs(dx), abs(dy)) / elapsed
+            self._scrollVelocity = (self._scrollVelocity + velocity) / 2
+
+    def prefetch(self):
+        """Schedules rendering of the pages that will become visible soon.
+
+        Looks ahead in the scrolling direction, as far as a kinetic move will
+        scroll, or prefetchTime seconds at the current scrolling speed, but at
+        least one viewport size. At most prefetchPages pages are rendered at a
+        low priority.
+
+        """
+        dx, dy = self._scrollDirection
+        if not (dx or dy) or not self.prefetchPages:
+            return
+        rect = self.viewport().rect().translated(-self.surface().pos())
+        remaining = self.kineticRemainingDistance()
+        if remaining:
+            aheadx, aheady = abs(remaining.x()), abs(remaining.y())
+        else:
+            aheadx = aheady = self._scrollVelocity * self.prefetchTime
+        aheadx = dx * max(int(aheadx), rect.width())
+        aheady = dy * max(int(aheady), rect.height())
+        ahead = rect.adjusted(min(0, aheadx), min(0, aheady), max(0, aheadx), max(0, aheady))
+
+        pages = [p for p in self.surface().pageLayout().pagesAt(ahead)
+                   if not rect.intersects(p.rect())]
+        pages.sort(key=lambda p: p.pos().x() * dx + p.pos().y() * dy)
+        prefetched = set(pages[:self.prefetchPages])
+        for page in self._prefetched - prefetched:
+            cache.unprefetch(page)
+        for page in prefetched:
+            if not cache.cached(page) and not cache.scheduled(page):
+                cache.generate(page, cache.PREFETCH)
+        self._prefetched = prefetched
+
+    def cancelHidden(self):
+        """Cancels the rendering of pages that have scrolled out of view."""
+        rect = self.viewport().rect().translated(-self.surface().pos())
+        layout = self.surface().pageLayout()
+        for page in cache.waiting():
+            if (page.layout() is layout and page not in self._prefetched
+                    and not rect.intersects(page.rect())):
+                cache.cancel(page)
+
+    def cancelPrefetch(self):
+        """Cancels the pending prefetch jobs, e.g. when zooming or reversing."""
+        for page in self._prefetched:
+            cache.unprefetch(page)
+        self._prefetched = set()
+
     def resizeEvent(self, ev):
         super(View, self).resizeEvent(ev)
         # Adjust the size of the document if desired
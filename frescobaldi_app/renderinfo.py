@@ -0,0 +1,93 @@
+# This file is part of the Frescobaldi project, http://www.frescobaldi.org/
+#
+# Copyright (c) 2008 - 2014 by Wilbert Berendsen
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+# See http://www.gnu.org/licenses/ for more information.
+
+"""
+Provides statistics about the caching and rendering of PDF pages.
+"""
+
+
+import os
+
+
+def _megabytes(count):
+    """Return a byte count as a string in megabytes."""
+    return "{0:.1f} MB".format(count / 1048576)
+
+
+def _milliseconds(duration):
+    """Return a duration in seconds as a string in milliseconds."""
+    return "{0:.0f} ms".format(duration * 1000)
+
+
+def _document_name(document):
+    """Return the filename of a Poppler.Document, if known."""
+    import popplerregistry
+    filename = popplerregistry.filename(document)
+    return os.path.basename(filename) if filename else repr(document)
+
+
+def cache_statistics_named():
+    """Yield the names and values of the cache and render statistics."""
+    try:
+        import qpopplerview.cache as cache
+    except ImportError:
+        return
+    stats = cache.statistics()
+    requests = stats.hits + stats.misses
+    yield "Cache size", "{0:.1f} of {1:.0f} MB".format(
+        cache.currentsize(), cache.maxsize())
+    yield "Hits", stats.hits
+    yield "Misses", stats.misses
+    yield "Hit ratio", "{0:.1%}".format(stats.hits / requests if requests else 0)
+    yield "Interim hits", stats.interim
+    yield "Evictions", stats.evictions
+    yield "Disk cache hits", stats.diskhits
+    sizes = cache.documentsizes()
+    for document in sorted(sizes, key=sizes.get, reverse=True):
+        yield "Document " + _document_name(document), _megabytes(sizes[document])
+    yield from working_set_named()
+    hist = stats.rendertime
+    yield "Rendered images", hist.count
+    if hist.count:
+        yield "Mean render time", _milliseconds(hist.mean())
+        yield "Maximum render time", _milliseconds(hist.maximum)
+        lower = 0.0
+        for bound, count in hist.buckets():
+            if bound is None:
+                name = "> {0}".format(_milliseconds(lower))
+            else:
+                name = "{0} - {1}".format(_milliseconds(lower), _milliseconds(bound))
+                lower = bound
+            yield "Render time " + name, count
+
+
+def working_set_named():
+    """Yield the names and values describing the loaded PDF documents."""
+    import popplertools
+    documents = popplertools.resident()
+    yield "Resident documents", "{0} ({1:.1f} of {2:.0f} MB)".format(len(documents),
+        sum(size for doc, size in documents) / 1048576, popplertools.budget() / 1048576)
+    for doc, size in reversed(documents):
+        yield "Resident " + doc.name(), "{0}, idle {1:.0f} s".format(
+            _megabytes(size), doc.idleTime())
+
+
+def cache_statistics_string(separator='\n'):
+    """Return all statistics as a string, joint with separator."""
+    return separator.join(map("{0[0]}: {0[1]}".format, cache_statistics_named()))
@@ -54,8 +54,6 @@ class Search(plugin.MainWindowPlugin, QWidget):
         self._going = False    # are we moving the text cursor?
 
         mainwindow.currentViewChanged.connect(self.viewChanged)
-        mainwindow.actionCollection.edit_find_next.triggered.connect(self.findNext)
-        mainwindow.actionCollection.edit_find_previous.triggered.connect(self.findPrevious)
 
         # don't inherit looks from view
         self.setFont(QApplication.font())
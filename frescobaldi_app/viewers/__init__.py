@@ -49,6 +49,7 @@ import qutil
 import panel
 import listmodel
 import gadgets.drag
+import popplerregistry
 
 from . import documents
 
@@ -327,7 +328,7 @@ class AbstractViewPanel(panel.Panel):
             return
         rect = self.widget().view.surface().selectedPageRect(page)
         import copy2image
-        copy2image.copy_image(self, page, rect, documents.filename(page.document()))
+        copy2image.copy_image(self, page, rect, popplerregistry.filename(page.document()))
 
     def slotZoomChanged(self, mode, scale):
         """Called when the combobox is changed, changes view zoom."""
@@ -29,7 +29,8 @@ import weakref
 from PyQt5.QtCore import pyqtSignal, QPoint, QRect, Qt, QTimer, QUrl
 from PyQt5.QtGui import QCursor, QTextCharFormat
 from PyQt5.QtWidgets import (
-    QToolTip, QVBoxLayout, QHBoxLayout, QWidget, QToolBar)
+    QInputDialog, QToolTip, QVBoxLayout, QHBoxLayout, QWidget,
+    QToolBar)
 
 try:
     import popplerqt5
@@ -104,6 +105,7 @@ class AbstractPopplerWidget(abstractviewwidget.AbstractViewWidget):
     def createHighlighters(self):
         self._highlightFormat = QTextCharFormat()
         self._highlightMusicFormat = Highlighter()
+        self._highlightFindFormat = Highlighter()
         self._highlightRange = None
         self._highlightTimer = QTimer(singleShot=True, interval= 250, timeout=self.updateHighlighting)
         self._highlightRemoveTimer = QTimer(singleShot=True, timeout=self.clearHighlighting)
@@ -121,6 +123,7 @@ class AbstractPopplerWidget(abstractviewwidget.AbstractViewWidget):
         surface.pageLayout().scaleChanged.connect(self.updateZoomInfo)
         self.view.setContextMenuPolicy(Qt.CustomContextMenu)
         self.view.customContextMenuRequested.connect(self.showContextMenu)
+        self._finder = qpopplerview.Finder(self.view, self._highlightFindFormat)
 
     def createContextMenu(self):
         """Creates the context menu.
@@ -206,6 +209,7 @@ class AbstractPopplerWidget(abstractviewwidget.AbstractViewWidget):
         self._links = None
         self._highlightRange = None
         self._highlightTimer.stop()
+        self._finder.clear()
         self.view.clear()
 
     def readSettings(self):
@@ -213,6 +217,7 @@ class AbstractPopplerWidget(abstractviewwidget.AbstractViewWidget):
         # background and highlight colors of music view
         colors = textformats.formatData('editor').baseColors
         self._highlightMusicFormat.setColor(colors['musichighlight'])
+        self._highlightFindFormat.setColor(colors['match'])
         color = colors['selectionbackground']
         color.setAlpha(128)
         self._highlightFormat.setBackground(color)
@@ -438,6 +443,23 @@ class AbstractPopplerWidget(abstractviewwidget.AbstractViewWidget):
         rect.setSize(rect.size().boundedTo(self.view.viewport().size()))
         return rect
 
+    def find(self):
+        """Asks for a text and highlights all its occurrences in the document."""
+        if not self._currentViewdoc:
+            return
+        text, ok = QInputDialog.getText(self, app.caption(_("Find")),
+            _("Search for:"), text=self._finder.text())
+        if ok:
+            self._finder.find(text)
+
+    def findNext(self):
+        """Scrolls to the next occurrence of the text searched for."""
+        self._finder.findNext()
+
+    def findPrevious(self):
+        """Scrolls to the previous occurrence of the text searched for."""
+        self._finder.findPrevious()
+
     def showContextMenu(self):
         """Called when the user right-clicks or presses the context menu key."""
         pos = self.view.mapToGlobal(QPoint(0, 0))
@@ -0,0 +1,71 @@
+"""
+Tests for searching the text of a page in qpopplerview.textlayer.
+
+The PageText is built from plain arrays, so no Poppler document is needed.
+"""
+
+import array
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, 'frescobaldi_app'))
+
+from qpopplerview.textlayer import PageText
+
+
+def pagetext(*lines):
+    """Returns a PageText with the words of the lines, each word 10 units wide."""
+    parts = []
+    starts = array.array('I')
+    ends = array.array('I')
+    boxes = array.array('f')
+    pos = 0
+    for y, line in enumerate(lines):
+        for x, word in enumerate(line.split()):
+            starts.append(pos)
+            ends.append(pos + len(word))
+            boxes.extend((x * 10, y * 10, x * 10 + 8, y * 10 + 8))
+            parts.append(word + ' ')
+            pos += len(word) + 1
+        parts[-1] = parts[-1][:-1] + '\n'
+    return PageText(''.join(parts), starts, ends, boxes)
+
+
+def test_words():
+    text = pagetext("Allegro ma non troppo", "ma non")
+    assert list(text.words("ma non")) == [(1, 3), (4, 6)]
+    assert list(text.words("ro")) == [(0, 1), (3, 4)]
+
+
+def test_words_across_lines():
+    text = pagetext("Allegro ma", "non troppo")
+    assert list(text.words("ma non")) == [(1, 3)]
+
+
+def test_words_case():
+    text = pagetext("Allegro ALLEGRO allegro")
+    assert list(text.words("allegro")) == [(0, 1), (1, 2), (2, 3)]
+    assert list(text.words("allegro", True)) == [(2, 3)]
+
+
+def test_words_lowering_changes_length():
+    # 'İ'.lower() is two characters long; the words after it must still match
+    text = pagetext("İİİİİİ a b c")
+    assert list(text.words("b")) == [(2, 3)]
+    assert list(text.words("İ")) == [(0, 1)] * 6
+
+
+def test_words_special_characters():
+    text = pagetext("a.b (c) a*b")
+    assert list(text.words("(c)")) == [(1, 2)]
+    assert list(text.words("a*b")) == [(2, 3)]
+
+
+def test_words_empty():
+    assert list(pagetext("Allegro").words("")) == []
+
+
+def test_search():
+    text = pagetext("Allegro ma non troppo")
+    rect, = text.search("ma non")
+    assert rect.getCoords() == (10, 0, 28, 8)